@@ -1,8 +1,9 @@
 ﻿from __future__ import annotations
 
+import json
 import sys
 import os
-from dataclasses import asdict
+from datetime import datetime
 from pathlib import Path
 from typing import Any
 
@@ -14,24 +15,32 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 if str(BASE_DIR) not in sys.path:
     sys.path.append(str(BASE_DIR))
 
-from core import (
-    ChecklistBuilder,
-    DouyinCrawler,
-    DouyinCrawlerConfig,
-    DouyinSearchRequest,
-    DouyinSearchService,
-    DouyinVideo,
-    KeywordRequest,
-    KeywordTranslator,
-    OutputManager,
-    ProjectPaths,
-    ScriptRequest,
-    ScriptService,
-    slugify,
+from core import DouyinVideo, ProjectPaths, ScriptRequest
+from core.file_manager import archive_outputs
+from core.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, Job, JobQueue, WorkerPool
+from core.metrics import (
+    DOUYIN_DOWNLOAD_BYTES,
+    LLM_CALLS,
+    LLM_RETRIES,
+    LLM_TOKENS,
+    STAGE_LATENCY,
+    search_hit_rate,
+    start_metrics_server,
 )
+from core.pipeline import PIPELINE_STAGES, GenerationOptions, make_generation_handler
+from core.services import get_services
+from core.similarity import DEFAULT_THRESHOLD
 
 load_dotenv()
 
+try:
+    # Newer Streamlit accepts a callable for st.download_button data, run only on click.
+    from streamlit.runtime.media_file_manager import MediaFileManager
+
+    DEFERRED_DOWNLOADS = hasattr(MediaFileManager, "add_deferred")
+except ImportError:
+    DEFERRED_DOWNLOADS = False
+
 st.set_page_config(
     page_title="쇼핑 쇼츠 반자동 제작 시스템",
     page_icon="🎬",
@@ -58,6 +67,10 @@ def env_int(name: str, default: int) -> int:
         return default
 
 
+# Script languages offered in the form; codes become file suffixes (script_en.txt).
+SCRIPT_LANGUAGES = {"ko": "한국어", "en": "영어", "ja": "일본어", "zh": "중국어(간체)"}
+
+
 def load_history_from_file() -> list[dict[str, Any]]:
     """Load history from JSON file."""
     history_file = ProjectPaths.discover().output_root / "history.json"
@@ -80,7 +93,146 @@ def save_history_to_file(history: list[dict[str, Any]]) -> None:
         json.dump(history, f, ensure_ascii=False, indent=2)
 
 
+@st.cache_resource
+def ensure_metrics_server(port: int) -> bool:
+    """Start the /metrics endpoint once per process when METRICS_PORT is set."""
+    try:
+        start_metrics_server(port)
+    except OSError:
+        return False  # Port already taken (e.g. another Streamlit process)
+    return True
+
+
+@st.cache_resource
+def get_job_runtime() -> tuple[JobQueue, WorkerPool]:
+    """Create the process-wide job queue and worker pool shared by every session."""
+    paths = ProjectPaths.discover()
+    queue = JobQueue(paths.output_root / "jobs.sqlite3")
+    # Jobs left RUNNING by a crashed or restarted process (or a dead worker) are picked up
+    # again; the pool rechecks before claiming.
+    pool = WorkerPool(
+        queue,
+        make_generation_handler(paths),
+        workers=max(1, env_int("GENERATION_WORKERS", 2)),
+        stale_after_seconds=env_int("JOB_STALE_SECONDS", 900),
+    ).start()
+    return queue, pool
+
+
+def get_session_owner() -> str:
+    """Stable per-browser id kept in the URL so a refresh re-attaches to running jobs."""
+    if "owner_id" not in st.session_state:
+        owner = st.query_params.get("session")
+        if not owner:
+            import uuid
+
+            owner = uuid.uuid4().hex[:12]
+            st.query_params["session"] = owner
+        st.session_state.owner_id = owner
+    return st.session_state.owner_id
+
+
+def result_from_metadata(output_dir: str) -> dict[str, Any] | None:
+    """Rebuild a displayable result from a saved folder (search hits outside the history)."""
+    metadata_path = Path(output_dir) / "metadata.json"
+    try:
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        modified = datetime.fromtimestamp(metadata_path.stat().st_mtime)
+    except (OSError, ValueError):
+        return None
+    return {
+        "product_name": metadata.get("product_name", ""),
+        "timestamp": modified.strftime("%Y-%m-%d %H:%M:%S"),
+        "script_bundle": metadata.get("script_bundle") or {},
+        "keyword_payload": metadata.get("keywords") or {},
+        "output_dir": output_dir,
+        "douyin_videos": metadata.get("douyin") or [],
+        "douyin_requested": bool(metadata.get("douyin")),
+        "download_records": metadata.get("douyin_downloads") or [],
+        "download_requested": bool(metadata.get("douyin_downloads")),
+        "usage": metadata.get("usage") or {},
+        "reused_from": metadata.get("reused_from") or "",
+    }
+
+
+def render_search_panel() -> None:
+    """Full-text search over every saved script, hook, CTA and keyword (see core.search)."""
+    query = st.text_input(
+        "🔎 지난 결과 검색",
+        placeholder="예: 출근길 이어폰, 降噪",
+        help="대본·훅·CTA·설명·썸네일 문구·한국어/중국어 키워드에서 모든 검색어가 포함된 상품을 찾습니다.",
+    )
+    if not query.strip():
+        return
+    index = get_services(ProjectPaths.discover()).output_manager().search_index()
+    hits = index.search(query, limit=10)
+    if not hits:
+        st.caption("검색 결과가 없습니다.")
+        return
+    st.caption(f"{len(hits)}건")
+    for idx, hit in enumerate(hits):
+        saved = datetime.fromtimestamp(hit.saved_at).strftime("%Y-%m-%d")
+        with st.expander(f"{hit.product_name[:20]} · {saved}", expanded=False):
+            st.caption(hit.snippet)
+            if st.button("이 결과 보기", key=f"search_view_{idx}"):
+                result = result_from_metadata(hit.output_dir)
+                if result is None:
+                    st.warning("결과 폴더를 찾을 수 없습니다.")
+                else:
+                    st.session_state.current_result = result
+                    st.rerun()
+
+
+def render_metrics_panel() -> None:
+    """Show process-wide counters and latency histograms in the sidebar."""
+    with st.expander("📈 운영 지표", expanded=False):
+        calls_ok = LLM_CALLS.total(status="ok")
+        calls_error = LLM_CALLS.total(status="error")
+        col1, col2 = st.columns(2)
+        col1.metric("LLM 호출", f"{int(calls_ok + calls_error):,}", help="성공 + 실패 시도 수")
+        col2.metric("재시도", f"{int(LLM_RETRIES.total()):,}")
+        col1.metric("입력 토큰", f"{int(LLM_TOKENS.total(direction='in')):,}")
+        col2.metric("출력 토큰", f"{int(LLM_TOKENS.total(direction='out')):,}")
+        hit_rate = search_hit_rate()
+        col1.metric("Douyin 적중률", f"{hit_rate * 100:.0f}%" if hit_rate is not None else "-")
+        col2.metric("다운로드", f"{DOUYIN_DOWNLOAD_BYTES.total() / 1_048_576:.1f} MB")
+
+        by_model: dict[str, float] = {}
+        for labels, value in LLM_CALLS.samples():
+            key = f"{labels['provider']}/{labels['model']}"
+            by_model[key] = by_model.get(key, 0.0) + value
+        if by_model:
+            st.caption("모델별 호출 수")
+            st.dataframe(
+                [{"모델": key, "호출 수": int(value)} for key, value in sorted(by_model.items())],
+                use_container_width=True,
+                hide_index=True,
+            )
+
+        latency_rows = []
+        stages = sorted({sample["labels"]["stage"] for sample in STAGE_LATENCY.samples()})
+        for stage in stages:
+            samples = [s for s in STAGE_LATENCY.samples() if s["labels"]["stage"] == stage]
+            count = sum(sample["count"] for sample in samples)
+            total = sum(sample["sum"] for sample in samples)
+            latency_rows.append(
+                {
+                    "단계": stage,
+                    "횟수": count,
+                    "평균(초)": round(total / count, 2) if count else 0.0,
+                    "p95(초, 버킷)": STAGE_LATENCY.quantile(0.95, stage=stage),
+                }
+            )
+        if latency_rows:
+            st.caption("단계별 지연 시간")
+            st.dataframe(latency_rows, use_container_width=True, hide_index=True)
+
+
 def main() -> None:
+    metrics_port = env_int("METRICS_PORT", 0)
+    if metrics_port:
+        ensure_metrics_server(metrics_port)
+
     st.title("🎬 쇼핑 쇼츠 반자동 제작 시스템")
     st.caption("Phase 1: AI 기반 기획 자동화 · Phase 2: 영상 소스 자동화")
 
@@ -89,9 +241,12 @@ def main() -> None:
         st.session_state.history = load_history_from_file()
     if "current_result" not in st.session_state:
         st.session_state.current_result = None
+    if "dismissed_jobs" not in st.session_state:
+        st.session_state.dismissed_jobs = set()
 
     # Sidebar: History
     with st.sidebar:
+        render_search_panel()
         st.header("📋 생성 히스토리")
         if st.session_state.history:
             st.caption(f"총 {len(st.session_state.history)}개의 결과")
@@ -109,6 +264,8 @@ def main() -> None:
         else:
             st.info("아직 생성된 콘텐츠가 없습니다.")
 
+        render_metrics_panel()
+
     # 사용 가이드 및 유용한 링크
     with st.expander("📖 사용 가이드 및 유용한 링크", expanded=False):
         st.markdown("""
@@ -194,6 +351,17 @@ def main() -> None:
     douyin_crawler_results_default = env_int("DOUYIN_CRAWLER_RESULTS", 10)
     douyin_headless_default = env_flag("DOUYIN_HEADLESS", "true")
     douyin_audio_only_default = env_flag("DOUYIN_AUDIO_ONLY", "false")
+    douyin_block_resources_default = env_flag("DOUYIN_BLOCK_RESOURCES", "true")
+    douyin_max_tabs_default = max(1, min(8, env_int("DOUYIN_MAX_TABS", 4)))
+    douyin_max_duration_default = max(0, min(600, env_int("DOUYIN_MAX_DURATION", 60)))
+    douyin_max_filesize_default = max(0, min(500, env_int("DOUYIN_MAX_FILESIZE_MB", 50)))
+    douyin_postprocess_default = env_flag("DOUYIN_POSTPROCESS", "true")
+    candidates_default = max(1, min(5, env_int("SCRIPT_CANDIDATES", 1)))
+    extra_languages_default = [
+        lang.strip()
+        for lang in os.getenv("SCRIPT_EXTRA_LANGUAGES", "").split(",")
+        if lang.strip() in SCRIPT_LANGUAGES
+    ]
 
     douyin_download_limit_default = max(1, min(10, douyin_download_limit_default))
     douyin_scroll_times_default = max(1, min(20, douyin_scroll_times_default))
@@ -223,6 +391,26 @@ def main() -> None:
             index=0,
             format_func=lambda x: "한국어" if x == "ko" else "영어",
         )
+        extra_languages = st.multiselect(
+            "추가 대본 언어",
+            options=list(SCRIPT_LANGUAGES),
+            default=extra_languages_default,
+            format_func=lambda x: SCRIPT_LANGUAGES[x],
+            help="완성된 대본을 한 번의 호출로 여러 언어로 현지화해 script_en.txt 처럼 언어별 파일로 저장합니다.",
+        )
+        candidates = st.slider(
+            "훅·썸네일 후보 수",
+            min_value=1,
+            max_value=5,
+            value=candidates_default,
+            help="한 번의 호출로 여러 후보를 받아, 결과 화면에서 추가 생성 없이 바꿔 볼 수 있습니다.",
+        )
+        refresh_stages = st.checkbox(
+            "저장된 단계 결과 무시하고 새로 생성",
+            value=False,
+            help="입력이 같으면 대본·키워드·Douyin 검색 결과를 다시 호출하지 않고 재사용합니다. "
+            "새 대본이 필요할 때만 켜세요.",
+        )
         enable_douyin = st.checkbox(
             "Douyin 레퍼런스 영상 검색 실행",
             value=enable_douyin_default,
@@ -234,6 +422,11 @@ def main() -> None:
         douyin_crawler_results = douyin_crawler_results_default
         douyin_headless = douyin_headless_default
         douyin_audio_only = douyin_audio_only_default
+        douyin_block_resources = douyin_block_resources_default
+        douyin_max_tabs = douyin_max_tabs_default
+        douyin_max_duration = douyin_max_duration_default
+        douyin_max_filesize_mb = douyin_max_filesize_default
+        douyin_postprocess = douyin_postprocess_default
 
         if enable_douyin:
             st.markdown("**Phase 2 옵션 (Douyin Selenium + yt-dlp)**")
@@ -250,6 +443,13 @@ def main() -> None:
                 max_value=20,
                 value=douyin_scroll_times_default,
             )
+            douyin_max_tabs = st.slider(
+                "동시 검색 탭 수",
+                min_value=1,
+                max_value=8,
+                value=douyin_max_tabs_default,
+                help="번역된 중국어 키워드·검색어 전체를 브라우저 하나의 여러 탭에서 함께 검색합니다.",
+            )
             enable_douyin_download = st.checkbox(
                 "yt-dlp로 상위 영상 자동 다운로드",
                 value=enable_douyin_download_default,
@@ -261,14 +461,39 @@ def main() -> None:
                     max_value=10,
                     value=douyin_download_limit_default,
                 )
+                douyin_max_duration = st.slider(
+                    "최대 영상 길이 (초, 0=제한 없음)",
+                    min_value=0,
+                    max_value=600,
+                    value=douyin_max_duration_default,
+                    step=5,
+                    help="다운로드 전에 메타데이터만 먼저 조회해 조건을 넘는 영상은 받지 않습니다.",
+                )
+                douyin_max_filesize_mb = st.slider(
+                    "최대 파일 크기 (MB, 0=제한 없음)",
+                    min_value=0,
+                    max_value=500,
+                    value=douyin_max_filesize_default,
+                    step=5,
+                )
                 douyin_audio_only = st.checkbox(
                     "음성만 추출 (MP3 변환)",
                     value=douyin_audio_only_default,
                 )
+                douyin_postprocess = st.checkbox(
+                    "편집용 파일 생성 (프록시·MP3·키프레임·컨택트 시트)",
+                    value=douyin_postprocess_default,
+                    help="FFmpeg가 필요합니다. 같은 영상은 캐시되어 다시 변환하지 않습니다.",
+                )
                 douyin_headless = st.checkbox(
                     "헤드리스 모드로 실행",
                     value=douyin_headless_default,
                 )
+                douyin_block_resources = st.checkbox(
+                    "이미지·영상·폰트 로딩 차단 (경량 크롤링)",
+                    value=douyin_block_resources_default,
+                    help="검색 결과 HTML만 필요하므로 커버 이미지와 자동재생 영상을 받지 않습니다.",
+                )
         else:
             enable_douyin_download = False
 
@@ -294,8 +519,19 @@ def main() -> None:
             douyin_crawler_results=douyin_crawler_results,
             douyin_headless=douyin_headless,
             douyin_audio_only=douyin_audio_only,
+            douyin_block_resources=douyin_block_resources,
+            douyin_max_tabs=douyin_max_tabs,
+            douyin_max_duration=douyin_max_duration,
+            douyin_max_filesize_mb=douyin_max_filesize_mb,
+            douyin_postprocess=douyin_postprocess,
+            candidates=candidates,
+            refresh_stages=refresh_stages,
+            extra_languages=extra_languages,
         )
 
+    render_similar_products_prompt()
+    render_job_panel()
+
     # Display current result if available
     if st.session_state.current_result:
         display_current_result(st.session_state.current_result)
@@ -315,185 +551,182 @@ def process_generation(
     douyin_crawler_results: int,
     douyin_headless: bool,
     douyin_audio_only: bool,
+    douyin_block_resources: bool = True,
+    douyin_max_tabs: int = 4,
+    douyin_max_duration: int = 60,
+    douyin_max_filesize_mb: int = 50,
+    douyin_postprocess: bool = True,
+    candidates: int = 1,
+    refresh_stages: bool = False,
+    extra_languages: list[str] | None = None,
 ) -> None:
-    """Process content generation and save to session state."""
-    from datetime import datetime
-
-    with st.spinner("AI가 콘텐츠를 생성하는 중입니다..."):
-        script_service = ScriptService()
-        keyword_service = KeywordTranslator()
-        output_manager = OutputManager()
-
-        script_request = ScriptRequest(
-            product_name=product_name,
-            target_audience=target_audience,
-            tone=tone,
-            style=style,
-            language=language,
-            brand_voice=brand_voice or None,
-        )
-
-        keyword_request = KeywordRequest(
-            product_name=product_name,
-            target_audience=target_audience,
-            tone=tone,
-            style=style,
-            language=language,
-        )
-
-        try:
-            script_bundle = script_service.generate_bundle(script_request)
-            keyword_payload = keyword_service.translate(keyword_request)
-        except Exception as exc:  # pylint: disable=broad-except
-            st.error(f"콘텐츠 생성 중 오류가 발생했습니다: {exc}")
-            return
-
-        search_keyword = product_name
-        douyin_videos: list[DouyinVideo] = []
-        if enable_douyin:
-            search_keyword = next(
-                (kw for kw in keyword_payload.get("chinese_keywords", []) if kw),
-                product_name,
-            )
-            search_service = DouyinSearchService()
-            search_request = DouyinSearchRequest(keyword=search_keyword, max_results=6)
-            try:
-                douyin_videos = search_service.search(search_request)
-            except Exception as exc:  # pragma: no cover - unexpected
-                st.warning(f"Douyin 검색 중 오류가 발생했습니다: {exc}")
-                douyin_videos = []
-
-        output_dir = output_manager.create_output_dir(product_name)
-        download_records: list[dict[str, Any]] = []
-        crawler_videos: list[DouyinVideo] = []
-
-        if enable_douyin and enable_douyin_download:
-            crawler_config = DouyinCrawlerConfig(
-                headless=douyin_headless,
-                wait_seconds=3.0,
-                scroll_pause_seconds=2.0,
-                scroll_times=douyin_scroll_times,
-                max_results=douyin_crawler_results,
-                download_limit=douyin_download_limit,
-                download_audio_only=douyin_audio_only,
-            )
-            crawler = DouyinCrawler(crawler_config)
-            try:
-                crawler_videos = crawler.search(search_keyword)
-                if crawler_videos and not douyin_videos:
-                    douyin_videos = crawler_videos
-                download_source = douyin_videos or crawler_videos
-                if download_source:
-                    download_records = crawler.download(download_source, output_dir)
-            except Exception as exc:  # pragma: no cover - runtime safety
-                st.error(f"Douyin 다운로드 중 오류가 발생했습니다: {exc}")
-
-        save_outputs(
-            output_manager=output_manager,
-            output_dir=output_dir,
-            product_name=product_name,
-            script_bundle=script_bundle,
-            keyword_payload=keyword_payload,
-            script_request=script_request,
-            douyin_videos=douyin_videos,
-            douyin_downloads=download_records,
-        )
-
-        # Save to session state
-        result_data = {
-            "product_name": product_name,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "script_bundle": script_bundle,
-            "keyword_payload": keyword_payload,
-            "output_dir": str(output_dir),
-            "douyin_videos": [video.as_dict() for video in douyin_videos] if douyin_videos else [],
-            "douyin_requested": enable_douyin,
-            "download_records": download_records,
-            "download_requested": enable_douyin_download,
+    """Queue content generation as a background job for this session."""
+    options = GenerationOptions(
+        product_name=product_name,
+        target_audience=target_audience,
+        tone=tone,
+        style=style,
+        language=language,
+        brand_voice=brand_voice,
+        enable_douyin=enable_douyin,
+        enable_douyin_download=enable_douyin_download,
+        douyin_download_limit=douyin_download_limit,
+        douyin_scroll_times=douyin_scroll_times,
+        douyin_crawler_results=douyin_crawler_results,
+        douyin_headless=douyin_headless,
+        douyin_audio_only=douyin_audio_only,
+        douyin_block_resources=douyin_block_resources,
+        douyin_max_tabs=douyin_max_tabs,
+        douyin_max_duration=douyin_max_duration,
+        douyin_max_filesize_mb=douyin_max_filesize_mb,
+        douyin_postprocess=douyin_postprocess,
+        candidates=candidates,
+        refresh_stages=refresh_stages,
+        extra_languages=[lang for lang in extra_languages or [] if lang != language],
+    )
+    matches = find_similar_products(options)
+    if matches:
+        # Ask before paying for the LLM again; see render_similar_products_prompt.
+        st.session_state.pending_generation = {
+            "options": options.as_dict(),
+            "matches": [match.as_dict() for match in matches],
         }
+        return
+    submit_generation(options)
 
-        # Add to history (limit to last 10)
-        st.session_state.history.append(result_data)
-        if len(st.session_state.history) > 10:
-            st.session_state.history = st.session_state.history[-10:]
 
-        # Save to file for persistence
-        save_history_to_file(st.session_state.history)
+def submit_generation(options: GenerationOptions) -> None:
+    """Queue a generation job for this session and wake the workers."""
+    queue, pool = get_job_runtime()
+    queue.submit(options.as_dict(), owner=get_session_owner())
+    pool.notify()
+    st.toast(f"'{options.product_name}' 생성 작업이 대기열에 추가되었습니다.", icon="⏳")
 
-        # Set as current result
-        st.session_state.current_result = result_data
 
-    st.success("콘텐츠가 생성되었습니다.")
-    st.rerun()  # Refresh to show the result
-
-
-def save_outputs(
-    output_manager: OutputManager,
-    output_dir: Path,
-    product_name: str,
-    script_bundle: dict[str, Any],
-    keyword_payload: dict[str, Any],
-    script_request: ScriptRequest,
-    douyin_videos: list[DouyinVideo] | None = None,
-    douyin_downloads: list[dict[str, Any]] | None = None,
-) -> None:
-    """Persist generated artefacts and checklist."""
-    output_manager.write_text(output_dir, "script.txt", [script_bundle["script"]])
-    output_manager.write_text(
-        output_dir,
-        "thumbnail.txt",
-        script_bundle.get("thumbnail_options", []),
-    )
-    output_manager.write_text(
-        output_dir,
-        "keywords.txt",
-        keyword_payload.get("korean_keywords", []),
-    )
-    output_manager.write_text(
-        output_dir,
-        "keywords_zh.txt",
-        keyword_payload.get("chinese_keywords", []),
+def find_similar_products(options: GenerationOptions) -> list[Any]:
+    """Near-duplicate earlier generations of this product (empty when disabled)."""
+    try:
+        threshold = float(os.getenv("SIMILARITY_THRESHOLD", str(DEFAULT_THRESHOLD)))
+    except ValueError:
+        threshold = DEFAULT_THRESHOLD
+    if threshold <= 0 or threshold > 1:
+        return []
+    request = ScriptRequest(
+        product_name=options.product_name,
+        target_audience=options.target_audience,
+        tone=options.tone,
+        language=options.language,
+        style=options.style,
     )
-    output_manager.write_text(
-        output_dir,
-        "douyin_queries.txt",
-        keyword_payload.get("douyin_search_queries", []),
+    index = get_services(ProjectPaths.discover()).product_index()
+    return index.find_similar(request, threshold=threshold)
+
+
+def render_similar_products_prompt() -> None:
+    """Offer to reuse or adapt a near-duplicate product instead of a full LLM run."""
+    pending = st.session_state.get("pending_generation")
+    if not pending:
+        return
+    options = GenerationOptions.from_dict(pending["options"])
+    st.warning(
+        f"'{options.product_name}' 와(과) 비슷한 상품을 이전에 생성했습니다. "
+        "이전 결과를 활용하면 LLM 호출을 건너뛸 수 있습니다."
     )
-    if douyin_videos:
-        output_manager.write_json(
-            output_dir,
-            "douyin_videos.json",
-            [video.as_dict() for video in douyin_videos],
-        )
-        output_manager.write_text(
-            output_dir,
-            "douyin_links.txt",
-            [video.share_url for video in douyin_videos if video.share_url],
-        )
-    if douyin_downloads:
-        output_manager.write_json(
-            output_dir,
-            "douyin_downloads.json",
-            douyin_downloads,
-        )
+    choice: tuple[str, str] | None = None
+    for idx, match in enumerate(pending["matches"]):
+        settings = "동일 설정" if match["same_settings"] else "타깃/톤/스타일 다름"
+        st.markdown(f"**{match['product_name']}** · 유사도 {match['score']:.0%} · {settings}")
+        if match.get("hook"):
+            st.caption(f"Hook: {match['hook']}")
+        col1, col2 = st.columns(2)
+        if col1.button("그대로 재사용 (LLM 생략)", key=f"reuse_{idx}"):
+            choice = ("reuse", match["output_dir"])
+        if col2.button("키워드 재사용 · 대본만 새로 생성", key=f"adapt_{idx}"):
+            choice = ("adapt", match["output_dir"])
+    if st.button("무시하고 새로 생성", key="reuse_skip"):
+        choice = ("", "")
+        options.refresh_stages = True
+
+    if choice is not None:
+        options.reuse_mode, options.reuse_from = choice
+        del st.session_state.pending_generation
+        submit_generation(options)
+        st.rerun()
+
+
+def collect_finished_job(job: Job) -> bool:
+    """Move a succeeded job into this session's history once; return True if added."""
+    if job.status != SUCCEEDED or not job.result:
+        return False
+    if any(item.get("job_id") == job.id for item in st.session_state.history):
+        return False
+    st.session_state.history.append(job.result)
+    # Add to history (limit to last 10)
+    if len(st.session_state.history) > 10:
+        st.session_state.history = st.session_state.history[-10:]
+    save_history_to_file(st.session_state.history)
+    st.session_state.current_result = job.result
+    return True
+
+
+JOB_STATE_ICONS = {"running": "⏳", "done": "✅", "cached": "♻️", "skipped": "⏭️", "failed": "⚠️"}
+STAGE_LABELS = {
+    "script": "대본·썸네일",
+    "localize": "다국어 대본",
+    "keywords": "키워드",
+    "douyin_search": "Douyin 검색",
+    "douyin_crawl": "크롤링·다운로드",
+    "media": "편집용 파일",
+    "save": "저장",
+}
+
+
+def render_job_panel() -> None:
+    """Poll this session's jobs; reruns itself while any job is still active."""
+    queue, _ = get_job_runtime()
+    jobs = queue.list_jobs(owner=get_session_owner(), limit=10)
+    active = [job for job in jobs if job.status in (QUEUED, RUNNING)]
+
+    @st.fragment(run_every=2.0 if active else None)
+    def job_panel() -> None:
+        current_jobs = queue.list_jobs(owner=get_session_owner(), limit=10)
+        if any(collect_finished_job(job) for job in current_jobs):
+            st.rerun()
+
+        still_active = [job for job in current_jobs if job.status in (QUEUED, RUNNING)]
+        if active and not still_active:
+            st.rerun()  # Full rerun so the panel stops polling
+
+        for job in still_active:
+            product = job.payload.get("product_name", "")
+            if job.status == QUEUED:
+                ahead = queue.position(job.id) or 0
+                st.info(f"⏳ '{product}' 대기 중 (앞선 작업 {ahead}개)")
+                continue
+            finished_stages = sum(
+                1
+                for stage in PIPELINE_STAGES
+                if job.progress.get(stage) in ("done", "cached", "skipped", "failed")
+            )
+            st.progress(
+                finished_stages / len(PIPELINE_STAGES),
+                text=f"🚀 '{product}' 생성 중 · "
+                + " · ".join(
+                    f"{JOB_STATE_ICONS.get(job.progress.get(stage, ''), '▫️')} {STAGE_LABELS[stage]}"
+                    for stage in PIPELINE_STAGES
+                ),
+            )
 
-    output_manager.write_json(
-        output_dir,
-        "metadata.json",
-        {
-            "product_name": product_name,
-            "slug": slugify(product_name),
-            "input": asdict(script_request),
-            "script_bundle": script_bundle,
-            "keywords": keyword_payload,
-            "douyin": [video.as_dict() for video in douyin_videos] if douyin_videos else [],
-            "douyin_downloads": douyin_downloads or [],
-        },
-    )
+        for job in current_jobs:
+            if job.status == FAILED and job.id not in st.session_state.dismissed_jobs:
+                product = job.payload.get("product_name", "")
+                error_summary = (job.error or "").split("\n", 1)[0]
+                st.error(f"'{product}' 콘텐츠 생성 중 오류가 발생했습니다: {error_summary}")
+                if st.button("닫기", key=f"dismiss_{job.id}"):
+                    st.session_state.dismissed_jobs.add(job.id)
+                    st.rerun()
 
-    checklist_builder = ChecklistBuilder()
-    checklist_items = checklist_builder.build()
-    checklist_builder.export(output_dir, checklist_items)
+    job_panel()
 
 
 def display_current_result(result_data: dict[str, Any]) -> None:
@@ -509,10 +742,25 @@ def display_current_result(result_data: dict[str, Any]) -> None:
         display_path = output_dir
     st.markdown(f"**결과 폴더**: `{display_path}`")
     st.caption(f"생성 시각: {result_data['timestamp']}")
+    if result_data.get("reused_from"):
+        mode = "대본·키워드 재사용" if result_data.get("reuse_mode") == "reuse" else "키워드 재사용"
+        st.info(f"♻️ 이전 결과 활용 ({mode}): `{Path(result_data['reused_from']).name}`")
+    if result_data.get("cached_stages"):
+        cached = ", ".join(STAGE_LABELS.get(stage, stage) for stage in result_data["cached_stages"])
+        st.caption(f"♻️ 입력이 같아 저장된 결과를 재사용한 단계: {cached}")
+    for warning in result_data.get("warnings", []):
+        st.warning(warning)
 
     # Reconstruct DouyinVideo objects from dict
     douyin_videos = [DouyinVideo(**video_dict) for video_dict in result_data.get("douyin_videos", [])]
 
+    stage_timings = result_data.get("stage_timings") or []
+    if stage_timings:
+        display_stage_timings(stage_timings)
+    usage = result_data.get("usage") or {}
+    if usage.get("calls"):
+        display_usage(usage)
+
     display_results(
         script_bundle=result_data["script_bundle"],
         keyword_payload=result_data["keyword_payload"],
@@ -524,6 +772,79 @@ def display_current_result(result_data: dict[str, Any]) -> None:
     )
 
 
+def display_stage_timings(stage_timings: list[dict[str, Any]]) -> None:
+    """Render the per-stage timing breakdown collected by the tracer."""
+    total_ms = next((row["total_ms"] for row in stage_timings if row["stage"] == "generation"), 0.0)
+    label = f"⏱️ 단계별 소요 시간 (총 {total_ms / 1000:.1f}초)" if total_ms else "⏱️ 단계별 소요 시간"
+    with st.expander(label, expanded=False):
+        st.dataframe(
+            [
+                {
+                    "단계": row["stage"],
+                    "호출 수": row["calls"],
+                    "소요 시간(초)": round(row["total_ms"] / 1000, 2),
+                    "비중(%)": round(row.get("share", 0.0) * 100, 1),
+                    "오류": row.get("errors", 0),
+                }
+                for row in stage_timings
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+def display_usage(usage: dict[str, Any]) -> None:
+    """Render token and cost usage aggregated per stage."""
+    total = usage.get("total", {})
+    cost = total.get("cost_usd")
+    cached_ratio = total.get("cached_ratio", 0.0)
+    label = (
+        f"💰 토큰 사용량 (입력 {total.get('input_tokens', 0):,}"
+        f" · 출력 {total.get('output_tokens', 0):,}"
+        + (f" · 캐시 {cached_ratio:.0%}" if cached_ratio else "")
+        + (f" · 약 ${cost:.4f})" if cost is not None else ")")
+    )
+    with st.expander(label, expanded=False):
+        st.dataframe(
+            [
+                {
+                    "단계": stage,
+                    "호출 수": row["calls"],
+                    "입력 토큰": row["input_tokens"],
+                    "출력 토큰": row["output_tokens"],
+                    "캐시 적중(%)": round(row.get("cached_ratio", 0.0) * 100, 1),
+                    "LLM 지연(초)": round(row["latency_ms"] / 1000, 2),
+                    "예상 비용($)": row["cost_usd"],
+                }
+                for stage, row in usage.get("by_stage", {}).items()
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+def display_reference_suggestions(keywords: list[str], exclude: set[str]) -> None:
+    """Suggest proven references already in the corpus, without a new crawl."""
+    try:
+        corpus = get_services(ProjectPaths.discover()).reference_corpus()
+        references = corpus.suggest(keywords, limit=5 + len(exclude))
+    except ImportError:
+        return  # pyarrow not installed
+    references = [video for video in references if video.share_url not in exclude][:5]
+    if not references:
+        return
+    with st.expander(f"📚 코퍼스 추천 레퍼런스 ({len(references)}개)", expanded=False):
+        st.caption("이전 검색에서 수집된 영상입니다. 새로 크롤링하지 않고 바로 참고할 수 있습니다.")
+        for idx, video in enumerate(references, start=1):
+            duration = f" · {video.duration:.0f}초" if video.duration else ""
+            st.markdown(
+                f"{idx}. **{video.title or '(제목 없음)'}** — {video.author} · "
+                f"재생 {video.play_count:,}회{duration}"
+            )
+            if video.share_url:
+                st.markdown(f"[링크 열기]({video.share_url})")
+
+
 def display_results(
     script_bundle: dict[str, Any],
     keyword_payload: dict[str, Any],
@@ -534,6 +855,18 @@ def display_results(
     douyin_download_requested: bool,
 ) -> None:
     """Render generated assets in the Streamlit UI."""
+    # Candidates were all generated up front; switching only reruns the page.
+    candidates = script_bundle.get("candidates") or []
+    if len(candidates) > 1:
+        choice = st.radio(
+            "🎬 훅·대본 후보",
+            options=range(len(candidates)),
+            format_func=lambda idx: f"{idx + 1}. {candidates[idx].get('hook', '')}",
+            key=f"script_candidate_{output_dir.name}",
+        )
+        script_bundle = {**script_bundle, **candidates[choice]}
+        st.caption("script.txt 에는 1번 후보가, script_candidates.txt 에는 모든 후보가 저장됩니다.")
+
     st.subheader("📄 대본")
     st.text_area("30초 대본", value=script_bundle["script"], height=300)
 
@@ -545,9 +878,38 @@ def display_results(
         st.markdown(f"  - {point}")
 
     st.subheader("🖼️ 썸네일 문구 제안")
-    for idx, option in enumerate(script_bundle.get("thumbnail_options", []), start=1):
+    thumbnail_sets = script_bundle.get("thumbnail_sets") or [
+        script_bundle.get("thumbnail_options", [])
+    ]
+    selected_set = 0
+    if len(thumbnail_sets) > 1:
+        selected_set = st.radio(
+            "썸네일 세트",
+            options=range(len(thumbnail_sets)),
+            format_func=lambda idx: f"세트 {idx + 1}",
+            horizontal=True,
+            key=f"thumbnail_set_{output_dir.name}",
+        )
+        st.caption("thumbnail.txt 에는 세트 1이, thumbnail_sets.txt 에는 모든 세트가 저장됩니다.")
+    for idx, option in enumerate(thumbnail_sets[selected_set], start=1):
         st.markdown(f"{idx}. {option}")
 
+    localized = script_bundle.get("localized") or {}
+    if localized:
+        st.subheader("🌐 다국어 대본")
+        tabs = st.tabs([SCRIPT_LANGUAGES.get(lang, lang) for lang in localized])
+        for tab, (lang, bundle) in zip(tabs, localized.items()):
+            with tab:
+                st.text_area(
+                    "대본", value=bundle["script"], height=220, key=f"script_{lang}_{output_dir.name}"
+                )
+                st.write(f"- Hook: {bundle.get('hook')}")
+                st.write(f"- CTA: {bundle.get('cta')}")
+                st.markdown("**썸네일 문구**")
+                for idx, option in enumerate(bundle.get("thumbnail_options", []), start=1):
+                    st.markdown(f"{idx}. {option}")
+                st.caption(bundle.get("description", ""))
+
     st.subheader("🔤 키워드 & Douyin 검색어")
     col1, col2 = st.columns(2)
     with col1:
@@ -560,6 +922,11 @@ def display_results(
     st.markdown("**Douyin 검색 쿼리 제안**")
     st.code("\n".join(keyword_payload.get("douyin_search_queries", [])) or "-", language="text")
 
+    display_reference_suggestions(
+        keyword_payload.get("chinese_keywords", []),
+        exclude={video.share_url for video in douyin_videos},
+    )
+
     if douyin_requested:
         st.subheader("📹 Douyin 레퍼런스 결과")
         if douyin_videos:
@@ -596,25 +963,86 @@ def display_results(
                 title = record.get("title") or "(제목 없음)"
                 duration = record.get("duration") or "-"
                 st.markdown(f"- **{title}** · 길이 {duration}초 · `{rel_path}`")
+                if record.get("duplicate_of"):
+                    st.caption(f"중복 영상: {record['duplicate_of']} 와 같은 클립 (파일 공유)")
+                derivatives = record.get("derivatives") or {}
+                if derivatives.get("error"):
+                    st.caption(f"편집용 파일 생성 실패: {derivatives['error']}")
+                elif derivatives:
+                    parts = [
+                        label
+                        for key, label in (("proxy", "프록시"), ("audio", "MP3"))
+                        if derivatives.get(key)
+                    ]
+                    parts.append(f"키프레임 {len(derivatives.get('keyframes', []))}장")
+                    st.caption("편집용: " + " · ".join(parts))
+                    if derivatives.get("contact_sheet"):
+                        st.image(derivatives["contact_sheet"], width=480)
         else:
             st.info("다운로드된 파일이 없습니다. Douyin 검색이 실패하면 자동 다운로드도 불가능합니다.")
 
+    display_downloads(output_dir)
+
+
+def display_downloads(output_dir: Path) -> None:
+    """Offer the output folder as an on-demand ZIP plus per-file downloads.
+
+    Rendering only lists file names; archive and file bytes are produced when a button is
+    clicked, so reruns cost the same however large the folder grows.
+    """
     st.subheader("📁 산출물 다운로드")
     mime_map = {
         ".txt": "text/plain",
         ".csv": "text/csv",
         ".json": "application/json",
     }
-
-    for file_path in sorted(output_dir.iterdir()):
-        if file_path.is_file():
-            with open(file_path, "rb") as file_obj:
-                st.download_button(
-                    label=f"다운로드 - {file_path.name}",
-                    data=file_obj,
-                    file_name=file_path.name,
-                    mime=mime_map.get(file_path.suffix.lower(), "application/octet-stream"),
-                )
+    files = sorted(path for path in output_dir.iterdir() if path.is_file())
+
+    def read_archive() -> bytes:
+        with archive_outputs(output_dir) as archive:
+            return archive.read()
+
+    if DEFERRED_DOWNLOADS:
+        st.download_button(
+            label="📦 전체 다운로드 (ZIP)",
+            data=read_archive,
+            file_name=f"{output_dir.name}.zip",
+            mime="application/zip",
+            on_click="ignore",
+            key=f"download_zip_{output_dir.name}",
+        )
+        for file_path in files:
+            st.download_button(
+                label=f"다운로드 - {file_path.name}",
+                data=file_path.read_bytes,
+                file_name=file_path.name,
+                mime=mime_map.get(file_path.suffix.lower(), "application/octet-stream"),
+                on_click="ignore",
+                key=f"download_{output_dir.name}_{file_path.name}",
+            )
+        return
+
+    # Older Streamlit: only the file the operator picks is read.
+    archive_label = "📦 전체 (ZIP)"
+    choice = st.selectbox(
+        "다운로드할 파일",
+        options=[archive_label, *(path.name for path in files)],
+        index=None,
+        placeholder="파일을 선택하면 다운로드 버튼이 나타납니다",
+        key=f"download_choice_{output_dir.name}",
+    )
+    if choice == archive_label:
+        st.download_button(
+            "다운로드 - ZIP", read_archive(), f"{output_dir.name}.zip", "application/zip"
+        )
+    elif choice is not None:
+        file_path = output_dir / choice
+        st.download_button(
+            label=f"다운로드 - {file_path.name}",
+            data=file_path.read_bytes(),
+            file_name=file_path.name,
+            mime=mime_map.get(file_path.suffix.lower(), "application/octet-stream"),
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,383 @@
+"""Concurrent-session load generator for the Streamlit app.
+
+Starts ``streamlit run app/main.py`` headless against the local fake LLM provider and drives
+N simultaneous websocket sessions the way a browser does: first load, form submit, fragment
+polling until the background job lands in the history, opening a history entry and
+re-viewing the result. Reports rerun latency percentiles per action, server memory growth
+per session and throughput. The app writes to a throwaway ``PROJECT_OUTPUT_ROOT`` and every
+run uses fresh product names, so operators' history and jobs are never touched::
+
+    python benchmarks/load_sessions.py --sessions 8 --rounds 2 --llm-latency-ms 500
+
+``AppTest`` is not used because it swaps process-global runtime state on every run and
+drops form submits when several instances run concurrently.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+APP_PATH = BASE_DIR / "app" / "main.py"
+SUBMIT_LABEL = "🚀 콘텐츠 자동 생성"
+PRODUCT_LABEL = "상품명 / 핵심 특징"
+HISTORY_LABEL = "이 결과 보기"
+ERROR_MARKER = "오류가 발생했습니다"
+
+
+@dataclass(slots=True)
+class LoadReport:
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    turnaround: list[float] = field(default_factory=list)
+    failures: list[str] = field(default_factory=list)
+
+    def add(self, action: str, elapsed_ms: float) -> None:
+        self.latencies.setdefault(action, []).append(elapsed_ms)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        rows = {}
+        for action, values in self.latencies.items():
+            ordered = sorted(values)
+            rows[action] = {
+                "runs": len(ordered),
+                "p50_ms": round(_percentile(ordered, 0.50), 1),
+                "p90_ms": round(_percentile(ordered, 0.90), 1),
+                "p99_ms": round(_percentile(ordered, 0.99), 1),
+                "max_ms": round(ordered[-1], 1),
+            }
+        return rows
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BrowserSession:
+    """Speaks the Streamlit websocket protocol for one simulated browser tab."""
+
+    def __init__(self, url: str, report: LoadReport) -> None:
+        self.url = url
+        self.report = report
+        self.query_string = ""
+        self.widgets: dict[str, list[str]] = {}
+        self.expanders: list[str] = []
+        self.alerts: list[str] = []
+        self.auto_rerun: tuple[float, str] | None = None
+        self._ws: Any = None
+
+    async def connect(self) -> None:
+        try:
+            import websockets
+        except ImportError as exc:
+            raise ImportError(
+                "websockets 패키지가 필요합니다. pip install websockets 로 설치하세요."
+            ) from exc
+
+        self._ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def rerun(
+        self,
+        action: str,
+        widget_states: list[Any] | None = None,
+        fragment_id: str = "",
+    ) -> float:
+        """Send one rerun request and wait until the script (or fragment) finishes."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ClientState_pb2 import ClientState
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+        if not fragment_id:
+            self.widgets, self.expanders, self.alerts = {}, [], []
+        message = BackMsg(
+            rerun_script=ClientState(
+                query_string=self.query_string,
+                widget_states=WidgetStates(widgets=widget_states or []),
+                fragment_id=fragment_id,
+                is_auto_rerun=bool(fragment_id),
+            )
+        )
+        started = time.perf_counter()
+        await self._ws.send(message.SerializeToString())
+        done = {
+            ForwardMsg.FINISHED_SUCCESSFULLY,
+            ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+            ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+        }
+        while True:
+            forward = ForwardMsg.FromString(await self._ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta":
+                self._collect(forward.delta)
+            elif kind == "page_info_changed":
+                self.query_string = forward.page_info_changed.query_string
+            elif kind == "auto_rerun":
+                self.auto_rerun = (forward.auto_rerun.interval, forward.auto_rerun.fragment_id)
+            elif kind == "stop_auto_rerun":
+                self.auto_rerun = None
+            elif kind == "script_finished" and forward.script_finished in done:
+                break
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.report.add(action, elapsed_ms)
+        return elapsed_ms
+
+    def _collect(self, delta: Any) -> None:
+        if delta.WhichOneof("type") == "add_block":
+            if delta.add_block.WhichOneof("type") == "expandable":
+                self.expanders.append(delta.add_block.expandable.label)
+            return
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind in ("text_input", "button"):
+            widget = getattr(element, kind)
+            self.widgets.setdefault(widget.label, []).append(widget.id)
+        elif kind == "alert":
+            self.alerts.append(element.alert.body)
+        elif kind == "exception":
+            self.report.failures.append(f"스크립트 예외: {element.exception.message}")
+
+    def widget_id(self, label: str) -> str | None:
+        ids = self.widgets.get(label)
+        return ids[0] if ids else None
+
+
+async def run_session(index: int, url: str, report: LoadReport, args: argparse.Namespace) -> None:
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    session = BrowserSession(url, report)
+    await session.connect()
+    try:
+        await session.rerun("first_load")
+        for round_index in range(args.rounds):
+            # Per-run names: a repeated name would be served from stage_cache/ without LLM calls.
+            product = f"부하테스트 {args.run_id} {index}-{round_index}"
+            text_id, submit_id = session.widget_id(PRODUCT_LABEL), session.widget_id(SUBMIT_LABEL)
+            if not text_id or not submit_id:
+                report.failures.append(f"session {index}: 입력 폼을 찾지 못했습니다")
+                return
+            await session.rerun(
+                "submit",
+                [
+                    WidgetState(id=text_id, string_value=product),
+                    WidgetState(id=submit_id, trigger_value=True),
+                ],
+            )
+            submitted_at = time.perf_counter()
+            while not any(product in label for label in session.expanders):
+                if any(ERROR_MARKER in alert and product in alert for alert in session.alerts):
+                    report.failures.append(f"session {index}: '{product}' 생성 실패")
+                    break
+                if time.perf_counter() - submitted_at > args.timeout:
+                    report.failures.append(f"session {index}: '{product}' 시간 초과")
+                    break
+                if session.auto_rerun:
+                    interval, fragment_id = session.auto_rerun
+                    await asyncio.sleep(interval)
+                    await session.rerun("poll", fragment_id=fragment_id)
+                else:
+                    await asyncio.sleep(args.poll_interval)
+                    await session.rerun("poll")
+            else:
+                report.turnaround.append(time.perf_counter() - submitted_at)
+
+            history_id = session.widget_id(HISTORY_LABEL)
+            if history_id:
+                await session.rerun("history", [WidgetState(id=history_id, trigger_value=True)])
+            await session.rerun("view_result")
+    finally:
+        await session.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_bytes(pid: int) -> int | None:
+    """Resident set size of ``pid`` (psutil when installed, /proc on Linux)."""
+    try:
+        import psutil
+    except ImportError:
+        status = Path(f"/proc/{pid}/status")
+        if not status.exists():
+            return None
+        for line in status.read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+        return None
+    return psutil.Process(pid).memory_info().rss
+
+
+def start_app(port: int, env: dict[str, str], timeout: float = 60.0) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            str(APP_PATH),
+            "--server.headless=true",
+            f"--server.port={port}",
+            "--server.address=127.0.0.1",
+            "--browser.gatherUsageStats=false",
+        ],
+        cwd=str(BASE_DIR),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2):
+                return process
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Streamlit 서버가 제한 시간 안에 시작되지 않았습니다.")
+
+
+async def drive(args: argparse.Namespace, url: str, report: LoadReport) -> None:
+    await asyncio.gather(
+        *(run_session(index, url, report, args) for index in range(args.sessions))
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Streamlit 동시 세션 부하 테스트")
+    parser.add_argument("--sessions", type=int, default=4, help="동시 세션 수")
+    parser.add_argument("--rounds", type=int, default=2, help="세션당 생성 요청 수")
+    parser.add_argument("--workers", type=int, default=2, help="GENERATION_WORKERS")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.3)
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="폴링 간격 (초)")
+    parser.add_argument("--timeout", type=float, default=180.0, help="작업당 최대 대기 (초)")
+    parser.add_argument(
+        "--output-root", type=Path, default=None, help="산출물 폴더 (기본: 임시 폴더, 종료 시 삭제)"
+    )
+    parser.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = parser.parse_args(argv)
+    args.run_id = uuid.uuid4().hex[:8]
+    output_root = args.output_root or Path(tempfile.mkdtemp(prefix="load_sessions_"))
+
+    sys.path.insert(0, str(BASE_DIR))
+    from core.fake_provider import FakeProviderConfig, start_fake_provider
+
+    server, provider = start_fake_provider(
+        FakeProviderConfig(latency_ms=args.llm_latency_ms, latency_sigma=args.llm_latency_sigma),
+        port=0,
+    )
+    host, fake_port = server.server_address[:2]
+    env = dict(
+        os.environ,
+        AI_PROVIDER="openai",
+        OPENAI_API_KEY="sk-load-test",
+        OPENAI_BASE_URL=f"http://{host}:{fake_port}/v1",
+        GENERATION_WORKERS=str(args.workers),
+        TRACING_ENABLED="false",
+        PROJECT_OUTPUT_ROOT=str(output_root),
+        # Load-test products differ only by index; the near-duplicate prompt would stop
+        # the submit from ever creating a job.
+        SIMILARITY_THRESHOLD="0",
+    )
+    port = _free_port()
+    app = start_app(port, env)
+    report = LoadReport()
+    try:
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        # Warm-up session so module imports and caches are not billed to the first user.
+        warmup = argparse.Namespace(**{**vars(args), "sessions": 1, "rounds": 0})
+        asyncio.run(drive(warmup, url, LoadReport()))
+        rss_before = _rss_bytes(app.pid)
+        started = time.perf_counter()
+        asyncio.run(drive(args, url, report))
+        wall_seconds = time.perf_counter() - started
+        rss_after = _rss_bytes(app.pid)
+    finally:
+        app.terminate()
+        app.wait(10)
+        server.shutdown()
+        if args.output_root is None:
+            shutil.rmtree(output_root, ignore_errors=True)
+
+    if report.turnaround and provider.stats.requests < len(report.turnaround):
+        report.failures.append(
+            f"생성 {len(report.turnaround)}건에 LLM 요청 {provider.stats.requests}회뿐입니다 "
+            "(단계 캐시 재사용 여부 확인)"
+        )
+    reruns = sum(len(values) for values in report.latencies.values())
+    memory_per_session = (
+        round((rss_after - rss_before) / 1024 / args.sessions, 1)
+        if rss_before is not None and rss_after is not None
+        else None
+    )
+    result = {
+        "sessions": args.sessions,
+        "rounds": args.rounds,
+        "wall_seconds": round(wall_seconds, 2),
+        "reruns_per_second": round(reruns / wall_seconds, 2),
+        "generations_per_minute": round(len(report.turnaround) * 60.0 / wall_seconds, 2),
+        "turnaround_p50_s": (
+            round(statistics.median(report.turnaround), 2) if report.turnaround else None
+        ),
+        "memory_per_session_kb": memory_per_session,
+        "server_rss_mb": round(rss_after / 1024 / 1024, 1) if rss_after else None,
+        "llm_requests": provider.stats.requests,
+        "latency": report.summary(),
+        "failures": report.failures,
+    }
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        _print_report(result)
+    return 1 if report.failures else 0
+
+
+def _print_report(result: dict[str, Any]) -> None:
+    print(
+        f"세션 {result['sessions']}개 × {result['rounds']}회 · {result['wall_seconds']}s · "
+        f"rerun {result['reruns_per_second']}/s · 생성 {result['generations_per_minute']}/분"
+    )
+    print(
+        f"작업 완료 p50 {result['turnaround_p50_s']}s · "
+        f"세션당 메모리 {result['memory_per_session_kb']} KB · "
+        f"서버 RSS {result['server_rss_mb']} MB · LLM 요청 {result['llm_requests']}회"
+    )
+    header = f"{'action':<14}{'runs':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for action, row in result["latency"].items():
+        print(
+            f"{action:<14}{row['runs']:>7}{row['p50_ms']:>10}{row['p90_ms']:>10}"
+            f"{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+    for failure in result["failures"]:
+        print(f"⚠️ {failure}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
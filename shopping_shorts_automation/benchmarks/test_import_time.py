@@ -0,0 +1,73 @@
+"""Import-time guard for the lazily loaded ``core`` package.
+
+Runs ``python -X importtime`` in a fresh interpreter so the measurement is not
+polluted by modules the test runner already imported.
+
+    python -m pytest benchmarks/test_import_time.py -q
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+
+# Cumulative import budget for the scenarios below, in microseconds. Generous
+# enough for slow CI machines, far below the ~1s the eager imports used to cost.
+IMPORT_BUDGET_US = int(os.environ.get("CORE_IMPORT_BUDGET_US", "400000"))
+
+HEAVY_MODULES = (
+    "selenium",
+    "webdriver_manager",
+    "yt_dlp",
+    "bs4",
+    "pandas",
+    "requests",
+    "streamlit",
+)
+
+
+def measure_import(statement: str) -> tuple[int, set[str]]:
+    """Return cumulative microseconds spent importing ``core`` and all loaded top-level modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    modules: set[str] = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.add(name.split(".")[0])
+        # Top-level entries (no indentation) under ``core`` carry the whole subtree cost.
+        raw_name = line.rsplit("|", 1)[1]
+        if raw_name.startswith(" core") and not raw_name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us, modules
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import core",
+        "import core; core.ScriptService; core.KeywordTranslator",
+        "import core; core.DouyinCrawler; core.DouyinCrawlerConfig; core.ChecklistBuilder",
+    ],
+)
+def test_core_import_stays_light(statement: str) -> None:
+    total_us, modules = measure_import(statement)
+    loaded_heavy = sorted(modules.intersection(HEAVY_MODULES))
+    assert not loaded_heavy, f"{statement!r} eagerly imported {loaded_heavy}"
+    assert total_us <= IMPORT_BUDGET_US, (
+        f"{statement!r} took {total_us / 1000:.1f} ms to import "
+        f"(budget {IMPORT_BUDGET_US / 1000:.0f} ms)"
+    )
@@ -0,0 +1,481 @@
+"""Offline throughput benchmarks for the generation pipeline.
+
+Replays recorded LLM responses and Douyin payloads (see ``conftest.py``) and stores
+results as JSON under ``benchmarks/.results`` for release-to-release comparison::
+
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Only timings live here; what each stage returns is checked by the plain tests in ``tests/``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from core.batch import BatchRunner, LocalBatchBackend
+from core.corpus import ReferenceCorpus
+from core.douyin_crawler import DouyinCrawler, DouyinCrawlerConfig
+from core.douyin_search import DouyinSearchRequest, DouyinVideo
+from core.file_manager import OutputManager, archive_outputs, save_outputs
+from core.fingerprint import phash, sample_frames
+from core.keyword_translator import KeywordTranslator
+from core.media import MEDIA_CACHE_DIRNAME, MediaPostProcessor
+from core.metrics import LLM_PARSE_FAILURES, LLM_RETRIES
+from core.openai_client import OpenAIClient
+from core.pipeline import GenerationOptions, run_generation
+from core.profiles import MIN_SAMPLES, StageProfiles
+from core.script_generator import ScriptRequest, ScriptService
+from core.services import ServiceContainer
+from core.similarity import ProductIndex
+from core.tracing import collect_spans, get_tracer, stage_breakdown
+from core.usage import collect_usage, summarize_usage
+from core.utils import ensure_json
+
+
+def measured(benchmark, stat: str = "mean") -> float | None:
+    """Seconds for ``stat``, or None under ``--benchmark-disable`` where no stats are kept."""
+    return getattr(benchmark.stats.stats, stat) if benchmark.stats else None
+
+
+def assert_within(benchmark, budget_s: float, stat: str = "mean") -> None:
+    seconds = measured(benchmark, stat)
+    assert seconds is None or seconds < budget_s, f"{stat} {seconds:.3f}s > {budget_s:.3f}s"
+
+
+def test_ensure_json_throughput(benchmark, llm_responses):
+    payloads = list(llm_responses.values())
+
+    benchmark(lambda: [ensure_json(payload) for payload in payloads])
+    benchmark.extra_info["payloads_per_round"] = len(payloads)
+
+
+def test_douyin_video_from_payload_throughput(benchmark, douyin_api_body):
+    items = json.loads(douyin_api_body)["data"]["items"] * 50
+
+    benchmark(lambda: [DouyinVideo.from_payload(item) for item in items])
+    benchmark.extra_info["payloads_per_round"] = len(items)
+
+
+def test_douyin_api_search_replay(benchmark, replay_search_service):
+    benchmark(replay_search_service.search, DouyinSearchRequest(keyword="无线耳机", max_results=10))
+
+
+def test_crawler_html_parse(benchmark, douyin_search_html):
+    crawler = DouyinCrawler(DouyinCrawlerConfig(max_results=30))
+
+    benchmark(crawler.parse_search_html, douyin_search_html)
+
+
+@pytest.mark.parametrize("block_resources", [False, True], ids=["full", "lean"])
+def test_crawler_page_profile(benchmark, chrome, heavy_search_site, block_resources):
+    """Before/after of the lean crawl profile: page load time, bytes fetched and JS heap."""
+    crawler = DouyinCrawler(
+        DouyinCrawlerConfig(
+            wait_seconds=1.0,
+            scroll_pause_seconds=0.1,
+            scroll_times=2,
+            max_results=30,
+            block_resources=block_resources,
+            search_url=f"{heavy_search_site.url}/search/{{keyword}}",
+        )
+    )
+    driver = crawler._build_driver()
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        benchmark.pedantic(
+            crawler.fetch_search_html, args=(driver, "无线耳机"), rounds=3, iterations=1
+        )
+        load_ms = driver.execute_script(
+            "const t = performance.timing; return t.loadEventEnd - t.navigationStart;"
+        )
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    finally:
+        driver.quit()
+
+    sent = heavy_search_site.bytes_sent
+    heap = next(metric["value"] for metric in metrics if metric["name"] == "JSHeapUsedSize")
+    benchmark.extra_info.update(
+        {
+            "page_load_ms": load_ms,
+            "kb_per_load": round(sum(sent.values()) / 3 / 1024, 1),
+            "kb_by_kind": {kind: round(size / 3 / 1024, 1) for kind, size in sent.items()},
+            "js_heap_mb": round(heap / 1_048_576, 1),
+        }
+    )
+
+
+def test_crawler_search_many_tabs(benchmark, chrome, heavy_search_site):
+    keywords = ["无线耳机", "降噪耳机", "蓝牙耳机推荐", "通勤耳机"]
+    crawler = DouyinCrawler(
+        DouyinCrawlerConfig(
+            wait_seconds=1.0,
+            scroll_pause_seconds=0.2,
+            scroll_times=3,
+            max_results=30,
+            max_tabs=4,
+            search_url=f"{heavy_search_site.url}/search/{{keyword}}",
+        )
+    )
+
+    benchmark.pedantic(crawler.search_many, args=(keywords,), rounds=2, iterations=1)
+    # One tab batch shares a single wait and scroll schedule instead of one per keyword.
+    sequential_s = len(keywords) * (1.0 + 3 * 0.2)
+    benchmark.extra_info["sequential_sleep_s"] = sequential_s
+    assert_within(benchmark, sequential_s)
+
+
+def test_download_prefetch(benchmark, tmp_path, video_page_site):
+    videos = [
+        DouyinVideo(
+            title=f"clip-{video_id}",
+            author="",
+            play_count=0,
+            digg_count=0,
+            duration=0.0,
+            share_url=f"{video_page_site.url}/video/{video_id}",
+            cover_url="",
+            aweme_id=video_id,
+        )
+        for video_id in video_page_site.videos
+    ]
+    crawler = DouyinCrawler(DouyinCrawlerConfig(download_limit=2, prefetch_workers=6))
+
+    benchmark.pedantic(
+        crawler.download, args=(videos, tmp_path), rounds=3, iterations=1, warmup_rounds=1
+    )
+    # Six 0.2s page probes overlap instead of running back to back.
+    assert_within(benchmark, len(videos) * video_page_site.latency_s, stat="median")
+
+
+def test_media_postprocess_pool_and_cache(benchmark, ffmpeg, tmp_path, tmp_paths):
+    download_dir = tmp_path / "douyin_media"
+    download_dir.mkdir()
+    for index in range(4):
+        subprocess.run(
+            [ffmpeg, "-hide_banner", "-loglevel", "error", "-y"]
+            + ["-f", "lavfi", "-i", f"testsrc2=size=720x1280:rate=30:duration={4 + index}"]
+            + ["-f", "lavfi", "-i", f"sine=frequency={440 + index * 110}:duration={4 + index}"]
+            + ["-g", "30", "-shortest", str(download_dir / f"clip-{index}.mp4")],
+            check=True,
+        )
+    shutil.copy(download_dir / "clip-0.mp4", download_dir / "clip-0-again.mp4")
+    records = [{"title": path.stem, "filepath": str(path)} for path in download_dir.glob("*.mp4")]
+    (download_dir / "downloads.json").write_text(json.dumps(records), encoding="utf-8")
+    processor = MediaPostProcessor.for_paths(tmp_paths)
+
+    def cold_then_warm():
+        shutil.rmtree(tmp_paths.output_root / MEDIA_CACHE_DIRNAME, ignore_errors=True)
+        processor.process(download_dir)
+        return processor.process(download_dir)
+
+    benchmark.pedantic(cold_then_warm, rounds=2, iterations=1)
+    benchmark.extra_info["workers"] = processor.workers
+
+
+def test_fingerprint_hashing(benchmark, ffmpeg, tmp_path):
+    clip = tmp_path / "clip.mp4"
+    source = "gradients=size=360x640:rate=30:speed=0.01:seed=7"
+    subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi", "-i", source]
+        + ["-t", "8", str(clip)],
+        check=True,
+    )
+
+    benchmark(lambda: phash(sample_frames(clip)))
+
+
+def test_output_manager_write_rate(benchmark, tmp_paths, llm_responses, script_request):
+    manager = OutputManager(tmp_paths)
+    output_dir = manager.create_output_dir(script_request.product_name)
+    bundle = ensure_json(llm_responses["script"])
+
+    def write_bundle():
+        manager.write_text(output_dir, "script.txt", [bundle["script"]])
+        manager.write_text(output_dir, "thumbnail.txt", ["a", "b", "c"])
+        manager.write_json(output_dir, "metadata.json", bundle)
+
+    benchmark(write_bundle)
+    benchmark.extra_info["files_per_round"] = 3
+
+
+def test_script_bundle_stage(benchmark, replay_llm, script_request):
+    benchmark(ScriptService(client=replay_llm).generate_bundle, script_request)
+
+
+def test_keyword_stage(benchmark, replay_llm, keyword_request):
+    benchmark(KeywordTranslator(client=replay_llm).translate, keyword_request)
+
+
+def test_script_bundle_over_fake_provider(benchmark, fake_provider, script_request):
+    benchmark(ScriptService().generate_bundle, script_request)
+
+
+def test_bundle_candidates_in_single_calls(benchmark, fake_provider, script_request):
+    service = ScriptService()
+
+    with collect_usage() as records:
+        benchmark(service.generate_bundle, script_request, candidates=3)
+    benchmark.extra_info["calls_per_round"] = len(records) / fake_provider.stats.stages["script"]
+
+
+def test_full_text_search(benchmark, tmp_paths, llm_responses, script_request):
+    manager = OutputManager(tmp_paths)
+    save_outputs(
+        output_manager=manager,
+        output_dir=manager.create_output_dir(script_request.product_name),
+        product_name=script_request.product_name,
+        script_bundle=ensure_json(llm_responses["script"]),
+        keyword_payload=ensure_json(llm_responses["keywords"]),
+        script_request=script_request,
+    )
+    index = manager.search_index()
+    filler = {
+        "script_bundle": {"hook": "장마철 신발 냄새 고민 끝", "script": "젖은 운동화도 뽀송하게"},
+        "keywords": {"korean_keywords": ["신발 건조기"], "chinese_keywords": ["鞋子烘干机"]},
+    }
+    index.add_many(
+        (tmp_paths.output_root / f"filler_{i}", {**filler, "product_name": f"건조기 {i}"}, None)
+        for i in range(20_000)
+    )
+
+    benchmark(index.search, "출근길 이어폰")
+    assert_within(benchmark, 0.01, stat="median")
+
+
+def test_output_archive_on_demand(benchmark, tmp_path, llm_responses):
+    output_dir = tmp_path / "product"
+    (output_dir / "douyin_media").mkdir(parents=True)
+    for name in ("script.txt", "thumbnail.txt", "keywords.txt", "metadata.json"):
+        (output_dir / name).write_text(llm_responses["script"] * 20, encoding="utf-8")
+    (output_dir / "douyin_media" / "clip.mp4").write_bytes(os.urandom(4 * 1024 * 1024))
+
+    def read_archive() -> bytes:
+        with archive_outputs(output_dir) as archive:
+            return archive.read()
+
+    benchmark(read_archive)
+
+
+def test_local_batch_round_trip(benchmark, tmp_paths, tmp_path):
+    products = [
+        GenerationOptions.from_dict(
+            {
+                "product_name": f"{name} {index}",
+                "target_audience": "25-40세 직장인",
+                "tone": "신뢰형",
+                "style": "문제 해결",
+                "language": "ko",
+            }
+        )
+        for index, name in enumerate(["무선 이어폰", "신발 건조기", "블루라이트 안경"] * 20)
+    ]
+    runner = BatchRunner(LocalBatchBackend(tmp_path / "backend"), tmp_paths, poll_interval=0.01)
+    runs = iter(range(1000))
+
+    benchmark.pedantic(
+        lambda: runner.run(products, work_dir=tmp_path / f"run{next(runs)}"), rounds=3
+    )
+    benchmark.extra_info["products_per_round"] = len(products)
+
+
+@pytest.fixture
+def generation_options(script_request) -> GenerationOptions:
+    return GenerationOptions(
+        product_name=script_request.product_name,
+        target_audience=script_request.target_audience,
+        tone=script_request.tone,
+        style=script_request.style,
+        language=script_request.language,
+    )
+
+
+def test_generation_memoized_rerun(benchmark, fake_provider, tmp_paths, generation_options):
+    services = ServiceContainer(tmp_paths)
+    run_generation(generation_options, services=services)
+
+    benchmark(run_generation, generation_options, services=services)
+
+
+def test_multi_language_fan_out(benchmark, fake_provider, tmp_paths, generation_options):
+    generation_options.extra_languages = ["en", "ja"]
+    generation_options.refresh_stages = True
+    services = ServiceContainer(tmp_paths)
+
+    result = benchmark.pedantic(
+        run_generation, args=(generation_options,), kwargs={"services": services}
+    )
+    by_stage = result["usage"]["by_stage"]
+    benchmark.extra_info.update(
+        full_run_tokens=sum(
+            by_stage[stage]["input_tokens"] + by_stage[stage]["output_tokens"]
+            for stage in ("script", "thumbnail")
+        ),
+        tokens_per_extra_language=round(
+            (by_stage["localize"]["input_tokens"] + by_stage["localize"]["output_tokens"]) / 2
+        ),
+    )
+
+
+def test_gemini_context_cache_over_fake_provider(
+    benchmark, fake_provider, monkeypatch, script_request
+):
+    monkeypatch.setenv("AI_PROVIDER", "gemini")
+    monkeypatch.setenv("GEMINI_API_KEY", "fake")
+    monkeypatch.setenv("GEMINI_API_ENDPOINT", os.environ["OPENAI_BASE_URL"].removesuffix("/v1"))
+    monkeypatch.setenv("GEMINI_REQUEST_INTERVAL", "0")
+    service = ScriptService()
+
+    with collect_usage() as records:
+        benchmark(service.generate_bundle, script_request)
+    benchmark.extra_info["cached_ratio"] = summarize_usage(records)["total"]["cached_ratio"]
+
+
+def test_structured_output_removes_parse_retries(
+    benchmark, fake_provider, monkeypatch, keyword_request
+):
+    from tenacity import wait_none
+
+    # Truncated replies are retried immediately here; production waits 4-60 s per retry.
+    monkeypatch.setattr(OpenAIClient.send_candidates.retry, "wait", wait_none())
+    fake_provider.config.malformed_rate = 0.3
+    rounds = 20
+
+    def translate_all(structured: str) -> dict[str, float]:
+        monkeypatch.setenv("LLM_STRUCTURED_OUTPUT", structured)
+        translator = KeywordTranslator()
+        mode = "schema" if structured == "true" else "prompt"
+        retries = LLM_RETRIES.total()
+        failures = LLM_PARSE_FAILURES.total(mode=mode)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            translator.translate(keyword_request)
+        return {
+            "seconds": time.perf_counter() - started,
+            "retries": LLM_RETRIES.total() - retries,
+            "parse_failures": LLM_PARSE_FAILURES.total(mode=mode) - failures,
+        }
+
+    prompt_only = translate_all("false")
+    structured = benchmark.pedantic(translate_all, args=("true",), rounds=1, iterations=1)
+    benchmark.extra_info.update(
+        prompt_only=prompt_only,
+        structured=structured,
+        # Backoff the retries would have slept at the minimum tenacity wait.
+        retry_wait_saved_s=4.0 * (prompt_only["retries"] - structured["retries"]),
+    )
+
+
+def test_stage_profiles_tune_output_caps(
+    benchmark, fake_provider, tmp_paths, script_request, keyword_request
+):
+    untuned = StageProfiles(tmp_paths.output_root)
+    service = ScriptService(profiles=untuned)
+    translator = KeywordTranslator(profiles=untuned)
+
+    def generate_product() -> list:
+        with collect_usage() as records:
+            service.generate_bundle(script_request)
+            translator.translate(keyword_request)
+        return records
+
+    for index in range(MIN_SAMPLES):
+        product_dir = tmp_paths.output_root / f"product-{index:02d}"
+        product_dir.mkdir(parents=True)
+        metadata = {"product_name": f"상품 {index}", "usage": summarize_usage(generate_product())}
+        (product_dir / "metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+    reserved_untuned = fake_provider.stats.reserved_tokens / MIN_SAMPLES
+
+    tuned = StageProfiles(tmp_paths.output_root)
+    service.profiles = translator.profiles = tuned
+    before = fake_provider.stats.reserved_tokens
+    benchmark.pedantic(generate_product, rounds=5, iterations=1)
+    benchmark.extra_info.update(
+        max_tokens={stage: tuned.get(stage).max_tokens for stage in ("script", "keywords")},
+        reserved_tokens_per_product={
+            "default": reserved_untuned,
+            "tuned": (fake_provider.stats.reserved_tokens - before) / 5,
+        },
+    )
+
+
+def test_end_to_end_products_per_minute(
+    benchmark, replay_llm, replay_search_service, tmp_paths, script_request, keyword_request
+):
+    script_service = ScriptService(client=replay_llm)
+    keyword_service = KeywordTranslator(client=replay_llm)
+    output_manager = OutputManager(tmp_paths)
+    last_spans = []
+
+    def generate_product():
+        with collect_spans() as spans, get_tracer().span("generation"):
+            bundle = script_service.generate_bundle(script_request)
+            keywords = keyword_service.translate(keyword_request)
+            videos = replay_search_service.search(
+                DouyinSearchRequest(keyword=keywords["chinese_keywords"][0], max_results=6)
+            )
+            save_outputs(
+                output_manager=output_manager,
+                output_dir=output_manager.create_output_dir(script_request.product_name),
+                product_name=script_request.product_name,
+                script_bundle=bundle,
+                keyword_payload=keywords,
+                script_request=script_request,
+                douyin_videos=videos,
+            )
+        last_spans[:] = spans
+
+    benchmark(generate_product)
+    benchmark.extra_info["stage_breakdown"] = stage_breakdown(last_spans)
+    seconds = measured(benchmark)
+    if seconds:
+        benchmark.extra_info["products_per_minute"] = round(60.0 / seconds, 1)
+
+
+def test_shared_services_lookup(benchmark, monkeypatch, tmp_paths):
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-benchmark")
+
+    benchmark(ServiceContainer(tmp_paths).script_service)
+
+
+def test_reference_corpus_query(benchmark, douyin_api_body, tmp_path):
+    items = json.loads(douyin_api_body)["data"]["items"]
+    corpus = ReferenceCorpus(tmp_path / "reference_corpus")
+    corpus.ingest([DouyinVideo.from_payload(item) for item in items], "无线耳机")
+
+    benchmark(corpus.query, keyword="无线耳机", min_plays=100_000, max_duration=40)
+
+
+def test_near_duplicate_lookup(benchmark, tmp_paths, llm_responses):
+    names = ["무선 이어폰", "블루투스 스피커", "무선 신발 건조기", "캠핑 의자", "무선 충전기"]
+    for index, name in enumerate(names * 40):
+        folder = tmp_paths.output_root / f"product_{index}"
+        folder.mkdir(parents=True)
+        (folder / "metadata.json").write_text(
+            json.dumps(
+                {
+                    "product_name": f"{name} {index}",
+                    "input": {"target_audience": "25-40세 직장인", "tone": "신뢰형"},
+                    "script_bundle": {"hook": "hook"},
+                    "keywords": ensure_json(llm_responses["keywords"]),
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+    index = ProductIndex.for_paths(tmp_paths)
+    request = ScriptRequest(
+        product_name="블루투스 무선이어폰 0",
+        target_audience="25-40세 직장인",
+        tone="신뢰형",
+        language="ko",
+        style="문제 해결",
+    )
+
+    benchmark(index.find_similar, request)
@@ -0,0 +1,318 @@
+"""Shared offline stand-ins for ``tests`` and ``benchmarks``.
+
+Everything here replays payloads recorded under ``benchmarks/fixtures`` so neither suite
+touches Gemini, OpenAI or Douyin.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import pytest
+
+from core.douyin_search import DouyinSearchService
+from core.keyword_translator import KeywordRequest
+from core.script_generator import ScriptRequest
+from core.utils import ProjectPaths
+
+PROJECT_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = PROJECT_DIR / "benchmarks" / "fixtures"
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")
+
+
+def load_fixture(name: str) -> Any:
+    path = FIXTURES_DIR / name
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+    return path.read_text(encoding="utf-8")
+
+
+class ReplayLLMClient:
+    """Drop-in for ``OpenAIClient`` returning recorded responses keyed by stage."""
+
+    provider = "replay"
+    model = "recorded"
+    temperature = 0.7
+
+    def __init__(self, responses: dict[str, str]) -> None:
+        self.responses = responses
+        self.calls: list[str] = []
+
+    def send(
+        self,
+        messages: Iterable[dict[str, Any]],
+        *,
+        stage: str = "default",
+        prompt_name: str | None = None,
+        parse: Callable[[str], Any] | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        list(messages)
+        self.calls.append(stage)
+        text = self.responses[stage]
+        return parse(text) if parse else text
+
+
+class ReplayResponse:
+    def __init__(self, payload: Any) -> None:
+        self._payload = payload
+        self.status_code = 200
+
+    def raise_for_status(self) -> None:
+        return None
+
+    def json(self) -> Any:
+        # Decode from text like requests does, so JSON parsing cost is included.
+        return json.loads(self._payload)
+
+
+class ReplaySession:
+    """Minimal ``requests.Session`` stand-in serving one recorded API body."""
+
+    def __init__(self, body: str) -> None:
+        self.body = body
+        self.headers: dict[str, str] = {}
+
+    def get(self, url: str, params: dict[str, Any] | None = None, timeout: float | None = None):
+        return ReplayResponse(self.body)
+
+
+# Stand-ins for the weight of a real search page: covers, one web font and an autoplay clip.
+HEAVY_ASSETS = {
+    ".jpeg": ("image/jpeg", 150_000, "image"),
+    ".woff2": ("font/woff2", 400_000, "font"),
+    ".mp4": ("video/mp4", 4_000_000, "media"),
+}
+HEAVY_HEAD = """
+<style>@font-face { font-family: Heavy; src: url(/static/heavy.woff2); }
+body { font-family: Heavy, sans-serif; }</style>
+<script>fetch("/aweme/v1/web/search/item/?keyword=x").then(r => r.json())
+  .then(data => { document.documentElement.dataset.apiItems = data.items.length; });</script>
+"""
+
+
+class HeavySearchSite:
+    """Local search page whose HTML is the recorded fixture plus heavy subresources."""
+
+    def __init__(self, html: str) -> None:
+        self.html = re.sub(r'src="https://[^"]+/(cover-\d+\.jpeg)"', r'src="/covers/\1"', html)
+        self.html = self.html.replace("</head>", f"{HEAVY_HEAD}</head>").replace(
+            "<body>", '<body><video src="/static/clip.mp4" autoplay muted preload="auto"></video>'
+        )
+        self.bytes_sent: Counter[str] = Counter()
+        self.url = ""
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                return None
+
+            def do_GET(self) -> None:
+                path = self.path.split("?", 1)[0]
+                if path.startswith("/search/"):
+                    kind, content_type, body = "document", "text/html", site.html.encode()
+                elif path.startswith("/aweme/"):
+                    kind, content_type, body = "api", "application/json", b'{"items": [1, 2, 3]}'
+                else:
+                    content_type, size, kind = HEAVY_ASSETS[Path(path).suffix]
+                    body = bytes(size)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                site.bytes_sent[kind] += len(body)
+
+        return Handler
+
+
+@pytest.fixture(scope="session")
+def script_request() -> ScriptRequest:
+    return ScriptRequest(
+        product_name="노이즈캔슬링 무선 이어폰",
+        target_audience="25-40세 직장인",
+        tone="신뢰형",
+        language="ko",
+        style="문제 해결",
+    )
+
+
+@pytest.fixture(scope="session")
+def keyword_request(script_request: ScriptRequest) -> KeywordRequest:
+    return KeywordRequest(
+        product_name=script_request.product_name,
+        target_audience=script_request.target_audience,
+        tone=script_request.tone,
+        style=script_request.style,
+    )
+
+
+@pytest.fixture
+def chrome() -> None:
+    if not any(shutil.which(name) for name in CHROME_BINARIES):
+        pytest.skip("Chrome가 설치되어 있지 않습니다.")
+
+
+@pytest.fixture
+def ffmpeg() -> str:
+    path = shutil.which("ffmpeg")
+    if not path:
+        pytest.skip("FFmpeg가 설치되어 있지 않습니다.")
+    return path
+
+
+@pytest.fixture(scope="session")
+def llm_responses() -> dict[str, str]:
+    return load_fixture("llm_responses.json")
+
+
+@pytest.fixture(scope="session")
+def douyin_api_body() -> str:
+    return (FIXTURES_DIR / "douyin_search_api.json").read_text(encoding="utf-8")
+
+
+@pytest.fixture(scope="session")
+def douyin_search_html() -> str:
+    return load_fixture("douyin_search_page.html")
+
+
+class VideoPageSite:
+    """Video pages carrying JSON-LD metadata that yt-dlp's generic extractor reads.
+
+    ``videos`` maps an id to (duration seconds, declared size bytes, extension); the media
+    files themselves are tiny so only the metadata differs.
+    """
+
+    def __init__(self, videos: dict[str, tuple[int, int, str]], latency_s: float = 0.2) -> None:
+        self.videos = videos
+        self.latency_s = latency_s
+        self.url = ""
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                return None
+
+            def do_GET(self) -> None:
+                video_id = Path(self.path).stem
+                if self.path.startswith("/media/"):
+                    content_type, body = f"video/{Path(self.path).suffix[1:]}", bytes(2048)
+                else:
+                    time.sleep(site.latency_s)  # page round trip, what prefetching overlaps
+                    duration, size, ext = site.videos[video_id]
+                    metadata = {
+                        "@context": "https://schema.org",
+                        "@type": "VideoObject",
+                        "name": f"clip-{video_id}",
+                        "contentUrl": f"{site.url}/media/{video_id}.{ext}",
+                        "duration": f"PT{duration}S",
+                        "contentSize": str(size),
+                        "width": 720,
+                        "height": 1280,
+                        "uploadDate": "2024-01-01",
+                    }
+                    content_type = "text/html"
+                    body = (
+                        "<html><head><title>clip</title><script type='application/ld+json'>"
+                        f"{json.dumps(metadata)}</script></head><body></body></html>"
+                    ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+@pytest.fixture
+def video_page_site():
+    megabyte = 1_048_576
+    site = VideoPageSite(
+        {
+            "1": (45, 12 * megabyte, "mp4"),
+            "2": (180, 20 * megabyte, "mp4"),
+            "3": (30, 120 * megabyte, "mp4"),
+            "4": (20, 5 * megabyte, "mp4"),
+            "5": (50, 8 * megabyte, "webm"),
+            "6": (40, 3 * megabyte, "mp4"),
+        }
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), site.handler())
+    site.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def heavy_search_site(douyin_search_html: str):
+    site = HeavySearchSite(douyin_search_html)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), site.handler())
+    site.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def replay_llm(llm_responses: dict[str, str]) -> ReplayLLMClient:
+    return ReplayLLMClient(llm_responses)
+
+
+@pytest.fixture
+def replay_search_service(douyin_api_body: str) -> DouyinSearchService:
+    service = DouyinSearchService()
+    service.session = ReplaySession(douyin_api_body)  # type: ignore[assignment]
+    return service
+
+
+@pytest.fixture
+def tmp_paths(tmp_path: Path) -> ProjectPaths:
+    return ProjectPaths(
+        base_dir=PROJECT_DIR,
+        prompts_dir=PROJECT_DIR / "prompts",
+        output_root=tmp_path / "project_output",
+    )
+
+
+@pytest.fixture(autouse=True)
+def _no_trace_export() -> None:
+    """Keep spans in memory only; stage timings are read through collect_spans."""
+    from core.metrics import MetricsSpanExporter
+    from core.tracing import Tracer, set_tracer
+
+    set_tracer(Tracer([MetricsSpanExporter()]))
+
+
+@pytest.fixture
+def fake_provider(monkeypatch: pytest.MonkeyPatch):
+    """Local OpenAI-compatible server (no latency or errors) wired into OpenAIClient."""
+    from core.fake_provider import FakeProviderConfig, start_fake_provider
+
+    server, provider = start_fake_provider(FakeProviderConfig(latency_ms=0.0, seed=0), port=0)
+    host, port = server.server_address[:2]
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://{host}:{port}/v1")
+    yield provider
+    server.shutdown()
+    server.server_close()
@@ -1,27 +1,79 @@
-"""Core services for the 쇼핑 쇼츠 반자동 제작 시스템."""
-
-from .script_generator import ScriptService, ScriptRequest
-from .keyword_translator import KeywordTranslator, KeywordRequest
-from .douyin_search import DouyinSearchRequest, DouyinSearchService, DouyinVideo
-from .douyin_crawler import DouyinCrawler, DouyinCrawlerConfig
-from .file_manager import OutputManager
-from .checklist_creator import ChecklistBuilder
-from .openai_client import OpenAIClient
-from .utils import ProjectPaths, slugify
-
-__all__ = [
-    "ScriptService",
-    "ScriptRequest",
-    "KeywordTranslator",
-    "KeywordRequest",
-    "DouyinSearchRequest",
-    "DouyinSearchService",
-    "DouyinVideo",
-    "DouyinCrawler",
-    "DouyinCrawlerConfig",
-    "OutputManager",
-    "ChecklistBuilder",
-    "OpenAIClient",
-    "ProjectPaths",
-    "slugify",
-]
+"""Core services for the 쇼핑 쇼츠 반자동 제작 시스템.
+
+Public names are resolved lazily (PEP 562) so that importing ``core`` stays cheap
+for batch workers and CLIs; each service module is only loaded on first access.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .batch import BatchRunner, LocalBatchBackend, OpenAIBatchBackend
+    from .checklist_creator import ChecklistBuilder
+    from .corpus import ReferenceCorpus
+    from .dag import Stage, StageGraph
+    from .douyin_crawler import DouyinCrawler, DouyinCrawlerConfig
+    from .douyin_search import DouyinSearchRequest, DouyinSearchService, DouyinVideo
+    from .file_manager import OutputManager, archive_outputs, save_outputs
+    from .fingerprint import FingerprintIndex
+    from .keyword_translator import KeywordRequest, KeywordTranslator
+    from .media import MediaPostProcessor
+    from .openai_client import OpenAIClient
+    from .profiles import StageProfile, StageProfiles
+    from .schemas import ResponseSchema
+    from .script_generator import ScriptRequest, ScriptService
+    from .search import SearchIndex
+    from .services import ServiceContainer, get_services
+    from .similarity import ProductIndex
+    from .utils import ProjectPaths, slugify
+
+_EXPORTS: dict[str, str] = {
+    "ScriptService": ".script_generator",
+    "ScriptRequest": ".script_generator",
+    "KeywordTranslator": ".keyword_translator",
+    "KeywordRequest": ".keyword_translator",
+    "DouyinSearchRequest": ".douyin_search",
+    "DouyinSearchService": ".douyin_search",
+    "DouyinVideo": ".douyin_search",
+    "DouyinCrawler": ".douyin_crawler",
+    "DouyinCrawlerConfig": ".douyin_crawler",
+    "OutputManager": ".file_manager",
+    "save_outputs": ".file_manager",
+    "archive_outputs": ".file_manager",
+    "ChecklistBuilder": ".checklist_creator",
+    "ReferenceCorpus": ".corpus",
+    "Stage": ".dag",
+    "StageGraph": ".dag",
+    "BatchRunner": ".batch",
+    "LocalBatchBackend": ".batch",
+    "OpenAIBatchBackend": ".batch",
+    "MediaPostProcessor": ".media",
+    "FingerprintIndex": ".fingerprint",
+    "OpenAIClient": ".openai_client",
+    "StageProfile": ".profiles",
+    "StageProfiles": ".profiles",
+    "ResponseSchema": ".schemas",
+    "SearchIndex": ".search",
+    "ServiceContainer": ".services",
+    "get_services": ".services",
+    "ProductIndex": ".similarity",
+    "ProjectPaths": ".utils",
+    "slugify": ".utils",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # cache so later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
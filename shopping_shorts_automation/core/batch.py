@@ -0,0 +1,649 @@
+"""Offline batch mode for bulk generation through the provider's Batch API.
+
+Products are compiled into Batch API JSONL (one ``/v1/chat/completions`` request per line,
+keyed by ``custom_id``) in two rounds: script + keywords, then thumbnails, which need the
+script's hook. Each round is submitted, polled, and its result file is streamed back through
+``ensure_json`` into ``OutputManager``. Batch jobs are billed at half price and do not count
+against the interactive RPM limits, at the cost of completing within hours instead of seconds.
+
+    python -m core.batch run products.csv --metrics-port 9100
+    python -m core.batch run products.jsonl --backend local      # file-based stand-in
+
+The input needs a ``product_name`` column/key; the other form fields use the UI defaults.
+Douyin search is not part of batch runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from .file_manager import OutputManager, save_outputs
+from .keyword_translator import KeywordRequest, KeywordTranslator
+from .metrics import LLM_BATCH_REQUESTS, LLM_TOKENS, start_metrics_server
+from .openai_client import provider_messages
+from .pipeline import GenerationOptions
+from .profiles import DEFAULT_PROFILES, StageProfile, StageProfiles
+from .schemas import (
+    KEYWORD_SCHEMA,
+    SCRIPT_SCHEMA,
+    THUMBNAIL_SCHEMA,
+    ResponseSchema,
+    structured_output_enabled,
+)
+from .script_generator import ScriptRequest, ScriptService
+from .usage import UsageRecord, estimate_cost, summarize_usage
+from .utils import ProjectPaths, ensure_json, get_config
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# OpenAI Batch API limit on requests per input file.
+MAX_REQUESTS_PER_BATCH = 50_000
+# Batch requests are billed at half the synchronous price.
+BATCH_PRICE_FACTOR = 0.5
+TERMINAL_STATES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+_STAGE_PROMPTS: dict[str, str] = {
+    "script": "script_prompt.txt",
+    "thumbnail": "thumbnail_prompt.txt",
+    "keywords": "translation_prompt.txt",
+}
+_STAGE_SCHEMAS: dict[str, ResponseSchema] = {
+    "script": SCRIPT_SCHEMA,
+    "thumbnail": THUMBNAIL_SCHEMA,
+    "keywords": KEYWORD_SCHEMA,
+}
+# Form defaults (app/main.py) for columns missing from the product file.
+_PRODUCT_DEFAULTS: dict[str, Any] = {
+    "target_audience": "25-40세 직장인",
+    "tone": "신뢰형",
+    "style": "문제 해결",
+    "language": "ko",
+    "brand_voice": "",
+    "candidates": 1,
+}
+
+
+@dataclass(slots=True)
+class BatchStatus:
+    batch_id: str
+    state: str
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """One line of a batch output file."""
+
+    custom_id: str
+    texts: list[str]
+    usage: dict[str, int] = field(default_factory=dict)
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class BatchReport:
+    products: int
+    saved: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    batches: list[str] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def batch_request(
+    custom_id: str,
+    model: str,
+    messages: list[dict[str, Any]],
+    stage: str,
+    n: int = 1,
+    profile: StageProfile | None = None,
+    structured: bool = True,
+) -> dict[str, Any]:
+    """One Batch API input line for a chat completion.
+
+    Temperature and ``max_tokens`` come from the stage ``profile``, as for interactive
+    calls (its model is not: one batch file uses one model). A cut-off batch reply cannot be
+    re-sent with a higher cap, so the configured cap is used instead of a tuned one.
+    ``structured`` adds the stage's JSON schema as ``response_format``.
+    """
+    profile = profile or DEFAULT_PROFILES[stage]
+    body: dict[str, Any] = {
+        "model": model,
+        "messages": provider_messages(messages),
+        "temperature": profile.temperature,
+        "max_tokens": profile.max_tokens_ceiling or profile.max_tokens,
+    }
+    if n > 1:
+        body["n"] = n
+    if structured:
+        body["response_format"] = _STAGE_SCHEMAS[stage].openai_response_format()
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def read_results(path: Path) -> Iterator[BatchResult]:
+    """Stream results from a batch output (or error) file, one line at a time."""
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            custom_id = str(row.get("custom_id", ""))
+            response = row.get("response") or {}
+            body = response.get("body") or {}
+            error = row.get("error") or body.get("error")
+            if error or response.get("status_code", 200) != 200:
+                message = error.get("message") if isinstance(error, dict) else str(error)
+                yield BatchResult(custom_id, [], error=message or "batch request failed")
+                continue
+            usage = body.get("usage") or {}
+            details = usage.get("prompt_tokens_details") or {}
+            yield BatchResult(
+                custom_id,
+                [
+                    (choice.get("message") or {}).get("content") or ""
+                    for choice in body.get("choices", [])
+                ],
+                usage={
+                    "input_tokens": int(usage.get("prompt_tokens") or 0),
+                    "output_tokens": int(usage.get("completion_tokens") or 0),
+                    "cached_tokens": int(details.get("cached_tokens") or 0),
+                },
+            )
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API (files + batches endpoints) with the app's key and base URL."""
+
+    provider = "openai"
+
+    def __init__(self, client: Any | None = None, model: str | None = None) -> None:
+        if client is None:
+            try:
+                from openai import OpenAI
+            except ImportError as exc:
+                raise ImportError(
+                    "openai 패키지가 필요합니다. pip install openai 로 설치하세요."
+                ) from exc
+            api_key = get_config("OPENAI_API_KEY")
+            if not api_key:
+                raise EnvironmentError("OPENAI_API_KEY 가 설정되지 않았습니다.")
+            client = OpenAI(api_key=api_key, base_url=get_config("OPENAI_BASE_URL") or None)
+        self.client = client
+        self.model = model or get_config("OPENAI_MODEL", "gpt-4o-mini")
+
+    def submit(self, input_path: Path, description: str = "") -> str:
+        with input_path.open("rb") as handle:
+            uploaded = self.client.files.create(file=handle, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"description": description} if description else None,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> BatchStatus:
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return BatchStatus(
+            batch_id=batch_id,
+            state=batch.status,
+            total=getattr(counts, "total", 0) or 0,
+            completed=getattr(counts, "completed", 0) or 0,
+            failed=getattr(counts, "failed", 0) or 0,
+        )
+
+    def download(self, batch_id: str, destination: Path) -> list[Path]:
+        batch = self.client.batches.retrieve(batch_id)
+        files = []
+        for suffix, file_id in (("output", batch.output_file_id), ("errors", batch.error_file_id)):
+            if not file_id:
+                continue
+            path = destination / f"{batch_id}.{suffix}.jsonl"
+            path.write_bytes(self.client.files.content(file_id).read())
+            files.append(path)
+        return files
+
+
+class LocalBatchBackend:
+    """File-based stand-in for the Batch API: same JSONL in and out, answered offline.
+
+    ``submit`` copies the input to ``root/<batch_id>/input.jsonl`` and a worker thread writes
+    ``output.jsonl`` in the OpenAI result format, answering with ``core.fake_provider``
+    payloads unless a ``responder`` is given.
+    """
+
+    provider = "local"
+
+    def __init__(
+        self,
+        root: Path,
+        responder: Callable[[dict[str, Any]], list[str]] | None = None,
+        delay_s: float = 0.0,
+        model: str = "local-batch",
+    ) -> None:
+        self.root = root
+        self.responder = responder or _fake_responder
+        self.delay_s = delay_s
+        self.model = model
+
+    def submit(self, input_path: Path, description: str = "") -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        batch_dir = self.root / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(input_path, batch_dir / "input.jsonl")
+        self._write_status(batch_dir, {"state": "in_progress", "description": description})
+        threading.Thread(
+            target=self._process, args=(batch_dir,), name=batch_id, daemon=True
+        ).start()
+        return batch_id
+
+    def status(self, batch_id: str) -> BatchStatus:
+        data = json.loads((self.root / batch_id / "status.json").read_text(encoding="utf-8"))
+        return BatchStatus(
+            batch_id=batch_id,
+            state=data["state"],
+            total=data.get("total", 0),
+            completed=data.get("completed", 0),
+            failed=data.get("failed", 0),
+        )
+
+    def download(self, batch_id: str, destination: Path) -> list[Path]:
+        output = self.root / batch_id / "output.jsonl"
+        if not output.exists():
+            return []
+        path = destination / f"{batch_id}.output.jsonl"
+        shutil.copyfile(output, path)
+        return [path]
+
+    def _process(self, batch_dir: Path) -> None:
+        time.sleep(self.delay_s)
+        total = completed = failed = 0
+        with (batch_dir / "input.jsonl").open(encoding="utf-8") as source, (
+            batch_dir / "output.jsonl"
+        ).open("w", encoding="utf-8") as sink:
+            for line in source:
+                if not line.strip():
+                    continue
+                total += 1
+                request = json.loads(line)
+                row: dict[str, Any] = {
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": request["custom_id"],
+                }
+                try:
+                    texts = self.responder(request["body"])
+                except Exception as exc:  # pylint: disable=broad-except - becomes an error line
+                    failed += 1
+                    row.update(response=None, error={"message": str(exc)})
+                else:
+                    completed += 1
+                    row.update(response=_local_response(request["body"], texts), error=None)
+                sink.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._write_status(
+            batch_dir,
+            {"state": "completed", "total": total, "completed": completed, "failed": failed},
+        )
+
+    @staticmethod
+    def _write_status(batch_dir: Path, data: dict[str, Any]) -> None:
+        temporary = batch_dir / "status.json.tmp"
+        temporary.write_text(json.dumps(data), encoding="utf-8")
+        temporary.replace(batch_dir / "status.json")
+
+
+def _fake_responder(body: dict[str, Any]) -> list[str]:
+    from .fake_provider import build_reply, detect_stage
+
+    prompt = "\n\n".join(str(message.get("content", "")) for message in body["messages"])
+    stage = detect_stage(prompt)
+    return [
+        json.dumps(build_reply(stage, prompt, variant), ensure_ascii=False)
+        for variant in range(int(body.get("n") or 1))
+    ]
+
+
+def _local_response(body: dict[str, Any], texts: list[str]) -> dict[str, Any]:
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in body["messages"])
+    completion_chars = sum(len(text) for text in texts)
+    return {
+        "status_code": 200,
+        "request_id": uuid.uuid4().hex,
+        "body": {
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [
+                {"index": index, "message": {"role": "assistant", "content": text}}
+                for index, text in enumerate(texts)
+            ],
+            "usage": {
+                "prompt_tokens": prompt_chars // 2,
+                "completion_tokens": completion_chars // 2,
+                "total_tokens": (prompt_chars + completion_chars) // 2,
+            },
+        },
+    }
+
+
+BatchBackend = OpenAIBatchBackend | LocalBatchBackend
+
+
+def load_products(path: Path) -> list[GenerationOptions]:
+    """Read products from a CSV or JSONL file (``product_name`` is required)."""
+    if path.suffix.lower() == ".csv":
+        with path.open(encoding="utf-8-sig", newline="") as handle:
+            rows = list(csv.DictReader(handle))
+    else:
+        rows = [
+            json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line
+        ]
+    products = []
+    for row in rows:
+        name = str(row.get("product_name") or "").strip()
+        if not name:
+            continue
+        data = {**_PRODUCT_DEFAULTS, **{key: value for key, value in row.items() if value}}
+        data["product_name"] = name
+        data["candidates"] = max(1, int(data["candidates"]))
+        products.append(GenerationOptions.from_dict(data))
+    return products
+
+
+def _script_request(options: GenerationOptions) -> ScriptRequest:
+    return ScriptRequest(
+        product_name=options.product_name,
+        target_audience=options.target_audience,
+        tone=options.tone,
+        style=options.style,
+        language=options.language,
+        brand_voice=options.brand_voice or None,
+    )
+
+
+class BatchRunner:
+    """Compile, submit and collect the two batch rounds for a list of products."""
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        paths: ProjectPaths | None = None,
+        poll_interval: float = 30.0,
+        on_status: Callable[[BatchStatus], None] | None = None,
+    ) -> None:
+        self.backend = backend
+        self.paths = paths or ProjectPaths.discover()
+        self.poll_interval = poll_interval
+        self.on_status = on_status
+        # Only prompt building and parsing are used; no provider client is created.
+        self.script_service = ScriptService()
+        self.keyword_translator = KeywordTranslator()
+        self.output_manager = OutputManager(self.paths)
+        self.structured_output = structured_output_enabled()
+        self.profiles = StageProfiles.for_paths(self.paths)
+
+    def run(self, products: list[GenerationOptions], work_dir: Path | None = None) -> BatchReport:
+        started = time.perf_counter()
+        work_dir = work_dir or (
+            self.paths.output_root / "batches" / datetime.now().strftime("%Y%m%d_%H%M%S")
+        )
+        work_dir.mkdir(parents=True, exist_ok=True)
+        report = BatchReport(products=len(products))
+        usage: dict[int, list[UsageRecord]] = {index: [] for index in range(len(products))}
+        scripts: dict[int, list[dict[str, Any]]] = {}
+        keywords: dict[int, dict[str, Any]] = {}
+
+        first_round = []
+        for index, options in enumerate(products):
+            first_round.append(
+                batch_request(
+                    f"{index}:script",
+                    self.backend.model,
+                    self.script_service.script_messages(_script_request(options)),
+                    "script",
+                    n=options.candidates,
+                    profile=self.profiles.get("script"),
+                    structured=self.structured_output,
+                )
+            )
+            first_round.append(
+                batch_request(
+                    f"{index}:keywords",
+                    self.backend.model,
+                    self.keyword_translator.messages(self._keyword_request(options)),
+                    "keywords",
+                    profile=self.profiles.get("keywords"),
+                    structured=self.structured_output,
+                )
+            )
+        for index, stage, texts, error in self._execute(
+            "round1", first_round, work_dir, report, usage
+        ):
+            if error:
+                report.failed[products[index].product_name] = f"{stage}: {error}"
+                continue
+            try:
+                if stage == "script":
+                    scripts[index] = self.script_service.parse_scripts(_parse_all(texts))
+                else:
+                    keywords[index] = self.keyword_translator.parse(texts[0])
+            except (ValueError, IndexError) as exc:
+                report.failed[products[index].product_name] = f"{stage}: {exc}"
+
+        second_round = [
+            batch_request(
+                f"{index}:thumbnail",
+                self.backend.model,
+                self.script_service.thumbnail_messages(
+                    _script_request(products[index]), scripts[index][0]["hook"]
+                ),
+                "thumbnail",
+                n=products[index].candidates,
+                profile=self.profiles.get("thumbnail"),
+                structured=self.structured_output,
+            )
+            for index in sorted(scripts)
+            if index in keywords
+        ]
+        saved: set[int] = set()
+        for index, _, texts, error in self._execute(
+            "round2", second_round, work_dir, report, usage
+        ):
+            options = products[index]
+            if error:
+                report.failed[options.product_name] = f"thumbnail: {error}"
+                continue
+            try:
+                thumbnail_sets = self.script_service.parse_thumbnail_sets(_parse_all(texts))
+            except ValueError as exc:
+                report.failed[options.product_name] = f"thumbnail: {exc}"
+                continue
+            bundle = self.script_service.assemble_bundle(
+                scripts[index], thumbnail_sets, options.candidates
+            )
+            output_dir = self.output_manager.create_output_dir(options.product_name)
+            save_outputs(
+                output_manager=self.output_manager,
+                output_dir=output_dir,
+                product_name=options.product_name,
+                script_bundle=bundle,
+                keyword_payload=keywords[index],
+                script_request=_script_request(options),
+                usage=summarize_usage(usage[index]),
+            )
+            report.saved.append(str(output_dir))
+            saved.add(index)
+
+        for index, options in enumerate(products):
+            if index not in saved and options.product_name not in report.failed:
+                report.failed[options.product_name] = "배치 결과가 없습니다."
+        report.elapsed_s = round(time.perf_counter() - started, 1)
+        (work_dir / "report.json").write_text(
+            json.dumps(report.as_dict(), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return report
+
+    @staticmethod
+    def _keyword_request(options: GenerationOptions) -> KeywordRequest:
+        return KeywordRequest(
+            product_name=options.product_name,
+            target_audience=options.target_audience,
+            tone=options.tone,
+            style=options.style,
+            language=options.language,
+        )
+
+    def _execute(
+        self,
+        name: str,
+        requests: list[dict[str, Any]],
+        work_dir: Path,
+        report: BatchReport,
+        usage: dict[int, list[UsageRecord]],
+    ) -> Iterator[tuple[int, str, list[str], str | None]]:
+        """Submit ``requests`` in chunks, wait, and yield ``(index, stage, texts, error)``."""
+        batch_ids = []
+        for start in range(0, len(requests), MAX_REQUESTS_PER_BATCH):
+            input_path = work_dir / f"{name}-{start // MAX_REQUESTS_PER_BATCH:03d}.jsonl"
+            _write_jsonl(input_path, requests[start : start + MAX_REQUESTS_PER_BATCH])
+            batch_ids.append(self.backend.submit(input_path, description=f"{work_dir.name}/{name}"))
+        report.batches.extend(batch_ids)
+
+        seen: set[str] = set()
+        for batch_id in self._wait(batch_ids):
+            for path in self.backend.download(batch_id, work_dir):
+                for result in read_results(path):
+                    index_text, _, stage = result.custom_id.partition(":")
+                    if not index_text.isdigit() or stage not in _STAGE_PROMPTS:
+                        continue
+                    seen.add(result.custom_id)
+                    if result.error or not result.texts:
+                        LLM_BATCH_REQUESTS.inc(stage=stage, status="error")
+                        yield int(index_text), stage, [], result.error or "빈 응답"
+                        continue
+                    LLM_BATCH_REQUESTS.inc(stage=stage, status="ok")
+                    usage[int(index_text)].append(
+                        self._usage_record(stage, result.usage, len(result.texts))
+                    )
+                    yield int(index_text), stage, result.texts, None
+        for request in requests:
+            if request["custom_id"] not in seen:
+                stage = request["custom_id"].partition(":")[2]
+                LLM_BATCH_REQUESTS.inc(stage=stage, status="missing")
+
+    def _wait(self, batch_ids: list[str]) -> Iterator[str]:
+        """Yield each batch id once it reaches a terminal state."""
+        pending = list(batch_ids)
+        while pending:
+            for batch_id in list(pending):
+                status = self.backend.status(batch_id)
+                if self.on_status:
+                    self.on_status(status)
+                if status.done:
+                    pending.remove(batch_id)
+                    yield batch_id
+            if pending:
+                time.sleep(self.poll_interval)
+
+    def _usage_record(
+        self, stage: str, usage: dict[str, int], candidates: int = 1
+    ) -> UsageRecord:
+        model = self.backend.model
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        cached_tokens = usage.get("cached_tokens", 0)
+        provider = f"{self.backend.provider}-batch"
+        LLM_TOKENS.inc(input_tokens, provider=provider, model=model, direction="in")
+        LLM_TOKENS.inc(output_tokens, provider=provider, model=model, direction="out")
+        cost = estimate_cost(model, input_tokens, output_tokens, cached_tokens)
+        return UsageRecord(
+            provider=provider,
+            model=model,
+            stage=stage,
+            prompt_name=_STAGE_PROMPTS[stage],
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            latency_ms=0.0,
+            cost_usd=round(cost * BATCH_PRICE_FACTOR, 6) if cost is not None else None,
+            cached_tokens=cached_tokens,
+            candidates=candidates,
+        )
+
+
+def _parse_all(texts: Iterable[str]) -> list[Any]:
+    payloads = []
+    for text in texts:
+        try:
+            payloads.append(ensure_json(text))
+        except ValueError:
+            continue
+    return payloads
+
+
+def _write_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch API 로 대량 콘텐츠 생성 (야간 일괄 처리)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run = subparsers.add_parser("run", help="상품 목록(CSV/JSONL)을 배치로 생성")
+    run.add_argument("products", type=Path, help="product_name 열/키가 있는 CSV 또는 JSONL")
+    run.add_argument("--backend", choices=("openai", "local"), default="openai")
+    run.add_argument("--poll-interval", type=float, default=60.0, help="상태 확인 간격 (초)")
+    run.add_argument("--work-dir", type=Path, default=None, help="JSONL/결과 파일 저장 경로")
+    run.add_argument("--metrics-port", type=int, default=0, help="/metrics 노출 포트 (0=끔)")
+    args = parser.parse_args(argv)
+
+    products = load_products(args.products)
+    if not products:
+        print("처리할 상품이 없습니다.")
+        return 1
+    paths = ProjectPaths.discover()
+    if args.backend == "local":
+        backend: BatchBackend = LocalBatchBackend(paths.output_root / "batches" / "local")
+    else:
+        backend = OpenAIBatchBackend()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    def on_status(status: BatchStatus) -> None:
+        print(
+            f"[{status.batch_id}] {status.state} "
+            f"{status.completed + status.failed}/{status.total} (실패 {status.failed})"
+        )
+
+    runner = BatchRunner(backend, paths, poll_interval=args.poll_interval, on_status=on_status)
+    report = runner.run(products, work_dir=args.work_dir)
+    print(
+        f"상품 {report.products}개 중 {len(report.saved)}개 저장, "
+        f"{len(report.failed)}건 실패 · {report.elapsed_s}s"
+    )
+    for name, error in report.failed.items():
+        print(f"  - {name}: {error}")
+    return 0 if not report.failed else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,8 +4,6 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
-import pandas as pd
-
 
 @dataclass(slots=True)
 class ChecklistItem:
@@ -38,6 +36,8 @@ class ChecklistBuilder:
 
     def export(self, output_dir: Path, items: Iterable[ChecklistItem]) -> Path:
         """Persist checklist items as UTF-8 CSV."""
+        import pandas as pd
+
         data = [
             {
                 "task": item.task,
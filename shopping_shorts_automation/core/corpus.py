@@ -0,0 +1,418 @@
+"""Deduplicated columnar corpus of Douyin reference videos.
+
+Every search result is appended to Parquet files partitioned as
+``reference_corpus/date=YYYY-MM-DD/keyword=<slug>/part-*.parquet``. A small SQLite index maps
+each video key (aweme id, falling back to the share URL) to its file and to every keyword it
+was found under, so ingest stores each video once and keyword queries only open the
+matching partitions::
+
+    python -m core.corpus query --keyword 无线耳机 --min-plays 1000000 --max-duration 40
+    python -m core.corpus backfill     # ingest douyin_videos from every saved product
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from .douyin_search import DouyinVideo, aweme_id_from_url
+from .tracing import traced
+from .utils import ProjectPaths, slugify
+
+CORPUS_DIRNAME = "reference_corpus"
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_key TEXT PRIMARY KEY,
+    aweme_id TEXT,
+    keyword TEXT NOT NULL,
+    file TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_aweme ON videos (aweme_id);
+CREATE INDEX IF NOT EXISTS idx_videos_keyword ON videos (keyword);
+CREATE TABLE IF NOT EXISTS video_keywords (
+    video_key TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    PRIMARY KEY (video_key, keyword)
+);
+CREATE INDEX IF NOT EXISTS idx_video_keywords_keyword ON video_keywords (keyword);
+"""
+
+
+def _require_pyarrow() -> tuple[Any, Any, Any]:
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError(
+            "레퍼런스 코퍼스에는 pyarrow 패키지가 필요합니다. pip install pyarrow 로 설치하세요."
+        ) from exc
+    return pa, ds, pq
+
+
+def video_key(video: DouyinVideo) -> str:
+    """Stable identity used for deduplication."""
+    aweme_id = video.aweme_id or aweme_id_from_url(video.share_url)
+    if aweme_id:
+        return aweme_id
+    return video.share_url or f"{video.author}|{video.title}"
+
+
+class ReferenceCorpus:
+    """Append-only Parquet store of search results with an aweme id / keyword index."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(root / "index.sqlite3"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_INDEX_SCHEMA)
+        with self._transaction() as conn:
+            # Indexes created before the keyword mapping existed: one keyword per video.
+            if conn.execute("SELECT 1 FROM video_keywords LIMIT 1").fetchone() is None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO video_keywords (video_key, keyword) "
+                    "SELECT video_key, keyword FROM videos"
+                )
+
+    @classmethod
+    def for_paths(cls, paths: ProjectPaths | None = None) -> "ReferenceCorpus":
+        paths = paths or ProjectPaths.discover()
+        return cls(paths.output_root / CORPUS_DIRNAME)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @traced("corpus.ingest")
+    def ingest(
+        self,
+        videos: Iterable[DouyinVideo],
+        keyword: str,
+        source: str = "api",
+        product_name: str = "",
+    ) -> int:
+        """Store videos not seen before and map every video to ``keyword``.
+
+        Returns how many videos were added; a video already stored under another keyword
+        is not written again but becomes queryable under ``keyword`` as well.
+        """
+        pa, _, pq = _require_pyarrow()
+        candidates: dict[str, DouyinVideo] = {}
+        for video in videos:
+            candidates.setdefault(video_key(video), video)
+        if not candidates:
+            return 0
+
+        now = time.time()
+        partition = self.root / f"date={date.today().isoformat()}" / f"keyword={slugify(keyword)}"
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO video_keywords (video_key, keyword) VALUES (?, ?)",
+                [(key, keyword) for key in candidates],
+            )
+            placeholders = ",".join("?" * len(candidates))
+            known = {
+                row[0]
+                for row in conn.execute(
+                    f"SELECT video_key FROM videos WHERE video_key IN ({placeholders})",
+                    list(candidates),
+                )
+            }
+            fresh = [(key, video) for key, video in candidates.items() if key not in known]
+            if not fresh:
+                return 0
+
+            rows = [
+                {
+                    "aweme_id": video.aweme_id or aweme_id_from_url(video.share_url),
+                    "keyword": keyword,
+                    "title": video.title,
+                    "author": video.author,
+                    "play_count": int(video.play_count),
+                    "digg_count": int(video.digg_count),
+                    "duration": float(video.duration),
+                    "share_url": video.share_url,
+                    "cover_url": video.cover_url,
+                    "source": source,
+                    "product_name": product_name,
+                    "ingested_at": now,
+                }
+                for _, video in fresh
+            ]
+            partition.mkdir(parents=True, exist_ok=True)
+            file_path = partition / f"part-{uuid.uuid4().hex[:12]}.parquet"
+            pq.write_table(pa.Table.from_pylist(rows, schema=self._schema(pa)), file_path)
+            relative = str(file_path.relative_to(self.root))
+            conn.executemany(
+                "INSERT INTO videos (video_key, aweme_id, keyword, file, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, row["aweme_id"], keyword, relative, now)
+                    for (key, _), row in zip(fresh, rows)
+                ],
+            )
+        return len(rows)
+
+    def _schema(self, pa: Any) -> Any:
+        return pa.schema(
+            [
+                ("aweme_id", pa.string()),
+                ("keyword", pa.string()),
+                ("title", pa.string()),
+                ("author", pa.string()),
+                ("play_count", pa.int64()),
+                ("digg_count", pa.int64()),
+                ("duration", pa.float64()),
+                ("share_url", pa.string()),
+                ("cover_url", pa.string()),
+                ("source", pa.string()),
+                ("product_name", pa.string()),
+                ("ingested_at", pa.float64()),
+            ]
+        )
+
+    def _files(self, keywords: Iterable[str] | None = None) -> tuple[list[str], list[str]]:
+        """Files to scan and, for a keyword filter, the video keys mapped to the keywords."""
+        with self._lock:
+            if keywords is None:
+                rows = self._conn.execute("SELECT DISTINCT file FROM videos").fetchall()
+                keys: list[str] = []
+            else:
+                keywords = list(keywords)
+                if not keywords:
+                    return [], []
+                mapped = self._conn.execute(
+                    "SELECT videos.video_key, videos.file FROM video_keywords "
+                    "JOIN videos ON videos.video_key = video_keywords.video_key "
+                    f"WHERE video_keywords.keyword IN ({','.join('?' * len(keywords))})",
+                    keywords,
+                ).fetchall()
+                keys = sorted({row[0] for row in mapped})
+                rows = sorted({(row[1],) for row in mapped})
+        files = [str(self.root / row[0]) for row in rows if (self.root / row[0]).exists()]
+        return files, keys
+
+    def query(
+        self,
+        keyword: str | list[str] | None = None,
+        text: str | None = None,
+        min_plays: int = 0,
+        max_duration: float | None = None,
+        min_duration: float | None = None,
+        limit: int = 20,
+        sort_by: str = "play_count",
+    ) -> list[dict[str, Any]]:
+        """Return rows ordered by ``sort_by`` (descending).
+
+        ``keyword`` prunes to the videos found under it through the index (their ``keyword``
+        column keeps the keyword they were first stored under); ``text`` is a
+        substring match on titles across the whole corpus. Videos with an unknown (0)
+        duration are excluded whenever a duration bound is given.
+        """
+        _, ds, _ = _require_pyarrow()
+        import pyarrow.compute as pc
+
+        keywords = [keyword] if isinstance(keyword, str) else keyword
+        files, keys = self._files(keywords)
+        if not files:
+            return []
+
+        condition = ds.field("play_count") >= min_plays
+        if keywords is not None:
+            # Partitions of other keywords also hold videos never found under these ones.
+            condition &= ds.field("aweme_id").isin(keys) | ds.field("share_url").isin(keys)
+        if max_duration is not None:
+            condition &= (ds.field("duration") > 0) & (ds.field("duration") <= max_duration)
+        if min_duration is not None:
+            condition &= ds.field("duration") >= min_duration
+        if text:
+            condition &= pc.match_substring(ds.field("title"), text)
+
+        table = ds.dataset(files, format="parquet").to_table(filter=condition)
+        if table.num_rows == 0:
+            return []
+        table = table.sort_by([(sort_by, "descending")]).slice(0, limit)
+        return table.to_pylist()
+
+    def get(self, aweme_id: str) -> dict[str, Any] | None:
+        """Look up one video by aweme id through the index."""
+        _, ds, _ = _require_pyarrow()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file FROM videos WHERE aweme_id = ? LIMIT 1", (aweme_id,)
+            ).fetchone()
+        if row is None or not (self.root / row[0]).exists():
+            return None
+        table = ds.dataset(str(self.root / row[0]), format="parquet").to_table(
+            filter=ds.field("aweme_id") == aweme_id
+        )
+        rows = table.to_pylist()
+        return rows[0] if rows else None
+
+    def suggest(
+        self, keywords: Iterable[str], limit: int = 5, min_plays: int = 0
+    ) -> list[DouyinVideo]:
+        """Best-performing stored references for any of ``keywords`` (no crawl needed)."""
+        keywords = [keyword for keyword in keywords if keyword]
+        rows = self.query(keyword=keywords, min_plays=min_plays, limit=limit)
+        if len(rows) < limit:
+            seen = {row["share_url"] for row in rows}
+            for keyword in keywords:
+                for row in self.query(text=keyword, min_plays=min_plays, limit=limit):
+                    if row["share_url"] not in seen and len(rows) < limit:
+                        seen.add(row["share_url"])
+                        rows.append(row)
+        return [_row_to_video(row) for row in rows]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            videos, files = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT file) FROM videos"
+            ).fetchone()
+            (keywords,) = self._conn.execute(
+                "SELECT COUNT(DISTINCT keyword) FROM video_keywords"
+            ).fetchone()
+        return {"videos": videos, "keywords": keywords, "files": files}
+
+    def compact(self) -> int:
+        """Merge each partition's small part files into one; return files removed."""
+        _, ds, pq = _require_pyarrow()
+        partitions: dict[Path, list[Path]] = {}
+        for path in self.root.glob("date=*/keyword=*/part-*.parquet"):
+            partitions.setdefault(path.parent, []).append(path)
+
+        removed = 0
+        for partition, parts in partitions.items():
+            if len(parts) < 2:
+                continue
+            table = ds.dataset([str(part) for part in parts], format="parquet").to_table()
+            merged = partition / f"part-{uuid.uuid4().hex[:12]}.parquet"
+            pq.write_table(table, merged)
+            old = [str(part.relative_to(self.root)) for part in parts]
+            with self._transaction() as conn:
+                conn.execute(
+                    f"UPDATE videos SET file = ? WHERE file IN ({','.join('?' * len(old))})",
+                    [str(merged.relative_to(self.root)), *old],
+                )
+            for part in parts:
+                part.unlink(missing_ok=True)
+            removed += len(parts) - 1
+        return removed
+
+
+def _row_to_video(row: dict[str, Any]) -> DouyinVideo:
+    return DouyinVideo(
+        title=row["title"],
+        author=row["author"],
+        play_count=row["play_count"],
+        digg_count=row["digg_count"],
+        duration=row["duration"],
+        share_url=row["share_url"],
+        cover_url=row["cover_url"],
+        aweme_id=row["aweme_id"],
+    )
+
+
+def backfill_from_outputs(corpus: ReferenceCorpus, output_root: Path) -> int:
+    """Ingest ``douyin`` results from every saved ``metadata.json`` under the output root."""
+    added = 0
+    for metadata_path in sorted(output_root.glob("*/metadata.json")):
+        try:
+            metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        videos = []
+        for item in metadata.get("douyin") or []:
+            try:
+                videos.append(DouyinVideo(**item))
+            except TypeError:
+                continue
+        product = metadata.get("product_name", "")
+        keyword = next(
+            (kw for kw in (metadata.get("keywords") or {}).get("chinese_keywords", []) if kw),
+            product,
+        )
+        added += corpus.ingest(videos, keyword, source="backfill", product_name=product)
+    return added
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Douyin 레퍼런스 코퍼스 조회/관리")
+    parser.add_argument("--root", type=Path, default=None, help="project_output 경로")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    query = subparsers.add_parser("query", help="조건에 맞는 레퍼런스 검색")
+    query.add_argument("--keyword", action="append", help="색인된 검색 키워드 (반복 지정 가능)")
+    query.add_argument("--text", help="제목 부분 일치")
+    query.add_argument("--min-plays", type=int, default=0)
+    query.add_argument("--max-duration", type=float, default=None, help="최대 길이 (초)")
+    query.add_argument("--min-duration", type=float, default=None, help="최소 길이 (초)")
+    query.add_argument(
+        "--sort", choices=("play_count", "digg_count", "ingested_at"), default="play_count"
+    )
+    query.add_argument("--limit", type=int, default=20)
+    query.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    subparsers.add_parser("backfill", help="저장된 산출물의 Douyin 결과를 코퍼스에 적재")
+    subparsers.add_parser("compact", help="파티션별 작은 Parquet 파일 병합")
+    subparsers.add_parser("stats", help="코퍼스 규모")
+    args = parser.parse_args(argv)
+
+    output_root = args.root or ProjectPaths.discover().output_root
+    corpus = ReferenceCorpus(output_root / CORPUS_DIRNAME)
+
+    if args.command == "backfill":
+        print(f"{backfill_from_outputs(corpus, output_root)}개 영상을 적재했습니다.")
+    elif args.command == "compact":
+        print(f"{corpus.compact()}개 파일을 병합했습니다.")
+    elif args.command == "stats":
+        print(json.dumps(corpus.stats(), ensure_ascii=False))
+    else:
+        _require_pyarrow()  # import cost is not part of the query time
+        started = time.perf_counter()
+        rows = corpus.query(
+            keyword=args.keyword,
+            text=args.text,
+            min_plays=args.min_plays,
+            max_duration=args.max_duration,
+            min_duration=args.min_duration,
+            limit=args.limit,
+            sort_by=args.sort,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        if args.json:
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+            return 0
+        for row in rows:
+            print(
+                f"{row['play_count']:>12,}  {row['duration']:>5.0f}s  {row['keyword']:<12} "
+                f"{row['title'][:40]}  {row['share_url']}"
+            )
+        print(f"{len(rows)}건 · {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,285 @@
+"""Small stage graph executor with memoized stages.
+
+Each :class:`Stage` declares the values it reads (``inputs``) and produces (``outputs``).
+:meth:`StageGraph.run` starts every stage whose inputs are available on a thread pool,
+so independent stages (script and keywords) overlap. Stages marked ``memoize`` store
+their output under ``project_output/stage_cache/<stage>/<input hash>.json``; a rerun
+with the same inputs loads it instead of calling the LLM again, so changing only the
+download options reruns just the Douyin stages.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from .metrics import STAGE_CACHE
+from .utils import ProjectPaths
+
+STAGE_CACHE_DIRNAME = "stage_cache"
+
+# (stage, state) where state is one of "running", "done", "cached", "skipped", "failed".
+ProgressCallback = Callable[[str, str], None]
+
+_MISS = object()
+
+
+class SkipStage(Exception):
+    """Raised by a stage function to mark itself skipped; its outputs take ``default``."""
+
+
+@dataclass(slots=True)
+class Stage:
+    """One node of the graph; ``func`` receives its inputs as keyword arguments.
+
+    A stage with several outputs returns them as a tuple in ``outputs`` order. Stages
+    whose outputs are already present in the initial values are reported as skipped.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    enabled: bool = True
+    # Output value(s) when the stage is disabled, skipped or failed with a ``warning``.
+    default: Any = None
+    memoize: bool = False
+    ttl_seconds: float | None = None
+    # JSON conversion of the output for the stage cache.
+    encode: Callable[[Any], Any] | None = None
+    decode: Callable[[Any], Any] | None = None
+    # When set, a failure becomes "<warning>: <error>" instead of failing the run.
+    warning: str = ""
+
+    @property
+    def output_names(self) -> tuple[str, ...]:
+        return self.outputs or (self.name,)
+
+
+@dataclass(slots=True)
+class GraphRun:
+    """Values after a run, the final state of every stage and collected warnings."""
+
+    values: dict[str, Any]
+    states: dict[str, str] = field(default_factory=dict)
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def cached(self) -> list[str]:
+        return [name for name, state in self.states.items() if state == "cached"]
+
+
+def _jsonable(value: Any) -> Any:
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"stage input is not hashable as JSON: {type(value).__name__}")
+
+
+def input_digest(stage: Stage, values: dict[str, Any], salt: str = "") -> str:
+    """Hash of the stage name, ``salt`` and every input value."""
+    payload = {
+        "stage": stage.name,
+        "salt": salt,
+        "inputs": {name: values[name] for name in stage.inputs},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_jsonable)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """One JSON file per (stage, input hash); writes are atomic renames."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    @classmethod
+    def for_paths(cls, paths: ProjectPaths | None = None) -> "StageCache":
+        return cls((paths or ProjectPaths.discover()).output_root / STAGE_CACHE_DIRNAME)
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage / f"{key}.json"
+
+    def get(self, stage: str, key: str, ttl_seconds: float | None = None) -> Any:
+        """Stored value, or the module's miss sentinel when absent or expired."""
+        try:
+            entry = json.loads(self._path(stage, key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return _MISS
+        if ttl_seconds is not None and time.time() - entry.get("created_at", 0) > ttl_seconds:
+            return _MISS
+        return entry.get("value")
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        entry = {"stage": stage, "created_at": time.time(), "value": value}
+        staging.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(staging, path)
+
+
+class StageGraph:
+    """Validated set of stages; run it any number of times with different values."""
+
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self.stages = list(stages)
+        producers: dict[str, str] = {}
+        for stage in self.stages:
+            for name in stage.output_names:
+                if name in producers:
+                    raise ValueError(f"'{name}' is produced by {producers[name]} and {stage.name}")
+                producers[name] = stage.name
+        self._check_acyclic(producers)
+
+    def _check_acyclic(self, producers: dict[str, str]) -> None:
+        depends = {
+            stage.name: {producers[name] for name in stage.inputs if name in producers}
+            for stage in self.stages
+        }
+        done: set[str] = set()
+        while len(done) < len(depends):
+            ready = [name for name, needs in depends.items() if name not in done and needs <= done]
+            if not ready:
+                raise ValueError(f"stage graph has a cycle: {sorted(set(depends) - done)}")
+            done.update(ready)
+
+    def run(
+        self,
+        values: dict[str, Any],
+        progress: ProgressCallback | None = None,
+        cache: StageCache | None = None,
+        salt: str = "",
+        refresh: bool = False,
+        max_workers: int = 4,
+    ) -> GraphRun:
+        """Execute every stage once; the first stage error without ``warning`` is raised.
+
+        ``refresh`` ignores cached outputs but still stores the new ones.
+        """
+        report = progress or (lambda stage, state: None)
+        run = GraphRun(values=dict(values))
+        pending = list(self.stages)
+        running: dict[Future, Stage] = {}
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+        try:
+            while pending or running:
+                pending = self._start_ready(
+                    pending, running, run, pool, report, cache, salt, refresh
+                )
+                if not running:
+                    if pending:
+                        missing = {
+                            stage.name: [name for name in stage.inputs if name not in run.values]
+                            for stage in pending
+                        }
+                        raise ValueError(f"stage inputs are never produced: {missing}")
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    result, state, warning = future.result()
+                    self._assign(stage, result, run)
+                    run.states[stage.name] = state
+                    if warning:
+                        run.warnings.append(warning)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return run
+
+    def _start_ready(
+        self,
+        pending: list[Stage],
+        running: dict[Future, Stage],
+        run: GraphRun,
+        pool: ThreadPoolExecutor,
+        report: ProgressCallback,
+        cache: StageCache | None,
+        salt: str,
+        refresh: bool,
+    ) -> list[Stage]:
+        """Submit or skip every stage whose inputs exist; return the ones still waiting."""
+        progressed = True
+        while progressed:
+            progressed = False
+            waiting: list[Stage] = []
+            for stage in pending:
+                if any(name not in run.values for name in stage.inputs):
+                    waiting.append(stage)
+                    continue
+                progressed = True
+                seeded = all(name in run.values for name in stage.output_names)
+                if seeded or not stage.enabled:
+                    if not seeded:
+                        self._assign(stage, stage.default, run)
+                    run.states[stage.name] = "skipped"
+                    report(stage.name, "skipped")
+                    continue
+                key = None
+                if stage.memoize and cache is not None:
+                    key = input_digest(stage, run.values, salt)
+                kwargs = {name: run.values[name] for name in stage.inputs}
+                # Copied context: spans and usage records land in the caller's collectors.
+                context = contextvars.copy_context()
+                future = pool.submit(
+                    context.run, _execute, stage, kwargs, cache, key, refresh, report
+                )
+                running[future] = stage
+            pending = waiting
+        return pending
+
+    @staticmethod
+    def _assign(stage: Stage, result: Any, run: GraphRun) -> None:
+        names = stage.output_names
+        if len(names) == 1:
+            run.values[names[0]] = result
+        else:
+            run.values.update(zip(names, result))
+
+
+def _execute(
+    stage: Stage,
+    kwargs: dict[str, Any],
+    cache: StageCache | None,
+    key: str | None,
+    refresh: bool,
+    report: ProgressCallback,
+) -> tuple[Any, str, str]:
+    if cache is not None and key is not None and not refresh:
+        stored = cache.get(stage.name, key, stage.ttl_seconds)
+        if stored is not _MISS:
+            STAGE_CACHE.inc(stage=stage.name, result="hit")
+            report(stage.name, "cached")
+            return (stage.decode(stored) if stage.decode else stored), "cached", ""
+        STAGE_CACHE.inc(stage=stage.name, result="miss")
+
+    report(stage.name, "running")
+    try:
+        result = stage.func(**kwargs)
+    except SkipStage:
+        report(stage.name, "skipped")
+        return stage.default, "skipped", ""
+    except Exception as exc:
+        report(stage.name, "failed")
+        if not stage.warning:
+            raise
+        return stage.default, "failed", f"{stage.warning}: {exc}"
+    report(stage.name, "done")
+
+    if cache is not None and key is not None:
+        try:
+            cache.put(stage.name, key, stage.encode(result) if stage.encode else result)
+        except (OSError, TypeError, ValueError):  # memoization is best-effort
+            pass
+    return result, "done", ""
@@ -2,22 +2,55 @@ from __future__ import annotations
 
 import json
 import os
+import queue
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Optional
 from urllib.parse import quote
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from webdriver_manager.chrome import ChromeDriverManager
-from yt_dlp import YoutubeDL
+from .corpus import video_key
+from .douyin_search import DouyinVideo, aweme_id_from_url
+from .metrics import DOUYIN_DOWNLOAD_BYTES, DOUYIN_DOWNLOADS, record_douyin_search
+from .tracing import get_tracer, traced
 
-from .douyin_search import DouyinVideo
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+    from .fingerprint import DuplicateMatch, FingerprintIndex
+
+# Selenium, webdriver-manager, BeautifulSoup and yt-dlp are imported inside the
+# methods that need them: they are only required once a crawl actually starts.
+
+# Resources the crawler never needs: covers/avatars, autoplay video segments and web fonts.
+# Document, script, XHR and fetch traffic (the rendered DOM and API JSON) is left alone.
+_BLOCKED_EXTENSIONS = (
+    "jpg jpeg png gif webp avif heic ico svg "  # covers, avatars, icons
+    "mp4 m4s m4a mp3 webm "  # autoplay video/audio segments
+    "woff woff2 ttf otf"  # web fonts
+)
+BLOCKED_URL_PATTERNS: tuple[str, ...] = tuple(
+    f"*.{extension}" for extension in _BLOCKED_EXTENSIONS.split()
+) + ("*douyinpic.com*", "*douyinvod.com*")
+
+
+def merge_search_results(results: Iterable[list[DouyinVideo]]) -> list[DouyinVideo]:
+    """Interleave per-keyword results (best of each keyword first), dropping duplicates."""
+    merged: list[DouyinVideo] = []
+    seen: set[str] = set()
+    lists = [list(videos) for videos in results]
+    for rank in range(max((len(videos) for videos in lists), default=0)):
+        for videos in lists:
+            if rank >= len(videos):
+                continue
+            video = videos[rank]
+            key = video.aweme_id or video.share_url
+            if key and key in seen:
+                continue
+            seen.add(key)
+            merged.append(video)
+    return merged
 
 
 @dataclass(slots=True)
@@ -31,16 +64,98 @@ class DouyinCrawlerConfig:
     max_results: int = 10
     download_limit: int = 3
     download_audio_only: bool = False
+    # MP3 conversion inside yt-dlp (serial); off when MediaPostProcessor extracts the audio.
+    convert_audio: bool = True
+    # Lean profile: skip images, media and fonts via Chrome prefs and CDP URL blocking.
+    block_resources: bool = True
+    blocked_url_patterns: tuple[str, ...] = BLOCKED_URL_PATTERNS
+    search_url: str = "https://www.douyin.com/search/{keyword}"
+    # Concurrent tabs used by search_many (one browser, keywords in batches of this size).
+    max_tabs: int = 4
+    # Download constraints checked on metadata before any media is fetched (0 disables).
+    max_duration_seconds: float = 60.0
+    max_filesize_mb: float = 50.0
+    min_height: int = 0
+    allowed_exts: tuple[str, ...] = ("mp4", "m4a", "mp3")
+    prefetch_limit: int = 12
+    prefetch_workers: int = 4
+
+
+@dataclass(slots=True)
+class MediaCandidate:
+    """Metadata of one video probed with yt-dlp without downloading it."""
+
+    video: DouyinVideo
+    duration: float | None = None
+    filesize: int | None = None
+    width: int | None = None
+    height: int | None = None
+    ext: str = ""
+    rejected: str = ""
+    info: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_info(cls, video: DouyinVideo, info: dict[str, Any]) -> "MediaCandidate":
+        # Merged video+audio downloads report their size per requested format.
+        formats = info.get("requested_formats") or [info]
+        sizes = [fmt.get("filesize") or fmt.get("filesize_approx") for fmt in formats]
+        filesize = sum(sizes) if all(sizes) else None
+        if filesize is None and info.get("tbr") and info.get("duration"):
+            filesize = int(info["tbr"] * 125 * info["duration"])  # kbit/s -> bytes
+        return cls(
+            video=video,
+            duration=info.get("duration"),
+            filesize=filesize,
+            width=info.get("width"),
+            height=info.get("height"),
+            ext=info.get("ext") or "",
+            info=info,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "url": self.video.share_url,
+            "duration": self.duration,
+            "filesize": self.filesize,
+            "resolution": f"{self.width}x{self.height}" if self.width and self.height else "",
+            "ext": self.ext,
+            "rejected": self.rejected,
+        }
+
+
+def _share_file(original: Path, target: Path) -> None:
+    """Replace ``target`` with a hard link to ``original``; keep it when linking fails."""
+    staging = target.with_name(f"{target.name}.link")
+    try:
+        staging.unlink(missing_ok=True)
+        os.link(original, staging)
+    except OSError:  # original deleted, another filesystem or no hard-link support
+        return
+    os.replace(staging, target)
 
 
 class DouyinCrawler:
     """Fetch Douyin video metadata via Selenium and download via yt-dlp."""
 
-    def __init__(self, config: DouyinCrawlerConfig | None = None) -> None:
+    def __init__(
+        self,
+        config: DouyinCrawlerConfig | None = None,
+        fingerprints: FingerprintIndex | None = None,
+    ) -> None:
         self.config = config or DouyinCrawlerConfig()
+        # Drops downloads that re-upload an already downloaded clip (see core.fingerprint).
+        self.fingerprints = fingerprints
         self.cookie = os.environ.get("DOUYIN_COOKIE")
+        # Idle YoutubeDL instances for metadata probes (building one costs ~0.1s of CPU).
+        self._probers: queue.SimpleQueue[Any] = queue.SimpleQueue()
 
+    @traced("douyin.crawler.build_driver")
     def _build_driver(self) -> webdriver.Chrome:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+
         options = Options()
         if self.config.headless:
             options.add_argument("--headless=new")
@@ -52,31 +167,121 @@ class DouyinCrawler:
             "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
             "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
         )
+        if self.config.block_resources:
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_argument("--autoplay-policy=user-gesture-required")
+            options.add_argument("--mute-audio")
+            options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=options)
+        if self.config.block_resources:
+            # Prefs cannot block media or fonts; CDP applies to every request of the page.
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd(
+                "Network.setBlockedURLs", {"urls": list(self.config.blocked_url_patterns)}
+            )
         if self.cookie:
             driver.get("https://www.douyin.com/")
             driver.execute_script("document.cookie = arguments[0];", self.cookie)
             time.sleep(1)
         return driver
 
+    @traced("douyin.crawler.search")
     def search(self, keyword: str) -> list[DouyinVideo]:
         """Perform Selenium search and return structured DouyinVideo list."""
         driver = self._build_driver()
-        encoded = quote(keyword)
-        url = f"https://www.douyin.com/search/{encoded}"
         try:
-            driver.get(url)
+            html = self.fetch_search_html(driver, keyword)
+        finally:
+            driver.quit()
+
+        videos = self.parse_search_html(html)
+        record_douyin_search("crawler", videos)
+        return videos
+
+    @traced("douyin.crawler.search_many")
+    def search_many(self, keywords: Iterable[str]) -> dict[str, list[DouyinVideo]]:
+        """Search several keywords in one browser, ``max_tabs`` tabs at a time."""
+        unique = list(dict.fromkeys(keyword.strip() for keyword in keywords if keyword.strip()))
+        results: dict[str, list[DouyinVideo]] = {}
+        if not unique:
+            return results
+
+        batch_size = max(1, self.config.max_tabs)
+        driver = self._build_driver()
+        try:
+            for start in range(0, len(unique), batch_size):
+                pages = self.fetch_search_pages(driver, unique[start : start + batch_size])
+                for keyword, html in pages.items():
+                    videos = self.parse_search_html(html)
+                    record_douyin_search("crawler", videos)
+                    results[keyword] = videos
+        finally:
+            driver.quit()
+        return results
+
+    def build_search_url(self, keyword: str) -> str:
+        return self.config.search_url.format(keyword=quote(keyword))
+
+    def fetch_search_pages(self, driver: webdriver.Chrome, keywords: list[str]) -> dict[str, str]:
+        """Load ``keywords`` in parallel tabs, scroll them in turn and return each tab's HTML.
+
+        The waits are shared: while one tab is scrolled the others keep loading and
+        rendering, so a batch costs about as much wall time as a single search.
+        """
+        home = driver.current_window_handle
+        tabs: dict[str, str] = {}
+        try:
+            for keyword in keywords:
+                driver.switch_to.new_window("tab")
+                tabs[keyword] = driver.current_window_handle
+                # Unlike driver.get(), assigning the location does not block on the page load.
+                driver.execute_script(
+                    "window.location.href = arguments[0];", self.build_search_url(keyword)
+                )
             time.sleep(self.config.wait_seconds)
 
+            with get_tracer().span(
+                "douyin.crawler.scroll", scroll_times=self.config.scroll_times, tabs=len(tabs)
+            ):
+                for _ in range(self.config.scroll_times):
+                    for handle in tabs.values():
+                        driver.switch_to.window(handle)
+                        driver.execute_script("window.scrollBy(0, window.innerHeight);")
+                    time.sleep(self.config.scroll_pause_seconds)
+
+            pages: dict[str, str] = {}
+            for keyword, handle in tabs.items():
+                driver.switch_to.window(handle)
+                pages[keyword] = driver.page_source
+            return pages
+        finally:
+            for handle in tabs.values():
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(home)
+
+    def fetch_search_html(self, driver: webdriver.Chrome, keyword: str) -> str:
+        """Load the search page in ``driver``, scroll it and return the rendered HTML."""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+
+        driver.get(self.build_search_url(keyword))
+        time.sleep(self.config.wait_seconds)
+
+        with get_tracer().span("douyin.crawler.scroll", scroll_times=self.config.scroll_times):
             body = driver.find_element(By.TAG_NAME, "body")
             for _ in range(self.config.scroll_times):
                 body.send_keys(Keys.PAGE_DOWN)
                 time.sleep(self.config.scroll_pause_seconds)
 
-            html = driver.page_source
-        finally:
-            driver.quit()
+        return driver.page_source
+
+    def parse_search_html(self, html: str) -> list[DouyinVideo]:
+        """Extract up to ``max_results`` videos from a rendered search results page."""
+        from bs4 import BeautifulSoup
 
         soup = BeautifulSoup(html, "html.parser")
         video_nodes = soup.select("div[role='listitem']") or soup.select("li[data-e2e='search-video-item']")
@@ -110,60 +315,182 @@ class DouyinCrawler:
                     duration=0.0,
                     share_url=share_url,
                     cover_url=cover_url,
+                    aweme_id=aweme_id_from_url(share_url),
                 )
             )
 
         return videos
 
-    def download(self, videos: Iterable[DouyinVideo], output_dir: Path) -> list[dict[str, str]]:
-        """Download selected videos using yt-dlp and return metadata."""
-        downloads: list[dict[str, str]] = []
-        download_dir = output_dir / "douyin_media"
-        download_dir.mkdir(parents=True, exist_ok=True)
-
-        ydl_opts = {
-            "outtmpl": str(download_dir / "%(title).80s.%(ext)s"),
+    def _ydl_options(self, download_dir: Path | None = None) -> dict[str, Any]:
+        ydl_opts: dict[str, Any] = {
             "quiet": True,
+            "no_warnings": True,
             "writesubtitles": False,
             "ignoreerrors": True,
         }
+        if download_dir is not None:
+            ydl_opts["outtmpl"] = str(download_dir / "%(title).80s.%(ext)s")
         if self.config.download_audio_only:
-            ydl_opts.update(
-                {
-                    "format": "bestaudio/best",
-                    "postprocessors": [
-                        {"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "192"}
-                    ],
-                }
+            ydl_opts["format"] = "bestaudio/best"
+            if self.config.convert_audio:
+                ydl_opts["postprocessors"] = [
+                    {
+                        "key": "FFmpegExtractAudio",
+                        "preferredcodec": "mp3",
+                        "preferredquality": "192",
+                    }
+                ]
+        return ydl_opts
+
+    @traced("douyin.crawler.prefetch")
+    def prefetch(self, videos: Iterable[DouyinVideo]) -> list[MediaCandidate]:
+        """Probe duration, size, resolution and format of ``videos`` in parallel."""
+        from yt_dlp import YoutubeDL
+
+        targets = [video for video in videos if video.share_url][: self.config.prefetch_limit]
+        if not targets:
+            return []
+
+        def probe(video: DouyinVideo) -> MediaCandidate:
+            # YoutubeDL instances are not thread-safe: each probe borrows an idle one.
+            try:
+                ydl = self._probers.get_nowait()
+            except queue.Empty:
+                ydl = YoutubeDL(self._ydl_options())
+            try:
+                info = ydl.extract_info(video.share_url, download=False)
+            except Exception:
+                info = None
+            finally:
+                self._probers.put(ydl)
+            if not info:
+                return MediaCandidate(video=video, rejected="메타데이터 조회 실패")
+            candidate = MediaCandidate.from_info(video, info)
+            candidate.rejected = self.rejection_reason(candidate)
+            return candidate
+
+        workers = max(1, min(self.config.prefetch_workers, len(targets)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="douyin-prefetch") as pool:
+            return list(pool.map(probe, targets))
+
+    def rejection_reason(self, candidate: MediaCandidate) -> str:
+        """Why ``candidate`` violates the download constraints ("" when it passes)."""
+        config = self.config
+        if config.max_duration_seconds and (candidate.duration or 0) > config.max_duration_seconds:
+            return f"길이 {candidate.duration:.0f}초 > {config.max_duration_seconds:.0f}초"
+        max_bytes = config.max_filesize_mb * 1_048_576
+        if max_bytes and (candidate.filesize or 0) > max_bytes:
+            return f"크기 {candidate.filesize / 1_048_576:.1f}MB > {config.max_filesize_mb:.0f}MB"
+        # Audio-only downloads are converted to MP3 by FFmpeg, whatever the source format.
+        if (
+            config.allowed_exts
+            and not config.download_audio_only
+            and candidate.ext
+            and candidate.ext not in config.allowed_exts
+        ):
+            return f"지원하지 않는 형식 {candidate.ext}"
+        if (
+            config.min_height
+            and not config.download_audio_only
+            and candidate.height
+            and candidate.height < config.min_height
+        ):
+            return f"해상도 {candidate.height}p < {config.min_height}p"
+        return ""
+
+    def select_downloads(self, candidates: list[MediaCandidate]) -> list[MediaCandidate]:
+        """Passing candidates in download order: most played first, smaller files on ties."""
+        passing = [candidate for candidate in candidates if not candidate.rejected]
+        passing.sort(
+            key=lambda candidate: (
+                -candidate.video.play_count,
+                candidate.filesize if candidate.filesize is not None else float("inf"),
             )
+        )
+        return passing
+
+    @traced("douyin.crawler.download")
+    def download(self, videos: Iterable[DouyinVideo], output_dir: Path) -> list[dict[str, str]]:
+        """Probe candidates, drop those breaking the constraints and download the best ones.
+
+        Near-duplicates of an already indexed clip are recorded with ``duplicate_of`` and
+        ``kept_path`` but do not count towards ``download_limit``.
+        """
+        from yt_dlp import YoutubeDL
+
+        downloads: list[dict[str, str]] = []
+        download_dir = output_dir / "douyin_media"
+        download_dir.mkdir(parents=True, exist_ok=True)
+
+        candidates = self.prefetch(videos)
+        for candidate in candidates:
+            if candidate.rejected:
+                DOUYIN_DOWNLOADS.inc(status="filtered")
 
-        with YoutubeDL(ydl_opts) as ydl:
-            for idx, video in enumerate(videos):
-                if idx >= self.config.download_limit:
+        kept = 0
+        with YoutubeDL(self._ydl_options(download_dir)) as ydl:
+            for candidate in self.select_downloads(candidates):
+                if kept >= self.config.download_limit:
                     break
-                if not video.share_url:
-                    continue
+                video = candidate.video
                 try:
-                    info = ydl.extract_info(video.share_url, download=True)
+                    with get_tracer().span("douyin.crawler.download_video", url=video.share_url):
+                        # Reuse the probed metadata (as --load-info-json does): no second
+                        # extraction round trip per download.
+                        info = ydl.process_ie_result(
+                            ydl.sanitize_info(candidate.info), download=True
+                        )
                 except Exception:
+                    DOUYIN_DOWNLOADS.inc(status="error")
+                    continue
+                if not info:
+                    # ignoreerrors=True makes yt-dlp return None instead of raising
+                    DOUYIN_DOWNLOADS.inc(status="error")
                     continue
                 filename = ydl.prepare_filename(info)
-                downloads.append(
-                    {
-                        "title": info.get("title") or video.title,
-                        "original_url": video.share_url,
-                        "filepath": filename,
-                        "thumbnail": info.get("thumbnail") or video.cover_url,
-                        "duration": info.get("duration"),
-                    }
-                )
+                if os.path.exists(filename):
+                    DOUYIN_DOWNLOAD_BYTES.inc(os.path.getsize(filename))
+                record = {
+                    "title": info.get("title") or video.title,
+                    "original_url": video.share_url,
+                    "filepath": filename,
+                    "thumbnail": info.get("thumbnail") or video.cover_url,
+                    "duration": info.get("duration"),
+                    "filesize": candidate.filesize,
+                    "resolution": candidate.as_dict()["resolution"],
+                }
+                duplicate = self._find_duplicate(Path(filename), video)
+                if duplicate is not None:
+                    # Same clip under another account: the record stays so this product's
+                    # folder is complete, but it shares the kept file's disk blocks and
+                    # leaves its download slot to another video.
+                    _share_file(Path(duplicate.path), Path(filename))
+                    record["duplicate_of"] = duplicate.video_key
+                    record["kept_path"] = duplicate.path
+                    DOUYIN_DOWNLOADS.inc(status="duplicate")
+                else:
+                    kept += 1
+                    DOUYIN_DOWNLOADS.inc(status="ok")
+                downloads.append(record)
 
+        probes = [candidate.as_dict() for candidate in candidates]
+        (download_dir / "prefetch.json").write_text(
+            json.dumps(probes, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
         (download_dir / "downloads.json").write_text(
             json.dumps(downloads, ensure_ascii=False, indent=2),
             encoding="utf-8",
         )
         return downloads
 
+    def _find_duplicate(self, path: Path, video: DouyinVideo) -> DuplicateMatch | None:
+        if self.fingerprints is None or not path.exists():
+            return None
+        try:
+            return self.fingerprints.check(path, video_key(video))
+        except Exception:  # pylint: disable=broad-except - best-effort (e.g. no FFmpeg)
+            return None
+
     @staticmethod
     def _parse_play_count(text: Optional[str]) -> int:
         if not text:
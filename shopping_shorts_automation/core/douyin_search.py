@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 import os
+import re
 from dataclasses import dataclass
 from typing import Any, Iterable, List
 
-import requests
+from .metrics import record_douyin_search
+from .tracing import traced
 
 DEFAULT_API_ENDPOINT = "https://www.iesdouyin.com/web/api/v2/search/item/"
+_AWEME_ID_PATTERN = re.compile(r"/(?:video|note)/(\d+)")
+
+
+def aweme_id_from_url(url: str) -> str:
+    """Extract the numeric aweme id from a Douyin video/note URL ("" if absent)."""
+    match = _AWEME_ID_PATTERN.search(url or "")
+    return match.group(1) if match else ""
 
 
 @dataclass(slots=True)
@@ -20,6 +29,7 @@ class DouyinVideo:
     duration: float
     share_url: str
     cover_url: str
+    aweme_id: str = ""
 
     @classmethod
     def from_payload(cls, payload: dict[str, Any]) -> "DouyinVideo":
@@ -38,6 +48,7 @@ class DouyinVideo:
             duration=duration,
             share_url=share_info.get("share_url", ""),
             cover_url=cover_urls[0] if cover_urls else "",
+            aweme_id=str(payload.get("aweme_id") or ""),
         )
 
     def as_dict(self) -> dict[str, Any]:
@@ -49,6 +60,7 @@ class DouyinVideo:
             "duration": self.duration,
             "share_url": self.share_url,
             "cover_url": self.cover_url,
+            "aweme_id": self.aweme_id,
         }
 
 
@@ -63,6 +75,8 @@ class DouyinSearchService:
     """Simple Douyin search client using public web API."""
 
     def __init__(self, endpoint: str = DEFAULT_API_ENDPOINT) -> None:
+        import requests
+
         self.endpoint = endpoint
         self.session = requests.Session()
         self.session.headers.update(
@@ -79,7 +93,10 @@ class DouyinSearchService:
         if cookie:
             self.session.headers["Cookie"] = cookie
 
+    @traced("douyin.search")
     def search(self, request: DouyinSearchRequest) -> list[DouyinVideo]:
+        import requests
+
         params = {
             "keyword": request.keyword,
             "count": request.max_results,
@@ -93,11 +110,13 @@ class DouyinSearchService:
             response = self.session.get(self.endpoint, params=params, timeout=10)
             response.raise_for_status()
         except requests.RequestException:
+            record_douyin_search("api", None, error=True)
             return []
 
         try:
             data = response.json()
         except ValueError:
+            record_douyin_search("api", None, error=True)
             return []
         root_items = data.get("data", {})
         items: Iterable[dict[str, Any]] = root_items.get("items") or root_items.get("item_list") or data.get("item_list", [])
@@ -108,4 +127,5 @@ class DouyinSearchService:
                 videos.append(DouyinVideo.from_payload(item))
             except Exception:  # pragma: no cover - defensive
                 continue
+        record_douyin_search("api", videos)
         return videos
@@ -0,0 +1,521 @@
+"""Local stand-in for the OpenAI and Gemini HTTP APIs used by ``OpenAIClient``.
+
+Serves ``POST /v1/chat/completions`` (OpenAI) and ``POST /v1beta/models/<model>:generateContent``
+(Gemini REST) with JSON that satisfies the ``prompts/`` contracts, plus configurable latency,
+429/5xx injection, malformed (truncated) JSON replies and token usage so rate limiting,
+retries and concurrency can be exercised offline. Requests that carry a response schema
+(OpenAI ``response_format``, Gemini ``responseSchema``) always get well-formed JSON; replies
+longer than the request's output cap are cut at it (``finish_reason="length"`` /
+``MAX_TOKENS``), and the caps are summed as reserved tokens (what token-per-minute limits
+count). Prompt caching is simulated too: a prompt prefix seen before is reported as cached
+tokens, and ``POST``/``DELETE /v1beta/cachedContents`` back Gemini context caching::
+
+    python -m core.fake_provider --port 8765 --latency-ms 800 --rate-limit-rate 0.1
+
+then point the app at it::
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1          # AI_PROVIDER=openai
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765         # AI_PROVIDER=gemini
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+_PRODUCT_PATTERN = re.compile(r"상품명:\s*(.+)")
+_HOOK_PATTERN = re.compile(r"훅 문구:\s*(.+)")
+_LANGUAGES_PATTERN = re.compile(r"대상 언어:\s*(.+)")
+# ScriptService.CANDIDATES_INSTRUCTION: several alternatives wrapped in one JSON object.
+_CANDIDATES_PATTERN = re.compile(r"JSON 객체 (\d+)개")
+_HOOK_TEMPLATES = (
+    "{product}, 아직도 고민 중이세요?",
+    "이거 하나로 {product} 고민 끝!",
+    "{product} 고를 때 이것만 보세요",
+)
+
+
+@dataclass(slots=True)
+class FakeProviderConfig:
+    """Behaviour knobs; rates are probabilities per request."""
+
+    latency_ms: float = 300.0
+    # Lognormal sigma around ``latency_ms`` (the median); 0 gives a fixed latency.
+    latency_sigma: float = 0.0
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    # Share of reply texts cut off mid-JSON when the request carries no response schema.
+    malformed_rate: float = 0.0
+    chars_per_token: float = 2.0
+    # Shared prompt prefixes shorter than this are not reported as cached (OpenAI: 1024).
+    cache_min_tokens: int = 0
+    seed: int | None = None
+
+
+@dataclass(slots=True)
+class FakeProviderStats:
+    requests: int = 0
+    responses: dict[str, int] = field(default_factory=dict)
+    stages: dict[str, int] = field(default_factory=dict)
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    structured: int = 0
+    malformed: int = 0
+    truncated: int = 0
+    reserved_tokens: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def detect_stage(prompt: str) -> str:
+    """Tell which ``prompts/`` template produced ``prompt``."""
+    if _LANGUAGES_PATTERN.search(prompt):
+        return "localize"
+    if "훅 문구:" in prompt:
+        return "thumbnail"
+    if "chinese_keywords" in prompt:
+        return "keywords"
+    return "script"
+
+
+def build_reply(stage: str, prompt: str, variant: int = 0) -> dict[str, Any]:
+    """Return a payload shaped like the JSON each prompt asks for.
+
+    ``variant`` varies the hook/thumbnail copy between candidates of one request.
+    """
+    match = _PRODUCT_PATTERN.search(prompt)
+    product = match.group(1).strip() if match else "추천 상품"
+    if stage == "localize":
+        languages_match = _LANGUAGES_PATTERN.search(prompt)
+        languages = languages_match.group(1).split(",") if languages_match else ["en"]
+        source = build_reply("script", prompt, variant)
+        return {
+            "translations": [
+                {
+                    **source,
+                    "language": language.strip(),
+                    "script": f"[{language.strip()}] {source['script']}",
+                    "hook": f"[{language.strip()}] {source['hook']}",
+                    "thumbnail_options": [f"[{language.strip()}] {product[:10]}"] * 3,
+                }
+                for language in languages
+            ]
+        }
+    if stage == "thumbnail":
+        hook_match = _HOOK_PATTERN.search(prompt)
+        hook = hook_match.group(1).strip() if hook_match else product
+        closers = ("이거 없이 어떻게 살았지?", "지금 안 사면 후회", "품절 전에 확인!")
+        return {
+            "options": [
+                hook[:15].rstrip(" ,"),
+                f"{product[:10]} 필수템",
+                closers[variant % len(closers)],
+            ]
+        }
+    if stage == "keywords":
+        return {
+            "korean_keywords": [
+                product,
+                f"{product} 추천",
+                f"가성비 {product}",
+                "쿠팡 추천템",
+                "생활 꿀템",
+            ],
+            "chinese_keywords": ["好物推荐", "实用好物", "居家必备", "性价比好物", "抖音爆款"],
+            "douyin_search_queries": ["好物推荐 测评", "实用好物 开箱", "抖音爆款 推荐"],
+        }
+    return {
+        "script": (
+            f"요즘 {product} 때문에 고민이셨죠? 이 제품 하나면 매일이 달라집니다. "
+            "쓰기 쉽고 관리도 간편해서 처음 쓰는 분도 바로 익숙해져요. "
+            "지금 링크에서 특가로 만나보세요!"
+        ),
+        "hook": _HOOK_TEMPLATES[variant % len(_HOOK_TEMPLATES)].format(product=product),
+        "cta": "지금 링크에서 특가 확인하세요!",
+        "talking_points": ["간편한 사용법", "뛰어난 가성비", "믿을 수 있는 품질"],
+        "description": (
+            f"{product} 하나로 일상이 편해져요! #{product.replace(' ', '')} #쿠팡추천 #생활꿀템"
+        ),
+        "duration_seconds": 30,
+    }
+
+
+class FakeProvider:
+    """Request-independent state shared by every handler thread."""
+
+    def __init__(self, config: FakeProviderConfig | None = None) -> None:
+        self.config = config or FakeProviderConfig()
+        self.stats = FakeProviderStats()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._recent_prompts: deque[str] = deque(maxlen=64)
+        self.cached_contents: dict[str, str] = {}
+
+    def draw(self) -> tuple[float, int]:
+        """Pick (latency seconds, HTTP status) for the next request."""
+        config = self.config
+        with self._lock:
+            self.stats.requests += 1
+            latency_ms = config.latency_ms
+            if config.latency_sigma > 0:
+                latency_ms *= self._random.lognormvariate(0.0, config.latency_sigma)
+            roll = self._random.random()
+            if roll < config.rate_limit_rate:
+                status = 429
+            elif roll < config.rate_limit_rate + config.error_rate:
+                status = self._random.choice((500, 503))
+            else:
+                status = 200
+        return latency_ms / 1000.0, status
+
+    def malform(self, texts: list[str], structured: bool) -> list[str]:
+        """Truncate some texts like a reply cut off by ``max_tokens`` (schema-free only)."""
+        with self._lock:
+            if structured:
+                self.stats.structured += 1
+                return texts
+            result = []
+            for text in texts:
+                if self._random.random() < self.config.malformed_rate:
+                    self.stats.malformed += 1
+                    text = text[: len(text) // 2]
+                result.append(text)
+            return result
+
+    def cap(self, texts: list[str], max_tokens: int | None) -> tuple[list[str], list[bool]]:
+        """Cut texts at ``max_tokens``; return them with a per-text "was cut" flag."""
+        if not max_tokens:
+            return texts, [False] * len(texts)
+        limit = int(max_tokens * self.config.chars_per_token)
+        cut = [len(text) > limit for text in texts]
+        with self._lock:
+            self.stats.reserved_tokens += max_tokens * len(texts)
+            self.stats.truncated += sum(cut)
+        return [text[:limit] for text in texts], cut
+
+    def count(self, stage: str, status: int) -> None:
+        with self._lock:
+            self.stats.stages[stage] = self.stats.stages.get(stage, 0) + 1
+            self.stats.responses[str(status)] = self.stats.responses.get(str(status), 0) + 1
+
+    def tokens(self, text: str) -> int:
+        return max(1, math.ceil(len(text) / self.config.chars_per_token))
+
+    def cached_prefix_tokens(self, prompt: str) -> int:
+        """Tokens of the longest prefix shared with a recent prompt (implicit caching)."""
+        with self._lock:
+            shared = max(
+                (len(os.path.commonprefix([prompt, seen])) for seen in self._recent_prompts),
+                default=0,
+            )
+            self._recent_prompts.append(prompt)
+        tokens = int(shared / self.config.chars_per_token)
+        return tokens if tokens >= max(1, self.config.cache_min_tokens) else 0
+
+    def record_tokens(self, input_tokens: int, cached_tokens: int) -> None:
+        with self._lock:
+            self.stats.input_tokens += input_tokens
+            self.stats.cached_tokens += cached_tokens
+
+
+class _FakeProviderHandler(BaseHTTPRequestHandler):
+    provider: FakeProvider
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] != "/stats":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        with self.provider._lock:
+            self._send_json(200, self.provider.stats.as_dict())
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+
+        if path.endswith("/chat/completions"):
+            messages = body.get("messages", [])
+            prompt = "\n\n".join(str(message.get("content", "")) for message in messages)
+            self._reply(
+                prompt,
+                lambda texts, usage, cut: self._openai_body(body, texts, usage, cut),
+                "openai",
+                candidates=int(body.get("n") or 1),
+                structured=(body.get("response_format") or {}).get("type") == "json_schema",
+                max_tokens=body.get("max_completion_tokens") or body.get("max_tokens"),
+            )
+        elif path.endswith(":generateContent"):
+            prompt = self._gemini_prompt(body)
+            generation_config = body.get("generationConfig") or {}
+            candidates = int(generation_config.get("candidateCount") or 1)
+            structured = bool(
+                generation_config.get("responseSchema") or generation_config.get("response_schema")
+            )
+            max_tokens = generation_config.get("maxOutputTokens")
+            cached_name = body.get("cachedContent") or body.get("cached_content")
+            if not cached_name:
+                self._reply(
+                    prompt,
+                    self._gemini_body,
+                    "gemini",
+                    candidates=candidates,
+                    structured=structured,
+                    max_tokens=max_tokens,
+                )
+                return
+            with self.provider._lock:
+                cached = self.provider.cached_contents.get(cached_name)
+            if cached is None:
+                message = f"{cached_name} not found"
+                payload = {"error": {"code": 404, "message": message, "status": "NOT_FOUND"}}
+                self._send_json(404, payload)
+                return
+            self._reply(
+                f"{cached}\n\n{prompt}",
+                self._gemini_body,
+                "gemini",
+                candidates=candidates,
+                cached_tokens=self.provider.tokens(cached),
+                structured=structured,
+                max_tokens=max_tokens,
+            )
+        elif path.endswith("/cachedContents"):
+            self._create_cached_content(body)
+        else:
+            self._send_json(404, {"error": {"message": f"unknown endpoint {path}"}})
+
+    def do_DELETE(self) -> None:  # noqa: N802 - http.server naming
+        _, found, cache_id = self.path.split("?", 1)[0].partition("/cachedContents/")
+        name = f"cachedContents/{cache_id}"
+        with self.provider._lock:
+            deleted = self.provider.cached_contents.pop(name, None) if found else None
+        if deleted is None:
+            self._send_json(404, {"error": {"code": 404, "message": f"{name} not found"}})
+            return
+        self._send_json(200, {})
+
+    @staticmethod
+    def _gemini_prompt(body: dict[str, Any]) -> str:
+        system = body.get("systemInstruction") or body.get("system_instruction") or {}
+        parts = [part.get("text", "") for part in system.get("parts", [])]
+        parts.extend(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        return "\n\n".join(parts)
+
+    def _create_cached_content(self, body: dict[str, Any]) -> None:
+        provider = self.provider
+        text = self._gemini_prompt(body)
+        tokens = provider.tokens(text)
+        if tokens < provider.config.cache_min_tokens:
+            message = f"Cached content is too small. total_token_count={tokens}"
+            payload = {"error": {"code": 400, "message": message, "status": "INVALID_ARGUMENT"}}
+            self._send_json(400, payload)
+            return
+        name = f"cachedContents/{uuid.uuid4().hex[:16]}"
+        with provider._lock:
+            provider.cached_contents[name] = text
+        ttl = float(str(body.get("ttl") or "3600s").rstrip("s"))
+        now = time.time()
+        self._send_json(
+            200,
+            {
+                "name": name,
+                "model": body.get("model", "models/fake"),
+                "createTime": _rfc3339(now),
+                "updateTime": _rfc3339(now),
+                "expireTime": _rfc3339(now + ttl),
+                "usageMetadata": {"totalTokenCount": tokens},
+            },
+        )
+
+    def _reply(
+        self,
+        prompt: str,
+        render: Callable[[list[str], tuple[int, int, int], list[bool]], dict],
+        protocol: str,
+        candidates: int = 1,
+        cached_tokens: int | None = None,
+        structured: bool = False,
+        max_tokens: int | None = None,
+    ) -> None:
+        provider = self.provider
+        stage = detect_stage(prompt)
+        latency, status = provider.draw()
+        time.sleep(latency)
+        provider.count(stage, status)
+        if status != 200:
+            self._send_error(status, protocol)
+            return
+        if cached_tokens is None:
+            cached_tokens = provider.cached_prefix_tokens(prompt)
+        wrapped = _CANDIDATES_PATTERN.search(prompt)
+        if wrapped:
+            payload = {
+                "candidates": [
+                    build_reply(stage, prompt, variant) for variant in range(int(wrapped.group(1)))
+                ]
+            }
+            texts = [json.dumps(payload, ensure_ascii=False)]
+        else:
+            texts = [
+                json.dumps(build_reply(stage, prompt, variant), ensure_ascii=False)
+                for variant in range(max(1, candidates))
+            ]
+        texts, cut = provider.cap(provider.malform(texts, structured), max_tokens)
+        input_tokens = provider.tokens(prompt)
+        output_tokens = sum(provider.tokens(text) for text in texts)
+        cached_tokens = min(cached_tokens, input_tokens)
+        provider.record_tokens(input_tokens, cached_tokens)
+        self._send_json(200, render(texts, (input_tokens, output_tokens, cached_tokens), cut))
+
+    def _openai_body(
+        self,
+        request: dict[str, Any],
+        texts: list[str],
+        usage: tuple[int, int, int],
+        cut: list[bool],
+    ) -> dict:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [
+                {
+                    "index": index,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "length" if was_cut else "stop",
+                }
+                for index, (text, was_cut) in enumerate(zip(texts, cut))
+            ],
+            "usage": {
+                "prompt_tokens": usage[0],
+                "completion_tokens": usage[1],
+                "total_tokens": usage[0] + usage[1],
+                "prompt_tokens_details": {"cached_tokens": usage[2]},
+            },
+        }
+
+    def _gemini_body(
+        self, texts: list[str], usage: tuple[int, int, int], cut: list[bool]
+    ) -> dict:
+        return {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "MAX_TOKENS" if was_cut else "STOP",
+                    "index": index,
+                }
+                for index, (text, was_cut) in enumerate(zip(texts, cut))
+            ],
+            "usageMetadata": {
+                "promptTokenCount": usage[0],
+                "candidatesTokenCount": usage[1],
+                "cachedContentTokenCount": usage[2],
+                "totalTokenCount": usage[0] + usage[1],
+            },
+        }
+
+    def _send_error(self, status: int, protocol: str) -> None:
+        message = "Rate limit exceeded" if status == 429 else "Injected server error"
+        if protocol == "gemini":
+            code = "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"
+            self._send_json(status, {"error": {"code": status, "message": message, "status": code}})
+        else:
+            kind = "rate_limit_exceeded" if status == 429 else "server_error"
+            self._send_json(status, {"error": {"message": message, "type": kind, "code": kind}})
+
+    def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - silence access log
+        return
+
+
+def _rfc3339(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def start_fake_provider(
+    config: FakeProviderConfig | None = None, port: int = 8765, host: str = "127.0.0.1"
+) -> tuple[ThreadingHTTPServer, FakeProvider]:
+    """Serve the fake provider from a daemon thread (``port=0`` picks a free port)."""
+    provider = FakeProvider(config)
+    handler = type("FakeProviderHandler", (_FakeProviderHandler,), {"provider": provider})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="fake-provider", daemon=True)
+    thread.start()
+    return server, provider
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="OpenAI/Gemini 호환 로컬 가짜 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="응답 지연 중앙값")
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="로그정규 분산 (0=고정)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500/503 응답 비율")
+    parser.add_argument(
+        "--malformed-rate", type=float, default=0.0, help="스키마 없는 요청의 잘린 JSON 응답 비율"
+    )
+    parser.add_argument("--chars-per-token", type=float, default=2.0, help="토큰 추정 기준")
+    parser.add_argument(
+        "--cache-min-tokens", type=int, default=0, help="캐시 적중으로 인정할 최소 접두 토큰 수"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = FakeProviderConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        chars_per_token=args.chars_per_token,
+        cache_min_tokens=args.cache_min_tokens,
+        seed=args.seed,
+    )
+    server, provider = start_fake_provider(config, port=args.port, host=args.host)
+    host, port = server.server_address[:2]
+    print(f"가짜 LLM 서버 실행 중: http://{host}:{port} (통계: /stats, 종료: Ctrl+C)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(provider.stats.as_dict(), ensure_ascii=False))
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,28 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import sqlite3
+import tempfile
+import threading
+import zipfile
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Iterable
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterable
 
+from .checklist_creator import ChecklistBuilder
+from .tracing import traced
 from .utils import ProjectPaths, slugify, today_stamp
 
+if TYPE_CHECKING:
+    from .douyin_search import DouyinVideo
+    from .script_generator import ScriptRequest
+    from .search import SearchIndex
+
+# Already-compressed formats are stored as-is in archives; deflating them only costs CPU.
+_STORED_SUFFIXES = frozenset(
+    {".mp4", ".mp3", ".m4a", ".webm", ".jpg", ".jpeg", ".png", ".webp", ".zip", ".parquet"}
+)
+
 
 @dataclass(slots=True)
 class OutputContext:
@@ -24,6 +40,24 @@ class OutputManager:
     def __init__(self, paths: ProjectPaths | None = None) -> None:
         self.paths = paths or ProjectPaths.discover()
         self.paths.output_root.mkdir(parents=True, exist_ok=True)
+        self._search_index: SearchIndex | None = None
+        self._search_lock = threading.Lock()
+
+    def search_index(self) -> SearchIndex:
+        """Full-text index of saved products, opened on first use (see core.search)."""
+        with self._search_lock:
+            if self._search_index is None:
+                from .search import SearchIndex
+
+                self._search_index = SearchIndex.for_paths(self.paths)
+            return self._search_index
+
+    def close(self) -> None:
+        """Close the search index if it was opened; the next use reopens it."""
+        with self._search_lock:
+            if self._search_index is not None:
+                self._search_index.close()
+                self._search_index = None
 
     def create_output_dir(self, product_name: str) -> Path:
         folder_name = f"{slugify(product_name)}_{today_stamp()}"
@@ -41,3 +75,156 @@ class OutputManager:
         path = output_dir / filename
         path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
         return path
+
+
+def language_filename(filename: str, language: str) -> str:
+    """``script.txt`` -> ``script_en.txt``, like ``keywords_zh.txt``."""
+    path = Path(filename)
+    return f"{path.stem}_{language}{path.suffix}"
+
+
+@traced("outputs.save")
+def save_outputs(
+    output_manager: OutputManager,
+    output_dir: Path,
+    product_name: str,
+    script_bundle: dict[str, Any],
+    keyword_payload: dict[str, Any],
+    script_request: ScriptRequest,
+    douyin_videos: list[DouyinVideo] | None = None,
+    douyin_downloads: list[dict[str, Any]] | None = None,
+    usage: dict[str, Any] | None = None,
+    reused_from: str | None = None,
+) -> None:
+    """Persist generated artefacts and checklist.
+
+    Languages under ``script_bundle["localized"]`` get their own ``script_<lang>.txt``,
+    ``thumbnail_<lang>.txt`` and ``description_<lang>.txt``. With several candidates,
+    ``script.txt``/``thumbnail.txt`` hold the first one and every alternative is written to
+    ``script_candidates.txt`` and ``thumbnail_sets.txt``.
+    """
+    output_manager.write_text(output_dir, "script.txt", [script_bundle["script"]])
+    output_manager.write_text(
+        output_dir,
+        "thumbnail.txt",
+        script_bundle.get("thumbnail_options", []),
+    )
+    candidates = script_bundle.get("candidates") or []
+    if len(candidates) > 1:
+        output_manager.write_text(output_dir, "script_candidates.txt", _candidate_lines(candidates))
+    thumbnail_sets = script_bundle.get("thumbnail_sets") or []
+    if len(thumbnail_sets) > 1:
+        output_manager.write_text(
+            output_dir, "thumbnail_sets.txt", _thumbnail_set_lines(thumbnail_sets)
+        )
+    for language, localized in (script_bundle.get("localized") or {}).items():
+        output_manager.write_text(
+            output_dir, language_filename("script.txt", language), [localized["script"]]
+        )
+        output_manager.write_text(
+            output_dir,
+            language_filename("thumbnail.txt", language),
+            localized.get("thumbnail_options", []),
+        )
+        output_manager.write_text(
+            output_dir,
+            language_filename("description.txt", language),
+            [localized.get("description", "")],
+        )
+    output_manager.write_text(
+        output_dir,
+        "keywords.txt",
+        keyword_payload.get("korean_keywords", []),
+    )
+    output_manager.write_text(
+        output_dir,
+        "keywords_zh.txt",
+        keyword_payload.get("chinese_keywords", []),
+    )
+    output_manager.write_text(
+        output_dir,
+        "douyin_queries.txt",
+        keyword_payload.get("douyin_search_queries", []),
+    )
+    if douyin_videos:
+        output_manager.write_json(
+            output_dir,
+            "douyin_videos.json",
+            [video.as_dict() for video in douyin_videos],
+        )
+        output_manager.write_text(
+            output_dir,
+            "douyin_links.txt",
+            [video.share_url for video in douyin_videos if video.share_url],
+        )
+    if douyin_downloads:
+        output_manager.write_json(
+            output_dir,
+            "douyin_downloads.json",
+            douyin_downloads,
+        )
+
+    metadata = {
+        "product_name": product_name,
+        "slug": slugify(product_name),
+        "input": asdict(script_request),
+        "script_bundle": script_bundle,
+        "keywords": keyword_payload,
+        "douyin": [video.as_dict() for video in douyin_videos] if douyin_videos else [],
+        "douyin_downloads": douyin_downloads or [],
+        "usage": usage or {},
+        "reused_from": reused_from,
+    }
+    output_manager.write_json(output_dir, "metadata.json", metadata)
+    try:
+        output_manager.search_index().add(output_dir, metadata)
+    except (sqlite3.Error, OSError):  # search is best-effort; `python -m core.search rebuild`
+        pass
+
+    checklist_builder = ChecklistBuilder()
+    checklist_items = checklist_builder.build()
+    checklist_builder.export(output_dir, checklist_items)
+
+
+def _candidate_lines(candidates: list[dict[str, Any]]) -> list[str]:
+    lines: list[str] = []
+    for index, candidate in enumerate(candidates, start=1):
+        lines += [
+            f"[후보 {index}] Hook: {candidate.get('hook', '')}",
+            candidate.get("script", ""),
+            f"CTA: {candidate.get('cta', '')}",
+            f"설명: {candidate.get('description', '')}",
+            "",
+        ]
+    return lines
+
+
+def _thumbnail_set_lines(thumbnail_sets: list[list[str]]) -> list[str]:
+    lines: list[str] = []
+    for index, options in enumerate(thumbnail_sets, start=1):
+        lines.append(f"[세트 {index}]")
+        lines += [f"{number}. {option}" for number, option in enumerate(options, start=1)]
+        lines.append("")
+    return lines
+
+
+@traced("outputs.archive")
+def archive_outputs(output_dir: Path) -> BinaryIO:
+    """Zip everything under ``output_dir`` (media folders included), rewound for reading.
+
+    The archive is spooled to a temporary file once it outgrows 32 MB. The caller owns the
+    returned file and should close it (``with archive_outputs(...) as archive``).
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for path in sorted(output_dir.rglob("*")):
+            if not path.is_file():
+                continue
+            compression = (
+                zipfile.ZIP_STORED
+                if path.suffix.lower() in _STORED_SUFFIXES
+                else zipfile.ZIP_DEFLATED
+            )
+            archive.write(path, path.relative_to(output_dir).as_posix(), compress_type=compression)
+    buffer.seek(0)
+    return buffer
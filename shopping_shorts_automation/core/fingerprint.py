@@ -0,0 +1,238 @@
+"""Perceptual fingerprints that catch the same clip re-uploaded under another account.
+
+Frames are sampled with FFmpeg at 4 fps as 32x32 grayscale (centre crop), and each frame
+gets a 64-bit DCT perceptual hash (NumPy only). Two videos are near-duplicates when the
+median Hamming distance from each frame of one to its closest frame of the other is at
+most ``max_distance`` bits, which tolerates re-encoding, rescaling, corner watermarks and
+trimming.
+Fingerprints are stored in ``project_output/media_cache/fingerprints.sqlite3``; rows whose
+file has since been deleted (with its product folder) are dropped when they would match.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from .corpus import video_key
+from .douyin_search import DouyinVideo
+from .media import MEDIA_CACHE_DIRNAME, ffmpeg_binary, file_digest
+from .tracing import traced
+from .utils import ProjectPaths
+
+DEFAULT_MAX_DISTANCE = 12
+FRAME_SIZE = 32
+HASH_SIZE = 8
+# 8 bytes per frame: a 60 s clip at 4 fps is a 2 KB fingerprint. Dense sampling keeps
+# trimmed copies aligned to within a quarter second.
+MAX_FRAMES = 240
+# Re-uploads stamp their own account watermark in a corner; only the centre is hashed.
+CENTER_CROP = 0.8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    sha256 TEXT PRIMARY KEY,
+    video_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    hashes BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_video ON fingerprints (video_key);
+"""
+
+
+def _dct_matrix(size: int) -> Any:
+    import numpy as np
+
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def sample_frames(path: Path, fps: float = 4.0, max_frames: int = MAX_FRAMES) -> Any:
+    """Evenly spaced ``FRAME_SIZE``² grayscale frames of ``path`` as a (n, 32, 32) array."""
+    import numpy as np
+
+    result = subprocess.run(
+        [
+            ffmpeg_binary(),
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-i",
+            str(path),
+            "-an",
+            "-vf",
+            f"fps={fps},crop=iw*{CENTER_CROP}:ih*{CENTER_CROP},"
+            f"scale={FRAME_SIZE}:{FRAME_SIZE}:flags=area,format=gray",
+            "-f",
+            "rawvideo",
+            "-",
+        ],
+        capture_output=True,
+        check=True,
+    )
+    frames = np.frombuffer(result.stdout, dtype=np.uint8).reshape(-1, FRAME_SIZE, FRAME_SIZE)
+    if len(frames) > max_frames:
+        frames = frames[np.linspace(0, len(frames) - 1, max_frames).round().astype(int)]
+    return frames
+
+
+def phash(frames: Any) -> Any:
+    """64-bit DCT perceptual hash per frame, as a uint64 array."""
+    import numpy as np
+
+    if not len(frames):  # audio-only file
+        return np.zeros(0, dtype=np.uint64)
+    dct = _dct_matrix(FRAME_SIZE)
+    coefficients = dct @ np.asarray(frames, dtype=np.float32) @ dct.T
+    low = coefficients[:, :HASH_SIZE, :HASH_SIZE].reshape(len(coefficients), -1)
+    # The DC term only reflects overall brightness, so it is left out of the median.
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def hamming(left: Any, right: Any) -> Any:
+    """Pairwise Hamming distances between two uint64 hash arrays, shape (len(left), len(right))."""
+    import numpy as np
+
+    differing = left[:, None] ^ right[None, :]
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(differing)
+    bits = np.unpackbits(differing[..., None].view(np.uint8), axis=-1)
+    return bits.sum(axis=-1, dtype=np.uint8)
+
+
+def video_distance(left: Any, right: Any) -> float:
+    """Median closest-frame distance; the smaller direction wins so trimmed copies match."""
+    import numpy as np
+
+    if not len(left) or not len(right):
+        return float(HASH_SIZE * HASH_SIZE)
+    distances = hamming(left, right)
+    return float(min(np.median(distances.min(axis=1)), np.median(distances.min(axis=0))))
+
+
+@dataclass(slots=True)
+class DuplicateMatch:
+    """An indexed video that a new file is a near-duplicate of."""
+
+    video_key: str
+    path: str
+    distance: float
+
+
+class FingerprintIndex:
+    """SQLite-backed fingerprint store with an in-memory NumPy copy for lookups."""
+
+    def __init__(self, db_path: Path, max_distance: float = DEFAULT_MAX_DISTANCE) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._entries: list[tuple[str, str, Any]] | None = None
+
+    @classmethod
+    def for_paths(cls, paths: ProjectPaths | None = None) -> "FingerprintIndex":
+        paths = paths or ProjectPaths.discover()
+        return cls(paths.output_root / MEDIA_CACHE_DIRNAME / "fingerprints.sqlite3")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _load(self) -> list[tuple[str, str, Any]]:
+        import numpy as np
+
+        if self._entries is None:
+            rows = self._conn.execute("SELECT video_key, path, hashes FROM fingerprints")
+            self._entries = [
+                (key, path, np.frombuffer(blob, dtype=np.uint64)) for key, path, blob in rows
+            ]
+        return self._entries
+
+    def add(self, key: str, path: str, hashes: Any, sha256: str | None = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+                (sha256 or f"{key}:{path}", key, path, hashes.tobytes(), time.time()),
+            )
+            self._load().append((key, path, hashes))
+
+    def _prune(self, paths: set[str]) -> None:
+        """Forget fingerprints of files that no longer exist (caller holds ``_lock``)."""
+        self._conn.executemany("DELETE FROM fingerprints WHERE path = ?", [(p,) for p in paths])
+        self._entries = [entry for entry in self._load() if entry[1] not in paths]
+
+    def match(self, hashes: Any, exclude_key: str = "") -> DuplicateMatch | None:
+        """Closest indexed video within ``max_distance`` (other than ``exclude_key``)."""
+        with self._lock:
+            matches = [
+                DuplicateMatch(video_key=key, path=path, distance=video_distance(hashes, known))
+                for key, path, known in self._load()
+                if key != exclude_key
+            ]
+            missing: set[str] = set()
+            best: DuplicateMatch | None = None
+            for match in sorted(matches, key=lambda item: item.distance):
+                if match.distance > self.max_distance:
+                    break
+                if Path(match.path).exists():
+                    best = match
+                    break
+                missing.add(match.path)
+            if missing:
+                self._prune(missing)
+            return best
+
+    @traced("fingerprint.check")
+    def check(self, path: Path, key: str) -> DuplicateMatch | None:
+        """Fingerprint a downloaded file, index it and return the video it duplicates, if any.
+
+        Duplicates are indexed too, so :meth:`collapse` can fold them in later search results.
+        """
+        sha256 = file_digest(str(path))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hashes, path FROM fingerprints WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is not None and not Path(row[1]).exists():
+                self._prune({row[1]})
+                row = None
+        if row is not None:
+            import numpy as np
+
+            hashes = np.frombuffer(row[0], dtype=np.uint64)
+        else:
+            hashes = phash(sample_frames(path))
+        duplicate = self.match(hashes, exclude_key=key)
+        if row is None:
+            self.add(key, str(path), hashes, sha256=sha256)
+        return duplicate
+
+    def collapse(self, videos: Iterable[DouyinVideo]) -> list[DouyinVideo]:
+        """Drop results whose indexed fingerprint duplicates an earlier (better ranked) one."""
+        with self._lock:
+            known: dict[str, Any] = {}
+            for key, _, hashes in self._load():
+                known.setdefault(key, hashes)
+        kept: list[DouyinVideo] = []
+        kept_hashes: list[Any] = []
+        for video in videos:
+            hashes = known.get(video_key(video))
+            if hashes is not None:
+                if any(video_distance(hashes, other) <= self.max_distance for other in kept_hashes):
+                    continue
+                kept_hashes.append(hashes)
+            kept.append(video)
+        return kept
@@ -0,0 +1,353 @@
+"""SQLite-backed persistent job queue and worker pool.
+
+The Streamlit app submits generation jobs here instead of running the pipeline on
+the script thread; a small pool of worker threads claims and executes them while
+sessions poll status and per-stage progress.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL,
+    claimed_by TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner_created ON jobs (owner, created_at);
+"""
+# Columns added after the first release, created on databases that predate them.
+_ADDED_COLUMNS = {"claimed_by": "TEXT", "attempts": "INTEGER NOT NULL DEFAULT 0"}
+
+
+@dataclass(slots=True)
+class Job:
+    id: str
+    kind: str
+    owner: str | None
+    status: str
+    payload: dict[str, Any]
+    progress: dict[str, str] = field(default_factory=dict)
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    created_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    updated_at: float = 0.0
+    claimed_by: str | None = None
+    attempts: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            kind=row["kind"],
+            owner=row["owner"],
+            status=row["status"],
+            payload=json.loads(row["payload"]),
+            progress=json.loads(row["progress"] or "{}"),
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            updated_at=row["updated_at"],
+            claimed_by=row["claimed_by"],
+            attempts=row["attempts"],
+        )
+
+
+class JobQueue:
+    """Durable FIFO queue shared by every session and worker in the process.
+
+    :meth:`claim` hands out a fresh claim token per run; progress, heartbeats and the final
+    status are only written while the job is still RUNNING under that token, so a run that
+    was requeued as stale cannot overwrite the run that replaced it.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in _ADDED_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def submit(self, payload: dict[str, Any], kind: str = "generation", owner: str | None = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, owner, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, owner, QUEUED, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+        return job_id
+
+    def claim(self, kinds: tuple[str, ...] | None = None) -> Job | None:
+        """Atomically move the oldest queued job to RUNNING under a new claim token."""
+        now = time.time()
+        claimed_by = uuid.uuid4().hex
+        with self._transaction() as conn:
+            query = "SELECT * FROM jobs WHERE status = ?"
+            params: list[Any] = [QUEUED]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params.extend(kinds)
+            row = conn.execute(query + " ORDER BY created_at LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, updated_at = ?, claimed_by = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, now, now, claimed_by, row["id"]),
+            )
+        job = Job.from_row(row)
+        job.status, job.started_at, job.updated_at = RUNNING, now, now
+        job.claimed_by, job.attempts = claimed_by, job.attempts + 1
+        return job
+
+    def update_progress(self, job_id: str, claimed_by: str, stage: str, state: str) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT progress FROM jobs WHERE id = ? AND status = ? AND claimed_by = ?",
+                (job_id, RUNNING, claimed_by),
+            ).fetchone()
+            if row is None:
+                return False
+            progress = json.loads(row["progress"] or "{}")
+            progress[stage] = state
+            conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress), time.time(), job_id),
+            )
+        return True
+
+    def heartbeat(self, job_id: str, claimed_by: str) -> bool:
+        """Mark a running job as alive; False once the claim was requeued or finished."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ? AND claimed_by = ?",
+                (time.time(), job_id, RUNNING, claimed_by),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, claimed_by: str, result: dict[str, Any]) -> bool:
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+        return self._finish(job_id, claimed_by, SUCCEEDED, result=payload)
+
+    def fail(self, job_id: str, claimed_by: str, error: str) -> bool:
+        return self._finish(job_id, claimed_by, FAILED, error=error)
+
+    def _finish(
+        self,
+        job_id: str,
+        claimed_by: str,
+        status: str,
+        result: str | None = None,
+        error: str | None = None,
+    ) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND claimed_by = ?",
+                (status, result, error, now, now, job_id, RUNNING, claimed_by),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def list_jobs(self, owner: str | None = None, limit: int = 20) -> list[Job]:
+        query = "SELECT * FROM jobs"
+        params: list[Any] = []
+        if owner is not None:
+            query += " WHERE owner = ?"
+            params.append(owner)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def position(self, job_id: str) -> int | None:
+        """Number of queued jobs ahead of ``job_id`` (None when it is not queued)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, status FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None or row["status"] != QUEUED:
+                return None
+            (ahead,) = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?",
+                (QUEUED, row["created_at"]),
+            ).fetchone()
+        return int(ahead)
+
+    def requeue_stale(self, stale_after_seconds: float) -> int:
+        """Put RUNNING jobs without a heartbeat for ``stale_after_seconds`` back in the queue.
+
+        Dropping the claim token makes whatever the dead run still writes a no-op.
+        """
+        cutoff = time.time() - stale_after_seconds
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress = '{}', claimed_by = NULL "
+                "WHERE status = ? AND updated_at < ?",
+                (QUEUED, RUNNING, cutoff),
+            )
+        return cursor.rowcount
+
+
+JobHandler = Callable[[Job, Callable[[str, str], None]], dict[str, Any]]
+
+
+class WorkerPool:
+    """Fixed set of daemon threads consuming jobs from a :class:`JobQueue`."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        kinds: tuple[str, ...] | None = None,
+        stale_after_seconds: float | None = None,
+    ) -> None:
+        self.queue = queue
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        # Jobs of a worker that died mid-run are requeued while the pool keeps running; live
+        # runs send a heartbeat three times per window so long stages are never requeued.
+        self.stale_after_seconds = stale_after_seconds
+        self._next_requeue = 0.0
+        self._requeue_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> "WorkerPool":
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def notify(self) -> None:
+        """Wake idle workers immediately after a submit."""
+        self._wakeup.set()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _requeue_stale(self) -> None:
+        """Run ``requeue_stale`` at most once per tenth of the stale window across workers."""
+        if self.stale_after_seconds is None:
+            return
+        now = time.monotonic()
+        with self._requeue_lock:
+            if now < self._next_requeue:
+                return
+            self._next_requeue = now + max(self.poll_interval, self.stale_after_seconds / 10)
+        self.queue.requeue_stale(self.stale_after_seconds)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._requeue_stale()
+            job = self.queue.claim(self.kinds)
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._execute(job)
+
+    def _heartbeat(self, job_id: str, claimed_by: str, done: threading.Event) -> None:
+        interval = (self.stale_after_seconds or 0.0) / 3
+        while not done.wait(interval):
+            try:
+                if not self.queue.heartbeat(job_id, claimed_by):
+                    return  # requeued or finished; nothing left to keep alive
+            except sqlite3.Error:
+                continue  # a busy database must not end the heartbeat early
+
+    def _execute(self, job: Job) -> None:
+        claimed_by = job.claimed_by or ""
+
+        def progress(stage: str, state: str) -> None:
+            self.queue.update_progress(job.id, claimed_by, stage, state)
+
+        done = threading.Event()
+        if self.stale_after_seconds is not None:
+            threading.Thread(
+                target=self._heartbeat,
+                args=(job.id, claimed_by, done),
+                name=f"job-heartbeat-{job.id[:8]}",
+                daemon=True,
+            ).start()
+        try:
+            result = self.handler(job, progress)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.queue.fail(job.id, claimed_by, f"{exc}\n\n{traceback.format_exc(limit=5)}")
+            return
+        finally:
+            done.set()
+        self.queue.complete(job.id, claimed_by, result)
@@ -3,8 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any
 
-from .openai_client import OpenAIClient
-from .utils import ensure_json, load_prompt
+from .openai_client import OpenAIClient, build_messages
+from .profiles import StageProfiles
+from .schemas import KEYWORD_SCHEMA
+from .tracing import traced
+from .utils import ensure_json, load_prompt_parts
 
 
 @dataclass(slots=True)
@@ -26,24 +29,46 @@ class KeywordTranslator:
         "응답은 JSON 객체로만 작성합니다."
     )
 
-    def __init__(self, client: OpenAIClient | None = None) -> None:
-        self.client = client or OpenAIClient(temperature=0.3)
-        self._prompt_template = load_prompt("translation_prompt.txt")
+    def __init__(
+        self, client: OpenAIClient | None = None, profiles: StageProfiles | None = None
+    ) -> None:
+        self._client = client
+        self.profiles = profiles or StageProfiles.for_paths()
+        self._prompt_prefix, self._prompt_template = load_prompt_parts("translation_prompt.txt")
 
+    @property
+    def client(self) -> OpenAIClient:
+        """Provider client, built on first use (compiling batch prompts needs none)."""
+        if self._client is None:
+            self._client = OpenAIClient(temperature=0.3)
+        return self._client
+
+    @client.setter
+    def client(self, client: OpenAIClient) -> None:
+        self._client = client
+
+    @traced("keywords.translate")
     def translate(self, request: KeywordRequest) -> dict[str, Any]:
+        return self.client.send(
+            self.messages(request),
+            stage="keywords",
+            prompt_name="translation_prompt.txt",
+            schema=KEYWORD_SCHEMA,
+            parse=self.parse,
+            **self.profiles.get("keywords").request_kwargs(),
+        )
+
+    def messages(self, request: KeywordRequest) -> list[dict[str, Any]]:
         prompt = self._prompt_template.format(
             product_name=request.product_name,
             target_audience=request.target_audience,
             tone=request.tone,
             style=request.style,
         )
-        response_text = self.client.send(
-            [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.4,
-        )
+        return build_messages(self.SYSTEM_PROMPT, self._prompt_prefix, prompt)
+
+    @staticmethod
+    def parse(response_text: str) -> dict[str, Any]:
         payload = ensure_json(response_text)
         if not isinstance(payload, dict):
             raise ValueError("키워드 응답이 JSON 객체 형식이 아닙니다.")
@@ -0,0 +1,323 @@
+"""Editing-ready derivatives of downloaded reference videos.
+
+For every file in ``douyin_media/`` a worker process runs FFmpeg to produce a low-res
+editing proxy, an MP3 of the soundtrack, keyframe thumbnails and a contact sheet. Results
+are cached under ``project_output/media_cache/<sha256>-<settings>/`` so a clip downloaded
+again for another product is never transcoded twice, then hard-linked into
+``douyin_media/edit/<file stem>/`` and recorded in ``downloads.json``::
+
+    python -m core.media project_output/무선_이어폰_20240101_120000
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .metrics import MEDIA_POSTPROCESS
+from .tracing import traced
+from .utils import ProjectPaths
+
+MEDIA_CACHE_DIRNAME = "media_cache"
+MEDIA_SUFFIXES = frozenset({".mp4", ".webm", ".mov", ".mkv", ".m4a", ".mp3", ".aac", ".opus"})
+MANIFEST_NAME = "manifest.json"
+EDIT_DIRNAME = "edit"
+_STREAM_PATTERN = re.compile(r"Stream #\d+:\d+.*?: (Video|Audio):")
+
+
+@dataclass(slots=True)
+class MediaOptions:
+    """FFmpeg settings for the derivatives; part of the cache key."""
+
+    proxy_height: int = 540
+    proxy_crf: int = 28
+    audio_bitrate: str = "128k"
+    keyframes: int = 6
+    thumbnail_width: int = 320
+    sheet_columns: int = 4
+    sheet_rows: int = 3
+
+    def cache_key(self) -> str:
+        return hashlib.sha256(json.dumps(asdict(self), sort_keys=True).encode()).hexdigest()[:8]
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+def ffmpeg_binary() -> str:
+    binary = shutil.which(os.environ.get("FFMPEG_BINARY", "ffmpeg"))
+    if not binary:
+        raise RuntimeError("FFmpeg가 필요합니다. https://ffmpeg.org 에서 설치하거나 FFMPEG_BINARY를 지정하세요.")
+    return binary
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def probe_streams(ffmpeg: str, source: str) -> set[str]:
+    """Stream kinds ("Video", "Audio") in ``source``, read from ``ffmpeg -i`` output."""
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-i", source], capture_output=True, text=True, check=False
+    )
+    return set(_STREAM_PATTERN.findall(result.stderr))
+
+
+def render_derivatives(
+    source: str, target: str, options: MediaOptions, threads: int = 1
+) -> dict[str, Any]:
+    """Worker entry point: write every derivative of ``source`` into the cache dir ``target``.
+
+    Files are rendered into a private staging dir and renamed once complete, so a crash
+    never leaves a half-written cache entry behind; a failed step removes the staging dir.
+    """
+    ffmpeg = ffmpeg_binary()
+    final = Path(target)
+    staging = final.with_name(f"{final.name}.{os.getpid()}.partial")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        manifest = _render_into(ffmpeg, source, staging, options, threads)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    try:
+        staging.rename(final)
+    except OSError:  # another job rendered the same file first
+        shutil.rmtree(staging, ignore_errors=True)
+    return manifest
+
+
+def _render_into(
+    ffmpeg: str, source: str, staging: Path, options: MediaOptions, threads: int
+) -> dict[str, Any]:
+    streams = probe_streams(ffmpeg, source)
+    base = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-threads", str(threads)]
+    manifest: dict[str, Any] = {"keyframes": []}
+
+    # One decode feeds both the proxy and the MP3.
+    outputs: list[str] = []
+    if "Video" in streams:
+        outputs += ["-map", "0:v:0", "-vf", f"scale=-2:{options.proxy_height}"]
+        outputs += ["-c:v", "libx264", "-preset", "veryfast", "-crf", str(options.proxy_crf)]
+        if "Audio" in streams:
+            outputs += ["-map", "0:a:0", "-c:a", "aac", "-b:a", "96k"]
+        outputs += ["-movflags", "+faststart", str(staging / "proxy.mp4")]
+        manifest["proxy"] = "proxy.mp4"
+    if "Audio" in streams:
+        outputs += ["-map", "0:a:0", "-vn", "-c:a", "libmp3lame", "-b:a", options.audio_bitrate]
+        outputs.append(str(staging / "audio.mp3"))
+        manifest["audio"] = "audio.mp3"
+    if outputs:
+        subprocess.run([*base, "-i", source, *outputs], capture_output=True, check=True)
+
+    if "Video" in streams:
+        # Keyframes only: the decoder skips every other frame, which keeps this cheap.
+        keyframe_input = [*base, "-skip_frame", "nokey", "-i", source, "-fps_mode", "vfr"]
+        width = options.thumbnail_width
+        subprocess.run(
+            [
+                *keyframe_input,
+                "-vf",
+                f"scale={width}:-2",
+                "-frames:v",
+                str(options.keyframes),
+                str(staging / "keyframe_%02d.jpg"),
+            ],
+            capture_output=True,
+            check=True,
+        )
+        manifest["keyframes"] = sorted(path.name for path in staging.glob("keyframe_*.jpg"))
+        tile = f"{options.sheet_columns}x{options.sheet_rows}"
+        subprocess.run(
+            [
+                *keyframe_input,
+                "-vf",
+                f"scale={width // 2}:-2,tile={tile}",
+                "-frames:v",
+                "1",
+                str(staging / "contact_sheet.jpg"),
+            ],
+            capture_output=True,
+            check=True,
+        )
+        manifest["contact_sheet"] = "contact_sheet.jpg"
+
+    (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def _link(source: Path, destination: Path) -> None:
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:  # different filesystem or no hard-link support
+        shutil.copy2(source, destination)
+
+
+class MediaPostProcessor:
+    """Render derivatives for every downloaded file in a process pool sized to the cores."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        options: MediaOptions | None = None,
+        workers: int | None = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.options = options or MediaOptions()
+        self.workers = workers or available_cores()
+
+    @classmethod
+    def for_paths(cls, paths: ProjectPaths | None = None, **kwargs: Any) -> "MediaPostProcessor":
+        return cls((paths or ProjectPaths.discover()).output_root / MEDIA_CACHE_DIRNAME, **kwargs)
+
+    def _entry(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}-{self.options.cache_key()}"
+
+    @traced("media.postprocess")
+    def process(self, download_dir: Path) -> list[dict[str, Any]]:
+        """Process ``download_dir`` and attach the derivatives to its ``downloads.json``."""
+        files = sorted(
+            path
+            for path in download_dir.iterdir()
+            if path.is_file() and path.suffix.lower() in MEDIA_SUFFIXES
+        )
+        records_path = download_dir / "downloads.json"
+        try:
+            records: list[dict[str, Any]] = json.loads(records_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            records = []
+        if not files:
+            return records
+
+        ffmpeg_binary()  # fail fast in the parent instead of once per worker
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        workers = max(1, min(self.workers, len(files)))
+        # FFmpeg is multi-threaded itself; split the cores between the worker processes.
+        threads = max(1, available_cores() // workers)
+        digests: dict[Path, str] = {}
+        failures: dict[Path, str] = {}
+        # Spawned, not forked: the caller (Streamlit, WorkerPool) is multi-threaded and a
+        # forked child could inherit a lock held by another thread.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            # A worker killed mid-run (OOM, segfault) breaks the whole pool: every pending
+            # future and later submit raises BrokenProcessPool. Those files are recorded as
+            # failed below instead of losing the downloads.json update for the batch.
+            try:
+                hashing = {pool.submit(file_digest, str(path)): path for path in files}
+            except BrokenProcessPool as exc:
+                hashing = {}
+                failures.update((path, str(exc)) for path in files)
+            for future in as_completed(hashing):
+                try:
+                    digests[hashing[future]] = future.result()
+                except Exception as exc:  # pylint: disable=broad-except - one bad file only
+                    failures[hashing[future]] = str(exc)
+            pending: dict[str, list[Path]] = {}
+            for path, digest in digests.items():
+                if (self._entry(digest) / MANIFEST_NAME).exists():
+                    MEDIA_POSTPROCESS.inc(result="cached")
+                else:
+                    pending.setdefault(digest, []).append(path)
+            futures: dict[Any, str] = {}
+            for digest, paths in pending.items():
+                try:
+                    future = pool.submit(
+                        render_derivatives,
+                        str(paths[0]),
+                        str(self._entry(digest)),
+                        self.options,
+                        threads,
+                    )
+                except BrokenProcessPool as exc:
+                    failures.update((path, str(exc)) for path in paths)
+                    MEDIA_POSTPROCESS.inc(result="failed")
+                    continue
+                futures[future] = digest
+            for future in as_completed(futures):
+                digest = futures[future]
+                try:
+                    future.result()
+                    MEDIA_POSTPROCESS.inc(result="rendered")
+                except Exception as exc:  # pylint: disable=broad-except - one bad file only
+                    failures.update((path, str(exc)) for path in pending[digest])
+                    MEDIA_POSTPROCESS.inc(result="failed")
+
+        by_path = {Path(record.get("filepath") or "").name: record for record in records}
+        for path in files:
+            record = by_path.get(path.name)
+            if record is None:
+                record = {"title": path.stem, "filepath": str(path)}
+                records.append(record)
+            digest = digests.get(path)
+            if path in failures or digest is None:
+                record["derivatives"] = {"sha256": digest, "error": failures.get(path, "")}
+                continue
+            record["derivatives"] = self._materialize(path, digest, download_dir)
+
+        records_path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+        return records
+
+    def _materialize(self, source: Path, digest: str, download_dir: Path) -> dict[str, Any]:
+        """Link the cached files next to the download and return their paths."""
+        entry = self._entry(digest)
+        try:
+            manifest = json.loads((entry / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:  # entry pruned or half-written by another run
+            MEDIA_POSTPROCESS.inc(result="failed")
+            return {"sha256": digest, "error": f"캐시 항목을 읽을 수 없습니다: {exc}"}
+        target = download_dir / EDIT_DIRNAME / source.stem
+        target.mkdir(parents=True, exist_ok=True)
+        names = [manifest.get("proxy"), manifest.get("audio"), manifest.get("contact_sheet")]
+        for name in [*filter(None, names), *manifest["keyframes"]]:
+            _link(entry / name, target / name)
+        derivatives: dict[str, Any] = {"sha256": digest}
+        for key in ("proxy", "audio", "contact_sheet"):
+            if manifest.get(key):
+                derivatives[key] = str(target / manifest[key])
+        derivatives["keyframes"] = [str(target / name) for name in manifest["keyframes"]]
+        return derivatives
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="다운로드한 레퍼런스 영상의 편집용 파일 생성")
+    parser.add_argument("output_dirs", nargs="+", type=Path, help="상품 산출물 폴더")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    args = parser.parse_args(argv)
+
+    processor = MediaPostProcessor.for_paths(workers=args.workers)
+    for output_dir in args.output_dirs:
+        download_dir = output_dir / "douyin_media"
+        if not download_dir.is_dir():
+            print(f"{output_dir}: douyin_media 폴더가 없습니다.")
+            continue
+        records = processor.process(download_dir)
+        derivatives = [record["derivatives"] for record in records if "derivatives" in record]
+        done = sum(1 for item in derivatives if "error" not in item)
+        print(f"{output_dir}: {done}/{len(derivatives)}개 파일 처리 완료")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
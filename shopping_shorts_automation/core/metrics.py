@@ -0,0 +1,322 @@
+"""Process-wide Prometheus-style metrics registry.
+
+Services update the module-level metrics below; ``start_metrics_server`` exposes them
+in the Prometheus text format on ``/metrics`` for batch runners, and the Streamlit app
+renders the same registry in its sidebar.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable
+
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+LabelKey = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple[str, ...], values: LabelKey, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelKey:
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"Unknown labels for {self.name}: {sorted(unknown)}")
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[tuple[dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+    def total(self, **labels: Any) -> float:
+        """Sum of all samples whose labels match the given subset."""
+        return sum(
+            value
+            for sample_labels, value in self.samples()
+            if all(sample_labels.get(name) == str(expected) for name, expected in labels.items())
+        )
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for labels, value in sorted(self.samples(), key=lambda item: sorted(item[0].items())):
+            key = tuple(labels[name] for name in self.labelnames)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelKey, dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(
+                key, {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            )
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self) -> list[dict[str, Any]]:
+        with self._lock:
+            items = [
+                (key, dict(series, counts=list(series["counts"])))
+                for key, series in self._series.items()
+            ]
+        return [
+            {
+                "labels": dict(zip(self.labelnames, key)),
+                "count": series["count"],
+                "sum": series["sum"],
+                "counts": series["counts"],
+            }
+            for key, series in items
+        ]
+
+    def quantile(self, q: float, **labels: Any) -> float | None:
+        """Estimate a quantile (upper bucket bound) for the matching label set."""
+        matches = [
+            sample
+            for sample in self.samples()
+            if all(sample["labels"].get(name) == str(value) for name, value in labels.items())
+        ]
+        total = sum(sample["count"] for sample in matches)
+        if not total:
+            return None
+        counts = [sum(sample["counts"][i] for sample in matches) for i in range(len(self.buckets) + 1)]
+        threshold = q * total
+        running = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            running += count
+            if running >= threshold:
+                return bound
+        return math.inf
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for sample in sorted(self.samples(), key=lambda item: sorted(item["labels"].items())):
+            key = tuple(sample["labels"][name] for name in self.labelnames)
+            running = 0
+            for bound, count in zip(self.buckets + (math.inf,), sample["counts"]):
+                running += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {running}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sample['sum'])}")
+            lines.append(f"{self.name}_count{labels} {sample['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with another shape.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+LLM_CALLS = REGISTRY.counter(
+    "llm_calls_total",
+    "LLM request attempts by provider, model and outcome.",
+    ("provider", "model", "status"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total",
+    "LLM tokens by provider, model and direction (in/out/cached).",
+    ("provider", "model", "direction"),
+)
+LLM_RETRIES = REGISTRY.counter(
+    "llm_retries_total",
+    "Retries scheduled by the tenacity policy on OpenAIClient.send.",
+    ("provider", "model"),
+)
+LLM_PARSE_FAILURES = REGISTRY.counter(
+    "llm_parse_failures_total",
+    "LLM responses that failed to parse, by stage and mode (schema/prompt).",
+    ("provider", "model", "stage", "mode"),
+)
+LLM_BATCH_REQUESTS = REGISTRY.counter(
+    "llm_batch_requests_total",
+    "Batch API requests by stage and outcome (ok/error/missing).",
+    ("stage", "status"),
+)
+DOUYIN_SEARCHES = REGISTRY.counter(
+    "douyin_search_requests_total",
+    "Douyin searches by source and result (hit/miss/error).",
+    ("source", "result"),
+)
+DOUYIN_DOWNLOADS = REGISTRY.counter(
+    "douyin_downloads_total", "yt-dlp download attempts by outcome.", ("status",)
+)
+DOUYIN_DOWNLOAD_BYTES = REGISTRY.counter(
+    "douyin_download_bytes_total", "Bytes written to douyin_media by yt-dlp."
+)
+MEDIA_POSTPROCESS = REGISTRY.counter(
+    "media_postprocess_total",
+    "Downloaded files prepared for editing by result (rendered/cached/failed).",
+    ("result",),
+)
+STAGE_CACHE = REGISTRY.counter(
+    "stage_cache_total",
+    "Memoized pipeline stage lookups by stage and result (hit/miss).",
+    ("stage", "result"),
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "stage_latency_seconds", "Latency of traced pipeline stages.", ("stage", "status")
+)
+
+
+class MetricsSpanExporter:
+    """Tracing exporter feeding finished span durations into ``stage_latency_seconds``."""
+
+    def __init__(self, histogram: Histogram = STAGE_LATENCY) -> None:
+        self.histogram = histogram
+
+    def export(self, span: Any) -> None:
+        self.histogram.observe(span.duration_ms / 1000.0, stage=span.name, status=span.status)
+
+
+def record_douyin_search(source: str, videos: list[Any] | None, error: bool = False) -> None:
+    result = "error" if error else ("hit" if videos else "miss")
+    DOUYIN_SEARCHES.inc(source=source, result=result)
+
+
+def search_hit_rate(source: str | None = None) -> float | None:
+    labels = {"source": source} if source else {}
+    total = DOUYIN_SEARCHES.total(**labels)
+    if not total:
+        return None
+    return DOUYIN_SEARCHES.total(result="hit", **labels) / total
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - silence access log
+        return
+
+
+def start_metrics_server(
+    port: int = 9100, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY
+) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread and return the running server."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -1,16 +1,78 @@
 from __future__ import annotations
 
-import os
+import hashlib
+import json
+import threading
 import time
-from typing import Any, Iterable
+from datetime import timedelta
+from typing import Any, Callable, Iterable
 
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import RetryCallState, retry, stop_after_attempt, wait_exponential
 
-try:
-    import streamlit as st
-    HAS_STREAMLIT = True
-except ImportError:
-    HAS_STREAMLIT = False
+from .metrics import LLM_CALLS, LLM_PARSE_FAILURES, LLM_RETRIES, LLM_TOKENS
+from .schemas import ResponseSchema, structured_output_enabled
+from .tracing import get_tracer, traced
+from .usage import UsageRecord, estimate_cost, record_usage
+from .utils import get_config
+
+
+def _count_retry(retry_state: RetryCallState) -> None:
+    """tenacity ``before_sleep`` hook: count each scheduled retry of ``send``."""
+    client = retry_state.args[0] if retry_state.args else None
+    LLM_RETRIES.inc(
+        provider=getattr(client, "provider", "unknown"),
+        model=getattr(client, "model", "unknown"),
+    )
+
+
+def build_messages(system: str, static_prefix: str, prompt: str) -> list[dict[str, Any]]:
+    """Chat messages ordered for provider-side prefix caching.
+
+    The system prompt and the static instructions/examples come first and never change
+    between products; the per-product ``prompt`` is last. The ``cache`` flag marks the
+    static user message for the Gemini context cache and is stripped before sending.
+    """
+    messages: list[dict[str, Any]] = [{"role": "system", "content": system}]
+    if static_prefix:
+        messages.append({"role": "user", "content": static_prefix, "cache": True})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def provider_messages(messages: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Drop local hints such as ``cache`` so messages match the OpenAI chat schema."""
+    return [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+
+
+def _gemini_cut(candidate: Any) -> bool:
+    """Whether a Gemini candidate stopped at ``max_output_tokens``."""
+    reason = getattr(candidate, "finish_reason", None)
+    return getattr(reason, "name", reason) in ("MAX_TOKENS", 2)
+
+
+def _schema_rejected(exc: Exception) -> bool:
+    """Whether a provider error complains about the structured-output parameters."""
+    message = str(exc)
+    return any(
+        name in message
+        for name in ("response_format", "json_schema", "response_schema", "response_mime_type")
+    )
+
+
+def _cache_missing(exc: Exception) -> bool:
+    """Whether a Gemini error means the referenced cached content expired or was deleted."""
+    message = str(exc).lower()
+    return getattr(exc, "code", None) == 404 or (
+        "cached" in message and ("not found" in message or "expired" in message)
+    )
+
+
+def _delete_cached_content(cached_content: Any) -> None:
+    """Drop a replaced context cache now instead of paying for its storage until the TTL."""
+    try:
+        cached_content.delete()
+    except Exception:  # pylint: disable=broad-except - already expired or deleted
+        pass
 
 
 class OpenAIClient:
@@ -24,6 +86,8 @@ class OpenAIClient:
         # Determine which AI provider to use
         self.provider = self._get_config("AI_PROVIDER", "gemini").lower()
         self.temperature = temperature
+        # Schema-constrained decoding; switched off for good if the model rejects it.
+        self.structured_output = structured_output_enabled()
 
         if self.provider == "gemini":
             self._init_gemini(model)
@@ -34,15 +98,7 @@ class OpenAIClient:
 
     def _get_config(self, key: str, default: str = "") -> str:
         """Get config from Streamlit secrets or environment variables."""
-        # Check if running in Streamlit context
-        if HAS_STREAMLIT:
-            try:
-                from streamlit.runtime.scriptrunner import get_script_run_ctx
-                if get_script_run_ctx() is not None and hasattr(st, 'secrets') and key in st.secrets:
-                    return st.secrets[key]
-            except Exception:
-                pass  # Not in Streamlit context, fall back to environment
-        return os.environ.get(key, default)
+        return get_config(key, default)
 
     def _init_gemini(self, model: str | None) -> None:
         """Initialize Google Gemini client."""
@@ -58,7 +114,24 @@ class OpenAIClient:
         if not api_key:
             raise EnvironmentError("GEMINI_API_KEY 가 설정되지 않았습니다.")
 
-        genai.configure(api_key=api_key)
+        # A custom endpoint (e.g. core.fake_provider) is only reachable over REST.
+        endpoint = self._get_config("GEMINI_API_ENDPOINT")
+        if endpoint:
+            genai.configure(
+                api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint}
+            )
+        else:
+            genai.configure(api_key=api_key)
+        self.request_interval = float(self._get_config("GEMINI_REQUEST_INTERVAL", "6"))
+        # Context caches for static prompt prefixes: key -> (CachedContent | None, expires_at).
+        self.cache_ttl = float(self._get_config("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+        self._context_caches: dict[str, tuple[Any, float]] = {}
+        self._cache_lock = threading.Lock()
+        # One lock per prefix: creation is a network call, and concurrent requests for the
+        # same prefix wait for a single create instead of each making their own.
+        self._cache_key_locks: dict[str, threading.Lock] = {}
+        # candidate_count support differs per model; 1 makes callers ask for a JSON array.
+        self.max_candidates = int(self._get_config("GEMINI_MAX_CANDIDATES", "8"))
         self.model = model or self._get_config("GEMINI_MODEL", "gemini-1.5-flash")
         self.client = genai.GenerativeModel(self.model)
 
@@ -76,39 +149,230 @@ class OpenAIClient:
         if not api_key:
             raise EnvironmentError("OPENAI_API_KEY 가 설정되지 않았습니다.")
 
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, base_url=self._get_config("OPENAI_BASE_URL") or None)
         self.model = model or self._get_config("OPENAI_MODEL", "gpt-4o-mini")
+        self.max_candidates = 8
 
-    @retry(wait=wait_exponential(multiplier=2, min=4, max=60), stop=stop_after_attempt(5))
-    def send(self, messages: Iterable[dict[str, Any]], **kwargs: Any) -> str:
-        """Send a chat completion request and return the model message content."""
+    def send(
+        self,
+        messages: Iterable[dict[str, Any]],
+        *,
+        stage: str = "default",
+        prompt_name: str | None = None,
+        schema: ResponseSchema | None = None,
+        parse: Callable[[str], Any] | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Send a chat completion request and return the model message content.
+
+        ``stage`` and ``prompt_name`` label the usage record captured for the call.
+        ``schema`` constrains the reply to a JSON schema (see :mod:`core.schemas`) and
+        ``parse`` converts it; both are explained in :meth:`send_candidates`. ``model``,
+        ``temperature``, ``max_tokens`` and ``timeout`` keyword arguments override the client
+        defaults for this call (see :class:`core.profiles.StageProfile`); a reply cut off at
+        ``max_tokens`` is sent again once with ``max_tokens_ceiling`` when that is higher.
+        """
+        return self.send_candidates(
+            messages, 1, stage=stage, prompt_name=prompt_name, schema=schema, parse=parse, **kwargs
+        )[0]
+
+    @traced("llm.send")
+    @retry(
+        wait=wait_exponential(multiplier=2, min=4, max=60),
+        stop=stop_after_attempt(5),
+        before_sleep=_count_retry,
+    )
+    def send_candidates(
+        self,
+        messages: Iterable[dict[str, Any]],
+        n: int = 1,
+        *,
+        stage: str = "default",
+        prompt_name: str | None = None,
+        schema: ResponseSchema | None = None,
+        parse: Callable[[str], Any] | None = None,
+        **kwargs: Any,
+    ) -> list[Any]:
+        """Like :meth:`send`, but sample ``n`` alternative responses in one provider call.
+
+        Uses OpenAI ``n`` / Gemini ``candidate_count`` (at most ``max_candidates``); the
+        provider may return fewer candidates than requested.
+
+        With ``parse`` the parsed candidates are returned instead of the texts; ones that
+        fail to parse are dropped, and when none parse the call is retried like any other
+        provider error. ``schema`` requests native structured output (OpenAI
+        ``response_format``, Gemini ``response_schema``) unless ``LLM_STRUCTURED_OUTPUT``
+        is off, which keeps such retries near zero.
+
+        When a reply stops at ``max_tokens`` (a cap tuned down by :mod:`core.profiles`) and
+        ``max_tokens_ceiling`` is higher, the call is repeated right away with the ceiling
+        instead of burning the retries on the same cap. The cut call is recorded with
+        ``truncated=True`` so the next profile refresh stops tuning that stage down.
+        """
         # Set default max_tokens to 4000 for longer responses
         if "max_tokens" not in kwargs:
             kwargs["max_tokens"] = 4000
+        ceiling = int(kwargs.pop("max_tokens_ceiling", 0) or 0)
+        n = max(1, min(n, self.max_candidates))
+        messages = list(messages)
+        model = kwargs.get("model") or self.model
+        if not self.structured_output:
+            schema = None
+
+        try:
+            try:
+                results, usage = self._dispatch(messages, n, schema, **kwargs)
+            except Exception as exc:
+                if schema is None or not _schema_rejected(exc):
+                    raise
+                # Model or endpoint without structured output: prompt-only from now on.
+                self.structured_output = False
+                schema = None
+                results, usage = self._dispatch(messages, n, None, **kwargs)
+            if usage.get("truncated") and ceiling > kwargs["max_tokens"]:
+                LLM_CALLS.inc(provider=self.provider, model=model, status="truncated")
+                self._record_usage(
+                    usage,
+                    stage=stage,
+                    prompt_name=prompt_name,
+                    model=model,
+                    candidates=max(1, len(results)),
+                    truncated=True,
+                )
+                kwargs["max_tokens"] = ceiling
+                results, usage = self._dispatch(messages, n, schema, **kwargs)
+            if not results:
+                raise ValueError("응답이 출력 토큰 상한(max_tokens)에서 잘려 비어 있습니다.")
+        except Exception:
+            LLM_CALLS.inc(provider=self.provider, model=model, status="error")
+            raise
+        LLM_CALLS.inc(provider=self.provider, model=model, status="ok")
+        self._record_usage(
+            usage,
+            stage=stage,
+            prompt_name=prompt_name,
+            model=model,
+            candidates=len(results),
+            truncated=bool(usage.get("truncated")),
+        )
+        if parse is None:
+            return results
+        return self._parse_results(results, parse, stage, "schema" if schema else "prompt", model)
 
+    def _dispatch(
+        self,
+        messages: list[dict[str, Any]],
+        n: int,
+        schema: ResponseSchema | None,
+        **kwargs: Any,
+    ) -> tuple[list[str], dict[str, Any]]:
         if self.provider == "gemini":
-            return self._send_gemini(list(messages), **kwargs)
-        elif self.provider == "openai":
-            return self._send_openai(list(messages), **kwargs)
-        else:
-            raise ValueError(f"Unsupported provider: {self.provider}")
-
-    def _send_openai(self, messages: list[dict[str, Any]], **kwargs: Any) -> str:
-        """Send request to OpenAI API."""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=kwargs.get("temperature", self.temperature),
-            max_tokens=kwargs.get("max_tokens", 1200),
+            return self._send_gemini(messages, n=n, schema=schema, **kwargs)
+        if self.provider == "openai":
+            return self._send_openai(messages, n=n, schema=schema, **kwargs)
+        raise ValueError(f"Unsupported provider: {self.provider}")
+
+    def _parse_results(
+        self, texts: list[str], parse: Callable[[str], Any], stage: str, mode: str, model: str
+    ) -> list[Any]:
+        """Parse every candidate, counting failures; raises when none parse."""
+        parsed = []
+        for text in texts:
+            try:
+                parsed.append(parse(text))
+            except ValueError:
+                LLM_PARSE_FAILURES.inc(
+                    provider=self.provider, model=model, stage=stage, mode=mode
+                )
+        if not parsed:
+            raise ValueError("응답을 JSON 으로 해석하지 못했습니다.")
+        return parsed
+
+    def _record_usage(
+        self,
+        usage: dict[str, Any],
+        stage: str,
+        prompt_name: str | None,
+        model: str,
+        candidates: int = 1,
+        truncated: bool = False,
+    ) -> None:
+        input_tokens = int(usage.get("input_tokens") or 0)
+        output_tokens = int(usage.get("output_tokens") or 0)
+        cached_tokens = int(usage.get("cached_tokens") or 0)
+        if input_tokens:
+            LLM_TOKENS.inc(input_tokens, provider=self.provider, model=model, direction="in")
+        if output_tokens:
+            LLM_TOKENS.inc(output_tokens, provider=self.provider, model=model, direction="out")
+        if cached_tokens:
+            LLM_TOKENS.inc(
+                cached_tokens, provider=self.provider, model=model, direction="cached"
+            )
+        record_usage(
+            UsageRecord(
+                provider=self.provider,
+                model=model,
+                stage=stage,
+                prompt_name=prompt_name,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                latency_ms=round(float(usage.get("latency_ms") or 0.0), 1),
+                cost_usd=estimate_cost(model, input_tokens, output_tokens, cached_tokens),
+                cached_tokens=cached_tokens,
+                candidates=candidates,
+                truncated=truncated,
+            )
         )
-        return response.choices[0].message.content or ""
 
-    def _send_gemini(self, messages: list[dict[str, Any]], **kwargs: Any) -> str:
-        """Send request to Google Gemini API."""
+    def _send_openai(
+        self,
+        messages: list[dict[str, Any]],
+        n: int = 1,
+        schema: ResponseSchema | None = None,
+        **kwargs: Any,
+    ) -> tuple[list[str], dict[str, Any]]:
+        """Send request to OpenAI API and return (contents, usage)."""
+        extra: dict[str, Any] = {"n": n} if n > 1 else {}
+        if schema is not None:
+            extra["response_format"] = schema.openai_response_format()
+        if kwargs.get("timeout"):
+            extra["timeout"] = kwargs["timeout"]
+        model = kwargs.get("model") or self.model
+        with get_tracer().span("llm.openai", provider="openai", model=model) as span:
+            response = self.client.chat.completions.create(
+                model=model,
+                # OpenAI caches identical prompt prefixes automatically.
+                messages=provider_messages(messages),
+                temperature=kwargs.get("temperature", self.temperature),
+                max_tokens=kwargs.get("max_tokens", 1200),
+                **extra,
+            )
+        usage: dict[str, Any] = {
+            "latency_ms": span.duration_ms,
+            "truncated": any(choice.finish_reason == "length" for choice in response.choices),
+        }
+        response_usage = getattr(response, "usage", None)
+        if response_usage is not None:
+            usage["input_tokens"] = response_usage.prompt_tokens
+            usage["output_tokens"] = response_usage.completion_tokens
+            details = getattr(response_usage, "prompt_tokens_details", None)
+            usage["cached_tokens"] = getattr(details, "cached_tokens", 0) or 0
+        return [choice.message.content or "" for choice in response.choices], usage
+
+    def _send_gemini(
+        self,
+        messages: list[dict[str, Any]],
+        n: int = 1,
+        schema: ResponseSchema | None = None,
+        **kwargs: Any,
+    ) -> tuple[list[str], dict[str, Any]]:
+        """Send request to Google Gemini API and return (contents, usage)."""
         import google.generativeai as genai
 
+        model_name = kwargs.get("model") or self.model
         # Convert OpenAI message format to Gemini format
         system_instruction = None
+        static_parts = []
         prompt_parts = []
 
         for msg in messages:
@@ -118,10 +382,20 @@ class OpenAIClient:
             if role == "system":
                 # Gemini uses system_instruction instead of system messages
                 system_instruction = content
+            elif msg.get("cache") and not prompt_parts:
+                # Leading static prefix (see build_messages), eligible for the context cache
+                static_parts.append(content)
             elif role == "user" or role == "assistant":
                 # Combine all messages into a single prompt
                 prompt_parts.append(content)
 
+        cache_key, cached_content = self._context_cache(
+            model_name, system_instruction, static_parts
+        )
+        if cached_content is None:
+            # No cache: send the static prefix first so implicit prefix caching can still hit
+            prompt_parts = static_parts + prompt_parts
+
         # Combine all parts into a single prompt
         full_prompt = "\n\n".join(prompt_parts) if prompt_parts else "Hello"
 
@@ -134,43 +408,124 @@ class OpenAIClient:
         }
 
         # Create model with system instruction if provided
-        if system_instruction:
+        if cached_content is not None:
+            # System instruction and static prefix live in the cached content
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content, safety_settings=safety_settings
+            )
+        elif system_instruction:
             model = genai.GenerativeModel(
-                self.model,
+                model_name,
                 system_instruction=system_instruction,
                 safety_settings=safety_settings
             )
+        elif model_name != self.model:
+            model = genai.GenerativeModel(model_name, safety_settings=safety_settings)
         else:
             model = self.client
 
+        generation_config = {
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_output_tokens": kwargs.get("max_tokens", 1200),
+        }
+        if n > 1:
+            generation_config["candidate_count"] = n
+        if schema is not None:
+            generation_config["response_mime_type"] = "application/json"
+            generation_config["response_schema"] = schema.gemini_schema()
+        request_options = {"timeout": kwargs["timeout"]} if kwargs.get("timeout") else None
+
         # Generate content directly (simpler and more reliable)
         try:
-            response = model.generate_content(
-                full_prompt,
-                generation_config={
-                    "temperature": kwargs.get("temperature", self.temperature),
-                    "max_output_tokens": kwargs.get("max_tokens", 1200),
-                },
-                safety_settings=safety_settings
-            )
+            with get_tracer().span("llm.gemini", provider="gemini", model=model_name) as span:
+                response = model.generate_content(
+                    full_prompt,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings,
+                    request_options=request_options,
+                )
 
-            # Check if response was blocked
-            if not response.text:
+            # response.text only works for a single candidate; read every candidate's parts
+            texts = [
+                "".join(getattr(part, "text", "") for part in candidate.content.parts)
+                for candidate in response.candidates
+            ]
+            texts = [text for text in texts if text]
+            truncated = any(_gemini_cut(candidate) for candidate in response.candidates)
+
+            # Check if response was blocked (a reply cut at the cap is left to the caller)
+            if not texts and not truncated:
                 # Try to get block reason
                 if hasattr(response, 'prompt_feedback'):
                     block_reason = response.prompt_feedback
                     raise ValueError(f"Gemini API 응답이 차단되었습니다: {block_reason}")
                 raise ValueError("Gemini API 응답이 비어있습니다.")
 
+            usage: dict[str, Any] = {"latency_ms": span.duration_ms, "truncated": truncated}
+            usage_metadata = getattr(response, "usage_metadata", None)
+            if usage_metadata is not None:
+                usage["input_tokens"] = getattr(usage_metadata, "prompt_token_count", 0)
+                usage["output_tokens"] = getattr(usage_metadata, "candidates_token_count", 0)
+                usage["cached_tokens"] = getattr(usage_metadata, "cached_content_token_count", 0)
+
             # Add delay to avoid rate limits (Gemini free tier: 15 RPM)
-            # Wait 6 seconds between requests to stay well under limit
-            time.sleep(6)
+            # Wait 6 seconds (GEMINI_REQUEST_INTERVAL) between requests to stay under limit
+            if self.request_interval > 0:
+                with get_tracer().span("llm.gemini.rate_limit_sleep"):
+                    time.sleep(self.request_interval)
 
-            return response.text
+            return texts, usage
 
         except Exception as e:
+            if cache_key and _cache_missing(e):
+                # Expired or deleted server-side: recreate on retry, unless another request
+                # already replaced the entry. Any other error keeps the (still valid) cache.
+                with self._cache_lock:
+                    if self._context_caches.get(cache_key, (None,))[0] is cached_content:
+                        del self._context_caches[cache_key]
             # Provide more detailed error information
             error_msg = f"Gemini API 호출 중 오류: {str(e)}"
             if hasattr(e, '__cause__'):
                 error_msg += f"\n원인: {e.__cause__}"
             raise ValueError(error_msg) from e
+
+    def _context_cache(
+        self, model: str, system_instruction: str | None, static_parts: list[str]
+    ) -> tuple[str | None, Any]:
+        """Return ``(key, CachedContent)`` for the static prompt prefix, creating it on demand.
+
+        Creation fails when the prefix is below the model's minimum cacheable size or the
+        model does not support caching; that outcome is remembered for the TTL as well, so
+        the fallback costs a single extra request per prefix.
+        """
+        if not static_parts or self.cache_ttl <= 0:
+            return None, None
+        key = hashlib.sha256(
+            json.dumps([model, system_instruction, static_parts]).encode("utf-8")
+        ).hexdigest()
+        with self._cache_lock:
+            key_lock = self._cache_key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Renew shortly before expiry so in-flight requests never hit a stale cache.
+            with self._cache_lock:
+                entry = self._context_caches.get(key)
+            if entry is not None and entry[1] - min(60.0, self.cache_ttl / 2) > time.time():
+                return (key if entry[0] is not None else None), entry[0]
+            from google.generativeai import caching
+
+            now = time.time()
+            try:
+                with get_tracer().span("llm.gemini.cache_create", model=model):
+                    cached_content = caching.CachedContent.create(
+                        model=model,
+                        system_instruction=system_instruction or None,
+                        contents=static_parts,
+                        ttl=timedelta(seconds=self.cache_ttl),
+                    )
+            except Exception:
+                cached_content = None
+            with self._cache_lock:
+                self._context_caches[key] = (cached_content, now + self.cache_ttl)
+        if entry is not None and entry[0] is not None:
+            _delete_cached_content(entry[0])
+        return (key if cached_content is not None else None), cached_content
@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from .dag import SkipStage, Stage, StageGraph
+from .douyin_crawler import DouyinCrawler, DouyinCrawlerConfig, merge_search_results
+from .douyin_search import DouyinSearchRequest, DouyinVideo
+from .file_manager import save_outputs
+from .keyword_translator import KeywordRequest
+from .script_generator import ScriptRequest
+from .services import ServiceContainer, config_fingerprint, get_services
+from .tracing import collect_spans, get_tracer, stage_breakdown
+from .usage import collect_usage, summarize_usage
+from .utils import ProjectPaths
+
+# (stage, state) where state is one of "running", "done", "cached", "skipped", "failed".
+ProgressCallback = Callable[[str, str], None]
+
+# Memoized Douyin API results are ranking snapshots; refresh them a few times a day.
+SEARCH_CACHE_TTL_SECONDS = 6 * 3600
+
+PIPELINE_STAGES: tuple[str, ...] = (
+    "script",
+    "localize",
+    "keywords",
+    "douyin_search",
+    "douyin_crawl",
+    "media",
+    "save",
+)
+
+
+@dataclass(slots=True)
+class GenerationOptions:
+    """Everything the operator chose in the form for one product."""
+
+    product_name: str
+    target_audience: str
+    tone: str
+    style: str
+    language: str
+    brand_voice: str = ""
+    enable_douyin: bool = False
+    enable_douyin_download: bool = False
+    douyin_download_limit: int = 3
+    douyin_scroll_times: int = 5
+    douyin_crawler_results: int = 10
+    douyin_headless: bool = True
+    douyin_audio_only: bool = False
+    douyin_block_resources: bool = True
+    douyin_max_tabs: int = 4
+    douyin_max_duration: int = 60
+    douyin_max_filesize_mb: int = 50
+    # Proxies, MP3, keyframes and contact sheets for every download (see core.media).
+    douyin_postprocess: bool = True
+    # Alternative hooks/thumbnail sets sampled in the same LLM calls (see ScriptService).
+    candidates: int = 1
+    # Output folder of a near-duplicate product to build on (see core.similarity):
+    # "reuse" copies its script and keywords, "adapt" keeps keywords and rewrites the script.
+    reuse_from: str = ""
+    reuse_mode: str = ""
+    # Run every stage again instead of loading memoized outputs (see core.dag).
+    refresh_stages: bool = False
+    # More script languages, all localized from the finished script in one call.
+    extra_languages: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "GenerationOptions":
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def _noop_progress(stage: str, state: str) -> None:
+    return None
+
+
+def _ingest_references(
+    services: ServiceContainer,
+    videos: list[DouyinVideo],
+    keyword: str,
+    source: str,
+    options: GenerationOptions,
+) -> None:
+    """Add search results to the reference corpus; never fails the generation."""
+    if not videos:
+        return
+    try:
+        services.reference_corpus().ingest(
+            videos, keyword, source=source, product_name=options.product_name
+        )
+    except Exception:  # pylint: disable=broad-except - corpus is best-effort (e.g. no pyarrow)
+        return
+
+
+def _crawl_keywords(keyword_payload: dict[str, Any], primary: str) -> list[str]:
+    """Every Chinese keyword and search query from the translator, primary keyword first."""
+    keywords = [primary]
+    keywords += keyword_payload.get("chinese_keywords", [])
+    keywords += keyword_payload.get("douyin_search_queries", [])
+    cleaned = (keyword.strip() for keyword in keywords if keyword)
+    return list(dict.fromkeys(keyword for keyword in cleaned if keyword))
+
+
+def _prompts_digest(paths: ProjectPaths) -> str:
+    """Digest of every prompt template, so editing a prompt invalidates memoized stages."""
+    digest = hashlib.sha256()
+    for path in sorted(paths.prompts_dir.glob("*")):
+        if path.is_file():
+            digest.update(path.name.encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _with_localized(
+    script_bundle: dict[str, Any], localized: dict[str, dict[str, Any]]
+) -> dict[str, Any]:
+    """The bundle with its other-language versions under ``localized``."""
+    return {**script_bundle, "localized": localized} if localized else script_bundle
+
+
+def _encode_search(result: tuple[str, list[DouyinVideo]]) -> list[Any]:
+    keyword, videos = result
+    return [keyword, [video.as_dict() for video in videos]]
+
+
+def _decode_search(stored: list[Any]) -> tuple[str, list[DouyinVideo]]:
+    keyword, rows = stored
+    return keyword, [DouyinVideo(**row) for row in rows]
+
+
+def run_generation(
+    options: GenerationOptions,
+    paths: ProjectPaths | None = None,
+    progress: ProgressCallback | None = None,
+    services: ServiceContainer | None = None,
+) -> dict[str, Any]:
+    """Run the full product pipeline and return the history/result record.
+
+    Stages run as a :class:`core.dag.StageGraph`: script and keywords in parallel, and
+    script, keywords and the Douyin API search are memoized by their inputs (see
+    ``GenerationOptions.refresh_stages``). Script and keyword failures propagate; Douyin
+    failures are downgraded to ``warnings`` in the returned record.
+    Services come from the shared process-wide container unless ``services`` is given.
+    """
+    report = progress or _noop_progress
+    services = services or get_services(paths)
+    douyin_download = options.enable_douyin and options.enable_douyin_download
+
+    def generate_script(script_request: ScriptRequest, candidates: int) -> dict[str, Any]:
+        return services.script_service().generate_bundle(script_request, candidates=candidates)
+
+    def localize_script(
+        script_request: ScriptRequest, script_bundle: dict[str, Any], languages: list[str]
+    ) -> dict[str, dict[str, Any]]:
+        return services.script_service().localize_bundle(script_request, script_bundle, languages)
+
+    def translate_keywords(keyword_request: KeywordRequest) -> dict[str, Any]:
+        return services.keyword_translator().translate(keyword_request)
+
+    def search_douyin(
+        keyword_payload: dict[str, Any], product_name: str
+    ) -> tuple[str, list[DouyinVideo]]:
+        keywords = keyword_payload.get("chinese_keywords", [])
+        keyword = next((kw for kw in keywords if kw), product_name)
+        videos = services.search_service().search(
+            DouyinSearchRequest(keyword=keyword, max_results=6)
+        )
+        _ingest_references(services, videos, keyword, "api", options)
+        return keyword, videos
+
+    def crawl_douyin(
+        keyword_payload: dict[str, Any],
+        search_keyword: str,
+        douyin_videos: list[DouyinVideo],
+        output_dir: Path,
+    ) -> tuple[list[DouyinVideo], list[dict[str, Any]]]:
+        crawler = DouyinCrawler(
+            DouyinCrawlerConfig(
+                headless=options.douyin_headless,
+                wait_seconds=3.0,
+                scroll_pause_seconds=2.0,
+                scroll_times=options.douyin_scroll_times,
+                max_results=options.douyin_crawler_results,
+                download_limit=options.douyin_download_limit,
+                download_audio_only=options.douyin_audio_only,
+                convert_audio=not options.douyin_postprocess,
+                block_resources=options.douyin_block_resources,
+                max_tabs=options.douyin_max_tabs,
+                max_duration_seconds=options.douyin_max_duration,
+                max_filesize_mb=options.douyin_max_filesize_mb,
+            ),
+            fingerprints=services.fingerprint_index(),
+        )
+        crawler_results = crawler.search_many(_crawl_keywords(keyword_payload, search_keyword))
+        for keyword, videos in crawler_results.items():
+            _ingest_references(services, videos, keyword, "crawler", options)
+        crawler_videos = merge_search_results(crawler_results.values())
+        listed = douyin_videos or crawler_videos
+        download_records: list[dict[str, Any]] = []
+        if listed:
+            download_records = crawler.download(listed, output_dir)
+        # Re-uploads of one clip under several accounts are shown once.
+        return services.fingerprint_index().collapse(listed), download_records
+
+    def prepare_media(
+        download_records: list[dict[str, Any]], output_dir: Path
+    ) -> list[dict[str, Any]]:
+        if not download_records:
+            raise SkipStage
+        return services.media_processor().process(output_dir / "douyin_media")
+
+    with collect_spans() as spans, collect_usage() as usage_records:
+        with get_tracer().span("generation", product_name=options.product_name):
+            script_request = ScriptRequest(
+                product_name=options.product_name,
+                target_audience=options.target_audience,
+                tone=options.tone,
+                style=options.style,
+                language=options.language,
+                brand_voice=options.brand_voice or None,
+            )
+            keyword_request = KeywordRequest(
+                product_name=options.product_name,
+                target_audience=options.target_audience,
+                tone=options.tone,
+                style=options.style,
+                language=options.language,
+            )
+            output_manager = services.output_manager()
+            output_dir = output_manager.create_output_dir(options.product_name)
+
+            def save(
+                script_bundle: dict[str, Any],
+                localized_bundles: dict[str, dict[str, Any]],
+                keyword_payload: dict[str, Any],
+                douyin_videos: list[DouyinVideo],
+                listed_videos: list[DouyinVideo] | None,
+                download_records: list[dict[str, Any]],
+                media_records: list[dict[str, Any]] | None,
+            ) -> tuple[list[DouyinVideo], list[dict[str, Any]]]:
+                videos = douyin_videos if listed_videos is None else listed_videos
+                records = download_records if media_records is None else media_records
+                save_outputs(
+                    output_manager=output_manager,
+                    output_dir=output_dir,
+                    product_name=options.product_name,
+                    script_bundle=_with_localized(script_bundle, localized_bundles),
+                    keyword_payload=keyword_payload,
+                    script_request=script_request,
+                    douyin_videos=videos,
+                    douyin_downloads=records,
+                    usage=summarize_usage(usage_records),
+                    reused_from=options.reuse_from or None,
+                )
+                return videos, records
+
+            values: dict[str, Any] = {
+                "script_request": script_request,
+                "keyword_request": keyword_request,
+                "candidates": options.candidates,
+                "languages": [
+                    lang
+                    for lang in dict.fromkeys(options.extra_languages)
+                    if lang and lang != options.language
+                ],
+                "product_name": options.product_name,
+                "output_dir": output_dir,
+            }
+            reused = (
+                services.product_index().load(options.reuse_from) if options.reuse_from else None
+            )
+            if reused is not None:
+                values["keyword_payload"] = reused["keywords"]
+                if options.reuse_mode == "reuse":
+                    values["script_bundle"] = reused["script_bundle"]
+
+            graph = StageGraph(
+                [
+                    Stage(
+                        "script",
+                        generate_script,
+                        inputs=("script_request", "candidates"),
+                        outputs=("script_bundle",),
+                        memoize=True,
+                    ),
+                    Stage(
+                        "localize",
+                        localize_script,
+                        inputs=("script_request", "script_bundle", "languages"),
+                        outputs=("localized_bundles",),
+                        enabled=bool(values["languages"]),
+                        default={},
+                        memoize=True,
+                        warning="다국어 대본 생성 중 오류가 발생했습니다",
+                    ),
+                    Stage(
+                        "keywords",
+                        translate_keywords,
+                        inputs=("keyword_request",),
+                        outputs=("keyword_payload",),
+                        memoize=True,
+                    ),
+                    Stage(
+                        "douyin_search",
+                        search_douyin,
+                        inputs=("keyword_payload", "product_name"),
+                        outputs=("search_keyword", "douyin_videos"),
+                        enabled=options.enable_douyin,
+                        default=(options.product_name, []),
+                        memoize=True,
+                        ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+                        encode=_encode_search,
+                        decode=_decode_search,
+                        warning="Douyin 검색 중 오류가 발생했습니다",
+                    ),
+                    Stage(
+                        "douyin_crawl",
+                        crawl_douyin,
+                        inputs=("keyword_payload", "search_keyword", "douyin_videos", "output_dir"),
+                        outputs=("listed_videos", "download_records"),
+                        enabled=douyin_download,
+                        default=(None, []),
+                        warning="Douyin 다운로드 중 오류가 발생했습니다",
+                    ),
+                    Stage(
+                        "media",
+                        prepare_media,
+                        inputs=("download_records", "output_dir"),
+                        outputs=("media_records",),
+                        enabled=douyin_download and options.douyin_postprocess,
+                        warning="편집용 파일 생성 중 오류가 발생했습니다",
+                    ),
+                    Stage(
+                        "save",
+                        save,
+                        inputs=(
+                            "script_bundle",
+                            "localized_bundles",
+                            "keyword_payload",
+                            "douyin_videos",
+                            "listed_videos",
+                            "download_records",
+                            "media_records",
+                        ),
+                        outputs=("saved_videos", "saved_records"),
+                    ),
+                ]
+            )
+            salt = config_fingerprint() + _prompts_digest(services.paths or ProjectPaths.discover())
+            try:
+                run = graph.run(
+                    values,
+                    progress=report,
+                    cache=services.stage_cache(),
+                    salt=salt,
+                    refresh=options.refresh_stages,
+                )
+            except Exception:
+                with contextlib.suppress(OSError):
+                    output_dir.rmdir()  # only succeeds while nothing was written
+                raise
+
+    script_bundle = _with_localized(run.values["script_bundle"], run.values["localized_bundles"])
+    douyin_videos = run.values["saved_videos"]
+    download_records = run.values["saved_records"]
+    return {
+        "product_name": options.product_name,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "script_bundle": script_bundle,
+        "keyword_payload": run.values["keyword_payload"],
+        "output_dir": str(output_dir),
+        "douyin_videos": [video.as_dict() for video in douyin_videos],
+        "douyin_requested": options.enable_douyin,
+        "download_records": download_records,
+        "download_requested": options.enable_douyin_download,
+        "stage_timings": stage_breakdown(spans),
+        "usage": summarize_usage(usage_records),
+        "warnings": run.warnings,
+        "cached_stages": run.cached,
+        "reused_from": options.reuse_from,
+        "reuse_mode": options.reuse_mode,
+    }
+
+
+def make_generation_handler(
+    paths: ProjectPaths | None = None,
+) -> Callable[[Any, ProgressCallback], dict[str, Any]]:
+    """Build a :class:`core.jobs.WorkerPool` handler running generation jobs."""
+
+    def handle(job: Any, progress: ProgressCallback) -> dict[str, Any]:
+        options = GenerationOptions.from_dict(job.payload)
+        result = run_generation(options, paths=paths, progress=progress)
+        result["job_id"] = job.id
+        return result
+
+    return handle
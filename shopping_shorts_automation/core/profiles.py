@@ -0,0 +1,222 @@
+"""Per-stage generation profiles: model, temperature, output cap and timeout.
+
+Every LLM stage (script, thumbnail, keywords) sends its calls with a :class:`StageProfile`.
+The defaults below can be overridden per stage with
+``LLM_STAGE_PROFILES='{"thumbnail": {"model": "gpt-4o-mini", "max_tokens": 200}}'``.
+
+Unless ``LLM_AUTO_MAX_TOKENS=false``, ``max_tokens`` is lowered to the p99 output tokens per
+candidate seen in the saved ``metadata.json`` usage records, with headroom, once a stage
+has ``MIN_SAMPLES`` calls. Short stages then stop reserving thousands of output tokens.
+A reply cut off at a tuned cap is sent again at once with the configured cap
+(``max_tokens_ceiling``) and recorded as truncated; cut replies are left out of the p99
+and, while they are more than ``MAX_TRUNCATED_SHARE`` of a stage's recent calls, the stage
+keeps its configured cap. The configured value is never exceeded. Show the effective
+profiles::
+
+    python -m core.profiles
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any
+
+from .usage import UsageRecord, load_usage_records
+from .utils import ProjectPaths, get_config
+
+# Tuned cap = p99 * HEADROOM, never below MIN_TOKENS.
+MIN_SAMPLES = 20
+HEADROOM = 1.5
+MIN_TOKENS = 128
+# Above this share of truncated recent calls a stage is not tuned down.
+MAX_TRUNCATED_SHARE = 0.01
+# Only the most recent calls per stage (by metadata.json write time) are considered, so
+# prompt changes show up quickly.
+MAX_SAMPLES = 500
+
+
+@dataclass(slots=True)
+class StageProfile:
+    """Request settings for one stage; ``model`` None uses the client's default model.
+
+    ``max_tokens_ceiling`` is the configured cap when ``max_tokens`` was tuned below it.
+    """
+
+    stage: str
+    temperature: float = 0.7
+    max_tokens: int = 4000
+    timeout_s: float = 60.0
+    model: str | None = None
+    max_tokens_ceiling: int | None = None
+
+    def request_kwargs(self, replies_per_response: int = 1) -> dict[str, Any]:
+        """Keyword arguments for ``OpenAIClient.send``.
+
+        ``replies_per_response`` scales the cap when one response holds several payloads
+        (``ScriptService.CANDIDATES_INSTRUCTION``).
+        """
+        replies = max(1, replies_per_response)
+        kwargs: dict[str, Any] = {
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens * replies,
+            "timeout": self.timeout_s,
+        }
+        if self.max_tokens_ceiling and self.max_tokens_ceiling > self.max_tokens:
+            kwargs["max_tokens_ceiling"] = self.max_tokens_ceiling * replies
+        if self.model:
+            kwargs["model"] = self.model
+        return kwargs
+
+
+DEFAULT_PROFILES: dict[str, StageProfile] = {
+    "script": StageProfile("script", temperature=0.7, max_tokens=4000, timeout_s=90.0),
+    # Three options of at most 15 characters each.
+    "thumbnail": StageProfile("thumbnail", temperature=0.8, max_tokens=400, timeout_s=30.0),
+    "keywords": StageProfile("keywords", temperature=0.4, max_tokens=1000, timeout_s=45.0),
+    # Per target language; scaled by the number of languages in one call.
+    "localize": StageProfile("localize", temperature=0.5, max_tokens=2000, timeout_s=90.0),
+}
+
+
+def configured_profiles() -> dict[str, StageProfile]:
+    """Defaults merged with ``LLM_STAGE_PROFILES`` (unknown keys and bad JSON are ignored)."""
+    profiles = dict(DEFAULT_PROFILES)
+    override = get_config("LLM_STAGE_PROFILES")
+    if not override:
+        return profiles
+    try:
+        for stage, values in json.loads(override).items():
+            base = profiles.get(stage, StageProfile(stage))
+            changes = {
+                key: values[key]
+                for key in ("temperature", "max_tokens", "timeout_s", "model")
+                if key in values
+            }
+            profiles[stage] = replace(base, **changes)
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return profiles
+
+
+def auto_tune_enabled() -> bool:
+    value = get_config("LLM_AUTO_MAX_TOKENS", "true")
+    return value.strip().lower() in {"1", "true", "yes", "y"}
+
+
+def output_token_p99(records: list[UsageRecord]) -> dict[str, tuple[int, int, int]]:
+    """``stage -> (samples, p99 output tokens per candidate, truncated calls)``.
+
+    Computed over each stage's latest ``MAX_SAMPLES`` calls; truncated calls only report
+    where the cap was, not the reply length, so they are counted but not sampled.
+    """
+    per_stage: dict[str, list[UsageRecord]] = {}
+    for record in records:
+        per_stage.setdefault(record.stage, []).append(record)
+    observed = {}
+    for stage, stage_records in per_stage.items():
+        recent = stage_records[-MAX_SAMPLES:]
+        values = sorted(
+            record.output_tokens / max(1, record.candidates)
+            for record in recent
+            if not record.truncated
+        )
+        truncated = len(recent) - len(values)
+        if not values:
+            observed[stage] = (0, 0, truncated)
+            continue
+        rank = max(0, math.ceil(0.99 * len(values)) - 1)
+        observed[stage] = (len(values), math.ceil(values[rank]), truncated)
+    return observed
+
+
+def tuned_max_tokens(configured: int, samples: int, p99: int, truncated: int = 0) -> int:
+    if samples < MIN_SAMPLES or truncated > MAX_TRUNCATED_SHARE * (samples + truncated):
+        return configured
+    return min(configured, max(MIN_TOKENS, math.ceil(p99 * HEADROOM)))
+
+
+class StageProfiles:
+    """Effective profiles; the usage history is rescanned at most every ``refresh_s``."""
+
+    def __init__(self, output_root: Path, refresh_s: float = 600.0) -> None:
+        self.output_root = output_root
+        self.refresh_s = refresh_s
+        self._lock = threading.Lock()
+        self._observed: dict[str, tuple[int, int, int]] = {}
+        self._loaded_at: float | None = None
+
+    @classmethod
+    def for_paths(cls, paths: ProjectPaths | None = None) -> "StageProfiles":
+        return cls((paths or ProjectPaths.discover()).output_root)
+
+    def observed(self) -> dict[str, tuple[int, int, int]]:
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded_at is None or now - self._loaded_at > self.refresh_s:
+                records = [record for _, record in load_usage_records(self.output_root)]
+                self._observed = output_token_p99(records)
+                self._loaded_at = now
+            return self._observed
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def get(self, stage: str) -> StageProfile:
+        profile = configured_profiles().get(stage) or StageProfile(stage)
+        if not auto_tune_enabled():
+            return profile
+        samples, p99, truncated = self.observed().get(stage, (0, 0, 0))
+        tuned = tuned_max_tokens(profile.max_tokens, samples, p99, truncated)
+        if tuned >= profile.max_tokens:
+            return profile
+        return replace(profile, max_tokens=tuned, max_tokens_ceiling=profile.max_tokens)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="단계별 생성 프로필 (모델/온도/출력 상한/타임아웃)")
+    parser.add_argument("--root", type=Path, default=None, help="project_output 경로")
+    parser.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = parser.parse_args(argv)
+
+    profiles = StageProfiles(args.root or ProjectPaths.discover().output_root)
+    observed = profiles.observed()
+    rows = []
+    for stage, configured in configured_profiles().items():
+        samples, p99, truncated = observed.get(stage, (0, 0, 0))
+        rows.append(
+            {
+                **asdict(profiles.get(stage)),
+                "configured_max_tokens": configured.max_tokens,
+                "samples": samples,
+                "p99_output_tokens": p99,
+                "truncated": truncated,
+            }
+        )
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return 0
+    header = (
+        f"{'stage':<12}{'model':<20}{'temp':>6}{'max_tokens':>12}{'configured':>12}"
+        f"{'p99 out':>9}{'calls':>7}{'cut':>5}{'timeout':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['stage']:<12}{row['model'] or '(기본)':<20}{row['temperature']:>6}"
+            f"{row['max_tokens']:>12}{row['configured_max_tokens']:>12}"
+            f"{row['p99_output_tokens']:>9}{row['samples']:>7}{row['truncated']:>5}"
+            f"{row['timeout_s']:>9}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
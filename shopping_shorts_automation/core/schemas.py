@@ -0,0 +1,146 @@
+"""JSON schemas for the LLM responses, generated from the ``prompts/`` output contracts.
+
+Each contract is a dataclass that mirrors the JSON a prompt asks for. :class:`ResponseSchema`
+turns it into an OpenAI ``response_format`` (strict ``json_schema``) or a Gemini
+``response_schema``, so the provider decodes against the schema and the reply always parses.
+``LLM_STRUCTURED_OUTPUT=false`` falls back to the prompt-only instructions.
+"""
+
+from __future__ import annotations
+
+import typing
+from dataclasses import dataclass, fields
+from typing import Any
+
+from .utils import get_config
+
+_SCALARS: dict[Any, str] = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+
+@dataclass(slots=True)
+class ScriptPayload:
+    """``script_prompt.txt``."""
+
+    script: str
+    hook: str
+    cta: str
+    talking_points: list[str]
+    description: str
+    duration_seconds: int
+
+
+@dataclass(slots=True)
+class ThumbnailPayload:
+    """``thumbnail_prompt.txt``."""
+
+    options: list[str]
+
+
+@dataclass(slots=True)
+class KeywordPayload:
+    """``translation_prompt.txt``."""
+
+    korean_keywords: list[str]
+    chinese_keywords: list[str]
+    douyin_search_queries: list[str]
+
+
+@dataclass(slots=True)
+class LocalizedScript:
+    """One language of ``localize_prompt.txt``."""
+
+    language: str
+    script: str
+    hook: str
+    cta: str
+    talking_points: list[str]
+    description: str
+    thumbnail_options: list[str]
+
+
+@dataclass(slots=True)
+class LocalizationPayload:
+    """``localize_prompt.txt``: every target language in one response."""
+
+    translations: list[LocalizedScript]
+
+
+def _type_schema(annotation: Any) -> dict[str, Any]:
+    if annotation in _SCALARS:
+        return {"type": _SCALARS[annotation]}
+    if typing.get_origin(annotation) is list:
+        (item,) = typing.get_args(annotation)
+        return {"type": "array", "items": _type_schema(item)}
+    if isinstance(annotation, type) and hasattr(annotation, "__dataclass_fields__"):
+        return json_schema(annotation)
+    raise TypeError(f"unsupported contract field type: {annotation!r}")
+
+
+def json_schema(contract: type) -> dict[str, Any]:
+    """Object schema with every field required, as OpenAI strict mode demands."""
+    hints = typing.get_type_hints(contract)
+    names = [item.name for item in fields(contract)]
+    return {
+        "type": "object",
+        "properties": {name: _type_schema(hints[name]) for name in names},
+        "required": names,
+        "additionalProperties": False,
+    }
+
+
+def _without_additional_properties(schema: Any) -> Any:
+    if isinstance(schema, dict):
+        return {
+            key: _without_additional_properties(value)
+            for key, value in schema.items()
+            if key != "additionalProperties"
+        }
+    if isinstance(schema, list):
+        return [_without_additional_properties(value) for value in schema]
+    return schema
+
+
+@dataclass(frozen=True, slots=True)
+class ResponseSchema:
+    """Named JSON schema for one response contract."""
+
+    name: str
+    schema: dict[str, Any]
+
+    @classmethod
+    def of(cls, contract: type) -> "ResponseSchema":
+        return cls(contract.__name__, json_schema(contract))
+
+    def candidates(self) -> "ResponseSchema":
+        """``{"candidates": [...]}`` wrapper (``ScriptService.CANDIDATES_INSTRUCTION``)."""
+        return ResponseSchema(
+            f"{self.name}Candidates",
+            {
+                "type": "object",
+                "properties": {"candidates": {"type": "array", "items": self.schema}},
+                "required": ["candidates"],
+                "additionalProperties": False,
+            },
+        )
+
+    def openai_response_format(self) -> dict[str, Any]:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": self.name, "strict": True, "schema": self.schema},
+        }
+
+    def gemini_schema(self) -> dict[str, Any]:
+        # Gemini's OpenAPI subset has no additionalProperties.
+        return _without_additional_properties(self.schema)
+
+
+SCRIPT_SCHEMA = ResponseSchema.of(ScriptPayload)
+THUMBNAIL_SCHEMA = ResponseSchema.of(ThumbnailPayload)
+KEYWORD_SCHEMA = ResponseSchema.of(KeywordPayload)
+LOCALIZATION_SCHEMA = ResponseSchema.of(LocalizationPayload)
+
+
+def structured_output_enabled() -> bool:
+    """``LLM_STRUCTURED_OUTPUT`` (default on)."""
+    value = get_config("LLM_STRUCTURED_OUTPUT", "true")
+    return value.strip().lower() in {"1", "true", "yes", "y"}
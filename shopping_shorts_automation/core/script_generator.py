@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Iterable
 
-from .openai_client import OpenAIClient
-from .utils import ensure_json, load_prompt
+from .openai_client import OpenAIClient, build_messages
+from .profiles import StageProfile, StageProfiles
+from .schemas import LOCALIZATION_SCHEMA, SCRIPT_SCHEMA, THUMBNAIL_SCHEMA, ResponseSchema
+from .tracing import traced
+from .utils import ensure_json, load_prompt_parts
 
 
 @dataclass(slots=True)
@@ -25,16 +29,124 @@ class ScriptService:
         "상품의 장점과 감성을 30초 분량으로 설득력 있게 구성하세요. "
         "응답은 반드시 JSON 형식으로만 작성합니다."
     )
+    THUMBNAIL_SYSTEM_PROMPT = (
+        "당신은 짧고 임팩트 있는 한국어 카피를 만드는 숏폼 마케터입니다. "
+        "출력은 JSON 객체 형태로만 응답하세요."
+    )
+    LOCALIZE_SYSTEM_PROMPT = (
+        "당신은 여러 나라의 숏폼 시장을 잘 아는 현지화 카피라이터입니다. "
+        "완성된 대본의 구성과 설득 포인트를 살려 각 언어로 자연스럽게 옮깁니다. "
+        "응답은 반드시 JSON 형식으로만 작성합니다."
+    )
+    # Appended to the per-product block when the provider cannot sample candidates natively.
+    CANDIDATES_INSTRUCTION = (
+        "\n\n서로 다른 접근으로 위 출력 형식의 JSON 객체 {count}개를 만들어 "
+        '{{"candidates": [객체1, 객체2, ...]}} 형태의 JSON 하나로만 출력하세요.'
+    )
+
+    def __init__(
+        self, client: OpenAIClient | None = None, profiles: StageProfiles | None = None
+    ) -> None:
+        self._client = client
+        self.profiles = profiles or StageProfiles.for_paths()
+        self._script_prefix, self._script_template = load_prompt_parts("script_prompt.txt")
+        self._thumbnail_prefix, self._thumbnail_template = load_prompt_parts(
+            "thumbnail_prompt.txt"
+        )
+        self._localize_prefix, self._localize_template = load_prompt_parts("localize_prompt.txt")
+
+    @property
+    def client(self) -> OpenAIClient:
+        """Provider client, built on first use (compiling batch prompts needs none)."""
+        if self._client is None:
+            self._client = OpenAIClient()
+        return self._client
+
+    @client.setter
+    def client(self, client: OpenAIClient) -> None:
+        self._client = client
+
+    @traced("script.generate_bundle")
+    def generate_bundle(self, request: ScriptRequest, candidates: int = 1) -> dict[str, Any]:
+        """Create script, description, and thumbnail copy bundle.
+
+        With ``candidates`` > 1 the script and thumbnail calls each sample that many
+        alternatives in a single provider call. The first one fills the usual fields; all of
+        them are kept under ``candidates`` and ``thumbnail_sets`` for the UI to switch between.
+        """
+        scripts = self._generate_script(request, candidates)
+        thumbnail_sets = self._generate_thumbnail_options(
+            request, scripts[0]["hook"], candidates
+        )
+        return self.assemble_bundle(scripts, thumbnail_sets, candidates)
+
+    @traced("script.localize")
+    def localize_bundle(
+        self, request: ScriptRequest, bundle: dict[str, Any], languages: Iterable[str]
+    ) -> dict[str, dict[str, Any]]:
+        """Adapt a finished bundle into every other language of ``languages`` in one call.
+
+        The primary script, talking points and thumbnail copy are the shared input, so an
+        extra language costs its own output tokens instead of another script and thumbnail
+        pass. Returns ``language -> bundle fields`` (with ``thumbnail_options``).
+        """
+        targets = [lang for lang in dict.fromkeys(languages) if lang and lang != request.language]
+        if not targets:
+            return {}
+        return self.client.send(
+            self.localize_messages(request, bundle, targets),
+            stage="localize",
+            prompt_name="localize_prompt.txt",
+            schema=LOCALIZATION_SCHEMA,
+            # A reply missing a language is retried like a malformed one.
+            parse=lambda text: self.parse_localized(ensure_json(text), targets),
+            **self.profiles.get("localize").request_kwargs(replies_per_response=len(targets)),
+        )
+
+    def localize_messages(
+        self, request: ScriptRequest, bundle: dict[str, Any], languages: list[str]
+    ) -> list[dict[str, Any]]:
+        source = {
+            **self._script_fields(bundle),
+            "thumbnail_options": bundle.get("thumbnail_options", []),
+        }
+        prompt = self._localize_template.format(
+            product_name=request.product_name,
+            target_audience=request.target_audience,
+            tone=request.tone,
+            language=request.language,
+            languages=", ".join(languages),
+            source=json.dumps(source, ensure_ascii=False),
+        )
+        return build_messages(self.LOCALIZE_SYSTEM_PROMPT, self._localize_prefix, prompt)
+
+    def assemble_bundle(
+        self, scripts: list[dict[str, Any]], thumbnail_sets: list[list[str]], candidates: int = 1
+    ) -> dict[str, Any]:
+        """Build the bundle from parsed script payloads and thumbnail option sets."""
+        script_result = scripts[0]
+        bundle = {
+            **self._script_fields(script_result),
+            "thumbnail_options": thumbnail_sets[0],
+            "raw_script_payload": script_result,
+        }
+        if candidates > 1:
+            bundle["candidates"] = [self._script_fields(script) for script in scripts]
+            bundle["thumbnail_sets"] = thumbnail_sets
+        return bundle
+
+    def script_messages(self, request: ScriptRequest) -> list[dict[str, Any]]:
+        return build_messages(self.SYSTEM_PROMPT, self._script_prefix, self._script_prompt(request))
 
-    def __init__(self, client: OpenAIClient | None = None) -> None:
-        self.client = client or OpenAIClient()
-        self._script_template = load_prompt("script_prompt.txt")
-        self._thumbnail_template = load_prompt("thumbnail_prompt.txt")
+    def thumbnail_messages(self, request: ScriptRequest, hook: str) -> list[dict[str, Any]]:
+        return build_messages(
+            self.THUMBNAIL_SYSTEM_PROMPT,
+            self._thumbnail_prefix,
+            self._thumbnail_prompt(request, hook),
+        )
 
-    def generate_bundle(self, request: ScriptRequest) -> dict[str, Any]:
-        """Create script, description, and thumbnail copy bundle."""
-        script_result = self._generate_script(request)
-        thumbnail_options = self._generate_thumbnail_options(request, script_result["hook"])
+    @staticmethod
+    def _script_fields(script_result: dict[str, Any]) -> dict[str, Any]:
         return {
             "script": script_result["script"],
             "hook": script_result["hook"],
@@ -42,12 +154,53 @@ class ScriptService:
             "talking_points": script_result.get("talking_points", []),
             "description": script_result.get("description", ""),
             "duration_seconds": script_result.get("duration_seconds", 30),
-            "thumbnail_options": thumbnail_options,
-            "raw_script_payload": script_result,
         }
 
-    def _generate_script(self, request: ScriptRequest) -> dict[str, Any]:
-        prompt = self._script_template.format(
+    def _send_for_candidates(
+        self,
+        system: str,
+        prefix: str,
+        prompt: str,
+        candidates: int,
+        schema: ResponseSchema,
+        profile: StageProfile,
+        **kwargs: Any,
+    ) -> list[Any]:
+        """Return up to ``candidates`` parsed JSON payloads from one provider call.
+
+        Uses native multi-candidate sampling when the client supports that many; otherwise
+        the response itself is asked to hold a ``{"candidates": [...]}`` array. Parsing
+        happens inside the client call, so a malformed reply is retried there.
+        """
+        if candidates <= 1:
+            messages = build_messages(system, prefix, prompt)
+            kwargs.update(profile.request_kwargs())
+            return [self.client.send(messages, schema=schema, parse=ensure_json, **kwargs)]
+
+        if getattr(self.client, "max_candidates", 1) < candidates:
+            prompt += self.CANDIDATES_INSTRUCTION.format(count=candidates)
+            messages = build_messages(system, prefix, prompt)
+            kwargs.update(profile.request_kwargs(replies_per_response=candidates))
+            payload = self.client.send(
+                messages, schema=schema.candidates(), parse=ensure_json, **kwargs
+            )
+            items = payload.get("candidates") if isinstance(payload, dict) else payload
+            if not isinstance(items, list) or not items:
+                raise ValueError("후보 응답 형식이 올바르지 않습니다.")
+            return items[:candidates]
+
+        # Candidates that fail to parse are dropped by the client.
+        kwargs.update(profile.request_kwargs())
+        return self.client.send_candidates(
+            build_messages(system, prefix, prompt),
+            candidates,
+            schema=schema,
+            parse=ensure_json,
+            **kwargs,
+        )
+
+    def _script_prompt(self, request: ScriptRequest) -> str:
+        return self._script_template.format(
             product_name=request.product_name,
             target_audience=request.target_audience,
             tone=request.tone,
@@ -56,38 +209,83 @@ class ScriptService:
             brand_voice=request.brand_voice or "특별한 브랜드 보이스 없음",
         )
 
-        response_text = self.client.send(
-            [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ]
-        )
-        return ensure_json(response_text)
-
-    def _generate_thumbnail_options(self, request: ScriptRequest, hook: str) -> list[str]:
-        prompt = self._thumbnail_template.format(
+    def _thumbnail_prompt(self, request: ScriptRequest, hook: str) -> str:
+        return self._thumbnail_template.format(
             product_name=request.product_name,
             target_audience=request.target_audience,
             tone=request.tone,
             style=request.style,
             hook=hook,
         )
-        response_text = self.client.send(
-            [
-                {
-                    "role": "system",
-                    "content": (
-                        "당신은 짧고 임팩트 있는 한국어 카피를 만드는 숏폼 마케터입니다. "
-                        "출력은 JSON 배열 형태로만 응답하세요."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.8,
+
+    def _generate_script(self, request: ScriptRequest, candidates: int = 1) -> list[dict[str, Any]]:
+        payloads = self._send_for_candidates(
+            self.SYSTEM_PROMPT,
+            self._script_prefix,
+            self._script_prompt(request),
+            candidates,
+            SCRIPT_SCHEMA,
+            self.profiles.get("script"),
+            stage="script",
+            prompt_name="script_prompt.txt",
+        )
+        return self.parse_scripts(payloads)
+
+    def _generate_thumbnail_options(
+        self, request: ScriptRequest, hook: str, candidates: int = 1
+    ) -> list[list[str]]:
+        payloads = self._send_for_candidates(
+            self.THUMBNAIL_SYSTEM_PROMPT,
+            self._thumbnail_prefix,
+            self._thumbnail_prompt(request, hook),
+            candidates,
+            THUMBNAIL_SCHEMA,
+            self.profiles.get("thumbnail"),
+            stage="thumbnail",
+            prompt_name="thumbnail_prompt.txt",
         )
-        parsed = ensure_json(response_text)
-        if isinstance(parsed, dict) and "options" in parsed:
-            return list(parsed["options"])
-        if isinstance(parsed, list):
-            return [str(option) for option in parsed]
-        raise ValueError("썸네일 문구 응답 형식이 올바르지 않습니다.")
+        return self.parse_thumbnail_sets(payloads)
+
+    @staticmethod
+    def parse_scripts(payloads: list[Any]) -> list[dict[str, Any]]:
+        """Keep the script payloads that have the required fields."""
+        required = ("script", "hook", "cta")
+        scripts = [
+            payload
+            for payload in payloads
+            if isinstance(payload, dict) and all(key in payload for key in required)
+        ]
+        if not scripts:
+            raise ValueError("대본 응답 형식이 올바르지 않습니다.")
+        return scripts
+
+    @classmethod
+    def parse_localized(cls, payload: Any, languages: list[str]) -> dict[str, dict[str, Any]]:
+        """Map each requested language to its bundle fields; every language must be present."""
+        items = payload.get("translations") if isinstance(payload, dict) else payload
+        localized: dict[str, dict[str, Any]] = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict) or item.get("language") not in languages:
+                continue
+            if all(key in item for key in ("script", "hook", "cta")):
+                options = item.get("thumbnail_options", [])
+                localized[item["language"]] = {
+                    **cls._script_fields(item),
+                    "thumbnail_options": [str(option) for option in options],
+                }
+        missing = [lang for lang in languages if lang not in localized]
+        if missing:
+            raise ValueError(f"다국어 대본 응답에 빠진 언어가 있습니다: {', '.join(missing)}")
+        return localized
+
+    @staticmethod
+    def parse_thumbnail_sets(payloads: list[Any]) -> list[list[str]]:
+        option_sets = []
+        for parsed in payloads:
+            if isinstance(parsed, dict) and "options" in parsed:
+                option_sets.append(list(parsed["options"]))
+            elif isinstance(parsed, list):
+                option_sets.append([str(option) for option in parsed])
+        if not option_sets:
+            raise ValueError("썸네일 문구 응답 형식이 올바르지 않습니다.")
+        return option_sets
@@ -0,0 +1,331 @@
+"""Full-text search over generated scripts, hooks and keywords (SQLite FTS5).
+
+:func:`core.file_manager.save_outputs` adds every product to
+``project_output/search.sqlite3`` as it is saved. Text is indexed as overlapping
+character bigrams, the usual approach for Korean and Chinese without a morphological
+analyser: "출근길" matches "출근길에" and two-character terms such as "무선" or "降噪" are
+ordinary index lookups. Folders saved before the index existed are added with
+``rebuild``::
+
+    python -m core.search query 출근길 노이즈
+    python -m core.search query --field hook --field cta "지금 바로"
+    python -m core.search rebuild
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+from .tracing import traced
+from .utils import ProjectPaths
+
+SEARCH_DB_NAME = "search.sqlite3"
+# Indexed columns in bm25 weight order: a hit in the product name or hook ranks first.
+SEARCH_FIELDS: dict[str, float] = {
+    "product_name": 6.0,
+    "hook": 4.0,
+    "thumbnails": 3.0,
+    "keywords": 3.0,
+    "keywords_zh": 3.0,
+    "cta": 2.0,
+    "description": 1.5,
+    "script": 1.0,
+}
+_WORD_PATTERN = re.compile(r"[^\W_]+", flags=re.UNICODE)
+SNIPPET_WIDTH = 48
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    output_dir TEXT NOT NULL UNIQUE,
+    product_name TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_saved ON products (saved_at);
+"""
+
+
+def _lines(values: Any) -> str:
+    if isinstance(values, str):
+        return values
+    return "\n".join(str(value) for value in values or [] if value)
+
+
+def document_from_metadata(metadata: dict[str, Any]) -> dict[str, str]:
+    """Searchable text of one saved ``metadata.json``, keyed by :data:`SEARCH_FIELDS`."""
+    bundle = metadata.get("script_bundle") or {}
+    keywords = metadata.get("keywords") or {}
+    candidates = bundle.get("candidates") or []
+    thumbnail_sets = bundle.get("thumbnail_sets") or [bundle.get("thumbnail_options") or []]
+    hooks = [bundle.get("hook", ""), *(candidate.get("hook", "") for candidate in candidates)]
+    ctas = [bundle.get("cta", ""), *(candidate.get("cta", "") for candidate in candidates)]
+    return {
+        "product_name": metadata.get("product_name", ""),
+        "hook": _lines(dict.fromkeys(hooks)),
+        "thumbnails": _lines(dict.fromkeys(option for group in thumbnail_sets for option in group)),
+        "keywords": _lines(keywords.get("korean_keywords")),
+        "keywords_zh": _lines(
+            [*keywords.get("chinese_keywords", []), *keywords.get("douyin_search_queries", [])]
+        ),
+        "cta": _lines(dict.fromkeys(ctas)),
+        "description": bundle.get("description", ""),
+        "script": bundle.get("script", ""),
+    }
+
+
+def bigram_tokens(text: str) -> list[str]:
+    """Overlapping character bigrams of every word; one-character words are kept whole."""
+    tokens: list[str] = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[index : index + 2] for index in range(len(word) - 1))
+    return tokens
+
+
+def match_expression(terms: Iterable[str]) -> str:
+    """FTS5 query requiring every term; each term is a phrase of its bigrams."""
+    phrases = []
+    for term in terms:
+        tokens = bigram_tokens(term)
+        if not tokens:
+            continue
+        # A lone character matches as a prefix of the bigrams it starts.
+        suffix = "*" if len(tokens) == 1 and len(tokens[0]) == 1 else ""
+        phrases.append(f'"{" ".join(tokens)}"{suffix}')
+    return " AND ".join(phrases)
+
+
+def make_snippet(
+    document: dict[str, str], terms: list[str], columns: Iterable[str], width: int = SNIPPET_WIDTH
+) -> str:
+    """Excerpt of the column matching the most terms (highest weight on ties), terms in ``[]``."""
+    lowered = [term.lower() for term in terms if term]
+    if not lowered:
+        return document.get("hook", "").split("\n", 1)[0]
+    pattern = re.compile("|".join(re.escape(term) for term in lowered), flags=re.IGNORECASE)
+    best_text, best_count = "", 0
+    for name in columns:
+        text = document.get(name, "").replace("\n", " ")
+        count = sum(1 for term in lowered if term in text.lower())
+        if count > best_count:
+            best_text, best_count = text, count
+    match = pattern.search(best_text)
+    if match is None:
+        return document.get("hook", "").split("\n", 1)[0]
+    start = max(0, match.start() - width // 3)
+    excerpt = pattern.sub(lambda found: f"[{found.group(0)}]", best_text[start : start + width])
+    return ("…" if start else "") + excerpt + ("…" if start + width < len(best_text) else "")
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """One matching product; ``snippet`` highlights the match with ``[`` ``]``."""
+
+    output_dir: str
+    product_name: str
+    saved_at: float
+    score: float
+    snippet: str
+    hook: str
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class SearchIndex:
+    """Incrementally updated FTS5 index of saved products."""
+
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # The index can always be rebuilt from metadata.json, so commits skip the fsync.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5({', '.join(SEARCH_FIELDS)})"
+        )
+
+    @classmethod
+    def for_paths(cls, paths: ProjectPaths | None = None) -> "SearchIndex":
+        return cls((paths or ProjectPaths.discover()).output_root / SEARCH_DB_NAME)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def add(
+        self, output_dir: Path | str, metadata: dict[str, Any], saved_at: float | None = None
+    ) -> None:
+        """Index (or re-index) the product saved in ``output_dir``."""
+        self.add_many([(output_dir, metadata, saved_at)])
+
+    def add_many(
+        self,
+        products: Iterable[tuple[Path | str, dict[str, Any], float | None]],
+        remove: Iterable[Path | str] = (),
+    ) -> int:
+        """Index several ``(output_dir, metadata, saved_at)`` products in one transaction."""
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for output_dir in remove:
+                    self._delete(str(output_dir))
+                for output_dir, metadata, saved_at in products:
+                    self._insert(str(output_dir), metadata, saved_at)
+                    added += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def _insert(self, output_dir: str, metadata: dict[str, Any], saved_at: float | None) -> None:
+        document = document_from_metadata(metadata)
+        self._delete(output_dir)
+        cursor = self._conn.execute(
+            "INSERT INTO products (output_dir, product_name, saved_at, document) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                output_dir,
+                document["product_name"],
+                time.time() if saved_at is None else saved_at,
+                json.dumps(document, ensure_ascii=False),
+            ),
+        )
+        indexed = [" ".join(bigram_tokens(document[name])) for name in SEARCH_FIELDS]
+        self._conn.execute(
+            f"INSERT INTO product_fts (rowid, {', '.join(SEARCH_FIELDS)}) "
+            f"VALUES (?{', ?' * len(SEARCH_FIELDS)})",
+            (cursor.lastrowid, *indexed),
+        )
+
+    def _delete(self, output_dir: str) -> None:
+        row = self._conn.execute(
+            "SELECT id FROM products WHERE output_dir = ?", (output_dir,)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM product_fts WHERE rowid = ?", (row[0],))
+            self._conn.execute("DELETE FROM products WHERE id = ?", (row[0],))
+
+    def remove(self, output_dir: Path | str) -> None:
+        with self._lock:
+            self._delete(str(output_dir))
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    @traced("search.query")
+    def search(
+        self, query: str, fields: Iterable[str] | None = None, limit: int = 20
+    ) -> list[SearchHit]:
+        """Products containing every whitespace-separated term, best match first."""
+        terms = [term for term in query.split() if term]
+        if not terms:
+            return []
+        requested = list(fields or SEARCH_FIELDS)
+        columns = [name for name in requested if name in SEARCH_FIELDS]
+        if not columns:
+            raise ValueError(f"검색할 수 없는 항목입니다: {requested}")
+        expression = match_expression(terms)
+        if not expression:
+            return []
+
+        weights = ", ".join(str(weight) for weight in SEARCH_FIELDS.values())
+        sql = (
+            f"SELECT products.output_dir, products.product_name, products.saved_at, "
+            f"bm25(product_fts, {weights}) AS score, products.document "
+            f"FROM product_fts JOIN products ON products.id = product_fts.rowid "
+            f"WHERE product_fts MATCH ? ORDER BY score LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(
+                sql, (f"{{{' '.join(columns)}}} : ({expression})", limit)
+            ).fetchall()
+        hits = []
+        for output_dir, product_name, saved_at, score, document_json in rows:
+            document = json.loads(document_json)
+            hits.append(
+                SearchHit(
+                    output_dir=output_dir,
+                    product_name=product_name,
+                    saved_at=saved_at,
+                    score=-score,
+                    snippet=make_snippet(document, terms, columns),
+                    hook=document.get("hook", "").split("\n", 1)[0],
+                )
+            )
+        return hits
+
+    def rebuild(self, output_root: Path) -> int:
+        """Index every saved folder missing from (or newer than) the index; drop deleted ones."""
+        with self._lock:
+            known = dict(self._conn.execute("SELECT output_dir, saved_at FROM products"))
+        products: list[tuple[Path | str, dict[str, Any], float | None]] = []
+        seen: set[str] = set()
+        for metadata_path in sorted(output_root.glob("*/metadata.json")):
+            output_dir = str(metadata_path.parent)
+            seen.add(output_dir)
+            modified = metadata_path.stat().st_mtime
+            if output_dir in known and known[output_dir] >= modified:
+                continue
+            try:
+                metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            products.append((output_dir, metadata, modified))
+        return self.add_many(products, remove=set(known) - seen)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="생성한 대본·훅·키워드 전문 검색")
+    parser.add_argument("--root", type=Path, default=None, help="project_output 경로")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    query = subparsers.add_parser("query", help="검색어가 모두 포함된 상품 검색")
+    query.add_argument("terms", nargs="+", help="검색어 (공백으로 구분, 모두 포함)")
+    query.add_argument(
+        "--field", action="append", choices=list(SEARCH_FIELDS), help="검색할 항목 (반복 지정 가능)"
+    )
+    query.add_argument("--limit", type=int, default=20)
+    query.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    subparsers.add_parser("rebuild", help="저장된 산출물 폴더를 색인에 반영")
+    args = parser.parse_args(argv)
+
+    output_root = args.root or ProjectPaths.discover().output_root
+    index = SearchIndex(output_root / SEARCH_DB_NAME)
+
+    if args.command == "rebuild":
+        print(f"{index.rebuild(output_root)}개 상품을 색인했습니다 (전체 {len(index)}개).")
+        return 0
+
+    started = time.perf_counter()
+    hits = index.search(" ".join(args.terms), fields=args.field, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    if args.json:
+        print(json.dumps([hit.as_dict() for hit in hits], ensure_ascii=False, indent=2))
+        return 0
+    for hit in hits:
+        saved = datetime.fromtimestamp(hit.saved_at).strftime("%Y-%m-%d")
+        print(f"{saved}  {hit.product_name[:24]:<24}  {hit.snippet}  ({Path(hit.output_dir).name})")
+    print(f"{len(hits)}건 · {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+"""Process-wide shared service instances.
+
+Constructing ``OpenAIClient`` configures the provider SDK and opens an HTTP client, and
+``DouyinSearchService`` owns a ``requests.Session``. The container builds each service
+once and hands the same instance to every Streamlit session and job worker, so their
+connection pools are reused. The LLM services are rebuilt automatically when the provider
+settings (secrets or environment) change; path-bound stores (SQLite indexes, caches) live
+as long as the container.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Iterable, TypeVar
+
+from .corpus import ReferenceCorpus
+from .dag import StageCache
+from .douyin_search import DouyinSearchService
+from .file_manager import OutputManager
+from .fingerprint import FingerprintIndex
+from .keyword_translator import KeywordTranslator
+from .media import MediaPostProcessor
+from .profiles import StageProfiles
+from .script_generator import ScriptService
+from .similarity import ProductIndex
+from .utils import ProjectPaths, get_config
+
+T = TypeVar("T")
+
+# Settings that change how LLM clients are built; a change rebuilds CONFIGURED_SERVICES.
+CONFIG_KEYS: tuple[str, ...] = (
+    "AI_PROVIDER",
+    "GEMINI_API_KEY",
+    "GEMINI_MODEL",
+    "GEMINI_API_ENDPOINT",
+    "GEMINI_REQUEST_INTERVAL",
+    "GEMINI_CONTEXT_CACHE_TTL",
+    "GEMINI_MAX_CANDIDATES",
+    "OPENAI_API_KEY",
+    "OPENAI_MODEL",
+    "OPENAI_BASE_URL",
+    "LLM_STRUCTURED_OUTPUT",
+    "LLM_STAGE_PROFILES",
+    "LLM_AUTO_MAX_TOKENS",
+)
+CONFIGURED_SERVICES = frozenset({"script", "keywords", "profiles"})
+
+
+def config_fingerprint() -> str:
+    """Digest of the current provider settings (never stores the secrets themselves)."""
+    values = {key: get_config(key) for key in CONFIG_KEYS}
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _close(instance: Any) -> None:
+    close = getattr(instance, "close", None)
+    if callable(close):
+        close()
+
+
+class ServiceContainer:
+    """Thread-safe lazy holder for the services used by the generation pipeline."""
+
+    def __init__(self, paths: ProjectPaths | None = None) -> None:
+        self.paths = paths
+        self._lock = threading.Lock()
+        self._instances: dict[str, Any] = {}
+        self._fingerprint: str | None = None
+
+    def _get(self, name: str, factory: Callable[[], T]) -> T:
+        replaced: list[Any] = []
+        with self._lock:
+            if name in CONFIGURED_SERVICES:
+                fingerprint = config_fingerprint()
+                if fingerprint != self._fingerprint:
+                    replaced = self._drop(CONFIGURED_SERVICES)
+                    self._fingerprint = fingerprint
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = self._instances[name] = factory()
+        for old in replaced:
+            _close(old)
+        return instance
+
+    def _drop(self, names: Iterable[str]) -> list[Any]:
+        """Remove ``names`` from the container (caller holds ``_lock``) and return them."""
+        return [self._instances.pop(name) for name in names if name in self._instances]
+
+    def script_service(self) -> ScriptService:
+        profiles = self.stage_profiles()  # resolved first: _get holds the lock while building
+        return self._get("script", lambda: ScriptService(profiles=profiles))
+
+    def keyword_translator(self) -> KeywordTranslator:
+        profiles = self.stage_profiles()
+        return self._get("keywords", lambda: KeywordTranslator(profiles=profiles))
+
+    def search_service(self) -> DouyinSearchService:
+        return self._get("douyin_search", DouyinSearchService)
+
+    def output_manager(self) -> OutputManager:
+        return self._get("outputs", lambda: OutputManager(self.paths))
+
+    def reference_corpus(self) -> ReferenceCorpus:
+        return self._get("corpus", lambda: ReferenceCorpus.for_paths(self.paths))
+
+    def product_index(self) -> ProductIndex:
+        return self._get("products", lambda: ProductIndex.for_paths(self.paths))
+
+    def media_processor(self) -> MediaPostProcessor:
+        return self._get("media", lambda: MediaPostProcessor.for_paths(self.paths))
+
+    def fingerprint_index(self) -> FingerprintIndex:
+        return self._get("fingerprints", lambda: FingerprintIndex.for_paths(self.paths))
+
+    def stage_cache(self) -> StageCache:
+        return self._get("stages", lambda: StageCache.for_paths(self.paths))
+
+    def stage_profiles(self) -> StageProfiles:
+        return self._get("profiles", lambda: StageProfiles.for_paths(self.paths))
+
+    def invalidate(self) -> None:
+        """Close the configuration-bound services; the next access rebuilds them."""
+        with self._lock:
+            replaced = self._drop(CONFIGURED_SERVICES)
+            self._fingerprint = None
+        for old in replaced:
+            _close(old)
+
+    def close(self) -> None:
+        """Close every instance, including the path-bound SQLite stores."""
+        with self._lock:
+            instances = self._drop(list(self._instances))
+            self._fingerprint = None
+        for instance in instances:
+            _close(instance)
+
+
+_containers: dict[ProjectPaths | None, ServiceContainer] = {}
+_containers_lock = threading.Lock()
+
+
+def get_services(paths: ProjectPaths | None = None) -> ServiceContainer:
+    """Return the process-wide container for ``paths`` (created on first use)."""
+    with _containers_lock:
+        container = _containers.get(paths)
+        if container is None:
+            container = _containers[paths] = ServiceContainer(paths)
+        return container
+
+
+def reset_services() -> None:
+    """Invalidate all containers, e.g. after editing secrets at runtime."""
+    with _containers_lock:
+        for container in _containers.values():
+            container.invalidate()
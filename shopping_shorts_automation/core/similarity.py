@@ -0,0 +1,225 @@
+"""Near-duplicate detection over previously generated products.
+
+Past requests are read from every saved ``metadata.json`` and embedded locally as TF-IDF
+vectors over character 2/3-grams (NumPy only, no embedding service), which is robust to
+spacing and word order differences such as "무선 이어폰" vs "블루투스 무선이어폰".
+
+The score is the product-name cosine, raised towards 1 by a second cosine between the
+request (name, audience, tone, style) and the past context: its audience, tone, style,
+generated hook and Korean keywords (``CONTEXT_WEIGHT``). A past product whose hook or
+keywords mention the new name ranks higher, while a shared audience alone stays under the
+threshold.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .utils import ProjectPaths
+
+if TYPE_CHECKING:
+    from .script_generator import ScriptRequest
+
+DEFAULT_THRESHOLD = 0.5
+_NORMALIZE_PATTERN = re.compile(r"[\W_]+", flags=re.UNICODE)
+# Request fields that must match for a result to be reused as-is.
+_SETTING_FIELDS = ("target_audience", "tone", "style", "language")
+# Request fields compared against the past context besides the product name.
+_CONTEXT_FIELDS = ("target_audience", "tone", "style")
+CONTEXT_WEIGHT = 0.5
+
+
+def char_ngrams(text: str, sizes: tuple[int, ...] = (2, 3)) -> list[str]:
+    normalized = _NORMALIZE_PATTERN.sub("", text.lower())
+    grams = [normalized[i : i + n] for n in sizes for i in range(len(normalized) - n + 1)]
+    return grams or ([normalized] if normalized else [])
+
+
+@dataclass(slots=True)
+class SimilarProduct:
+    """A past generation close to the current request."""
+
+    score: float
+    product_name: str
+    output_dir: str
+    same_settings: bool
+    metadata: dict[str, Any] = field(repr=False)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "score": self.score,
+            "product_name": self.product_name,
+            "output_dir": self.output_dir,
+            "same_settings": self.same_settings,
+            "hook": (self.metadata.get("script_bundle") or {}).get("hook", ""),
+        }
+
+
+class ProductIndex:
+    """In-memory TF-IDF index over saved products, refreshed incrementally from disk."""
+
+    def __init__(self, output_root: Path) -> None:
+        self.output_root = output_root
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._name: _TfIdf | None = None
+        self._context: _TfIdf | None = None
+        self._order: list[str] = []
+
+    @classmethod
+    def for_paths(cls, paths: ProjectPaths | None = None) -> "ProductIndex":
+        return cls((paths or ProjectPaths.discover()).output_root)
+
+    def refresh(self) -> None:
+        """Load metadata files that are new or changed since the last refresh."""
+        changed = False
+        seen: set[str] = set()
+        for metadata_path in self.output_root.glob("*/metadata.json"):
+            key = str(metadata_path.parent)
+            seen.add(key)
+            try:
+                mtime = metadata_path.stat().st_mtime
+            except OSError:
+                continue
+            cached = self._entries.get(key)
+            if cached and cached[0] == mtime:
+                continue
+            try:
+                metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if not metadata.get("script_bundle") or not metadata.get("keywords"):
+                continue
+            self._entries[key] = (mtime, metadata)
+            changed = True
+        for key in set(self._entries) - seen:
+            del self._entries[key]
+            changed = True
+        if changed or self._name is None:
+            self._build()
+
+    def _build(self) -> None:
+        self._order = sorted(self._entries, key=lambda key: self._entries[key][0], reverse=True)
+        metadata = [self._entries[key][1] for key in self._order]
+        self._name = _TfIdf([char_ngrams(item.get("product_name", "")) for item in metadata])
+        self._context = _TfIdf([char_ngrams(_context_text(item)) for item in metadata])
+
+    def find_similar(
+        self,
+        request: ScriptRequest,
+        limit: int = 3,
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> list[SimilarProduct]:
+        """Past products scoring at least ``threshold`` (0-1, see the module docstring)."""
+        import numpy as np
+
+        with self._lock:
+            self.refresh()
+            if not self._order or self._name is None or self._context is None:
+                return []
+            name_scores = self._name.scores(char_ngrams(request.product_name))
+            if name_scores is None:
+                return []
+            query = " ".join(
+                [request.product_name, *(getattr(request, key) for key in _CONTEXT_FIELDS)]
+            )
+            context_scores = self._context.scores(char_ngrams(query))
+            scores = name_scores
+            if context_scores is not None:
+                # Context only ever raises the name score, so the threshold keeps its meaning.
+                scores = scores + (1.0 - scores) * CONTEXT_WEIGHT * context_scores
+            ranked = np.argsort(-scores, kind="stable")
+
+            matches: list[SimilarProduct] = []
+            names: set[str] = set()
+            for row in ranked:
+                score = float(scores[row])
+                if score < threshold or len(matches) >= limit:
+                    break
+                metadata = self._entries[self._order[row]][1]
+                name = metadata.get("product_name", "")
+                if name in names:
+                    continue  # newest generation per product name only
+                names.add(name)
+                previous = metadata.get("input") or {}
+                matches.append(
+                    SimilarProduct(
+                        score=round(score, 3),
+                        product_name=name,
+                        output_dir=self._order[row],
+                        same_settings=all(
+                            previous.get(key) == getattr(request, key) for key in _SETTING_FIELDS
+                        ),
+                        metadata=metadata,
+                    )
+                )
+            return matches
+
+    def load(self, output_dir: str) -> dict[str, Any]:
+        """Metadata of a previously generated product (for reuse)."""
+        path = Path(output_dir) / "metadata.json"
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"재사용할 이전 결과를 불러오지 못했습니다: {output_dir}") from exc
+
+
+def _context_text(metadata: dict[str, Any]) -> str:
+    """Audience, tone, style, hook and Korean keywords of a past generation."""
+    previous = metadata.get("input") or {}
+    keywords = metadata.get("keywords") or {}
+    parts = [str(previous.get(key) or "") for key in _CONTEXT_FIELDS]
+    parts.append(str((metadata.get("script_bundle") or {}).get("hook") or ""))
+    parts.extend(str(keyword) for keyword in keywords.get("korean_keywords") or [])
+    return " ".join(parts)
+
+
+class _TfIdf:
+    """Row-normalized TF-IDF matrix over n-gram documents."""
+
+    def __init__(self, documents: list[list[str]]) -> None:
+        import numpy as np
+
+        self.vocabulary: dict[str, int] = {}
+        for grams in documents:
+            for gram in grams:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+
+        counts = np.zeros((len(documents), max(1, len(self.vocabulary))), dtype=np.float32)
+        for row, grams in enumerate(documents):
+            for gram in grams:
+                counts[row, self.vocabulary[gram]] += 1.0
+        document_frequency = (counts > 0).sum(axis=0)
+        self.documents = len(documents)
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1.0
+        weighted = counts * self.idf
+        norms = np.linalg.norm(weighted, axis=-1, keepdims=True)
+        self.matrix = weighted / np.where(norms == 0, 1.0, norms)
+
+    def scores(self, grams: list[str]) -> Any:
+        """Cosine of the query against every row, or None when no n-gram is known."""
+        import numpy as np
+
+        query = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        unseen: dict[str, int] = {}
+        for gram in grams:
+            column = self.vocabulary.get(gram)
+            if column is not None:
+                query[column] += 1.0
+            else:
+                unseen[gram] = unseen.get(gram, 0) + 1
+        if not query.any():
+            return None
+        weighted = query * self.idf
+        # n-grams never seen before still count towards the query norm (max IDF).
+        unseen_idf = np.log(1 + self.documents) + 1.0
+        norm = np.sqrt(
+            float(weighted @ weighted)
+            + sum((count * unseen_idf) ** 2 for count in unseen.values())
+        )
+        return self.matrix @ (weighted / norm)
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Protocol, TypeVar
+
+from .metrics import MetricsSpanExporter
+from .utils import ProjectPaths
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(slots=True)
+class Span:
+    """A single timed operation inside a generation trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float
+    duration_ms: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class SpanExporter(Protocol):
+    """Receives every finished span; an optional ``start(span)`` is called when it opens."""
+
+    def export(self, span: Span) -> None: ...
+
+
+class JsonlSpanExporter:
+    """Append finished spans to a local JSON Lines file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.as_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+
+
+def _otel_attributes(span: Span) -> dict[str, Any]:
+    attributes = {
+        key: value
+        for key, value in span.attributes.items()
+        if isinstance(value, (str, bool, int, float))
+    }
+    attributes.update({"app.trace_id": span.trace_id, "app.span_id": span.span_id})
+    if span.parent_id:
+        attributes["app.parent_id"] = span.parent_id
+    return attributes
+
+
+class OpenTelemetrySpanExporter:
+    """Mirror spans into the globally configured OpenTelemetry tracer provider.
+
+    OTel spans are opened in :meth:`start` as children of the parent span's OTel span, so
+    the backend shows one trace per generation instead of unrelated root spans.
+    """
+
+    def __init__(self, instrumentation_name: str = "shopping_shorts_automation") -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError(
+                "opentelemetry-api 패키지가 필요합니다. "
+                "pip install opentelemetry-api opentelemetry-sdk 로 설치하세요."
+            )
+        self._trace = trace
+        self._tracer = trace.get_tracer(instrumentation_name)
+        self._lock = threading.Lock()
+        # app span_id -> open OTel span, until the span is exported.
+        self._open: dict[str, Any] = {}
+
+    def start(self, span: Span) -> Any:
+        with self._lock:
+            parent = self._open.get(span.parent_id) if span.parent_id else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self._tracer.start_span(
+            span.name,
+            context=context,
+            start_time=int(span.start_time * 1e9),
+            attributes=_otel_attributes(span),
+        )
+        with self._lock:
+            self._open[span.span_id] = otel_span
+        return otel_span
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:  # exporter added while the span was open
+            otel_span = self.start(span)
+            with self._lock:
+                self._open.pop(span.span_id, None)
+        otel_span.set_attributes(_otel_attributes(span))
+        if span.error:
+            from opentelemetry.trace import Status, StatusCode
+
+            otel_span.set_attribute("error.message", span.error)
+            otel_span.set_status(Status(StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.start_time * 1e9) + int(span.duration_ms * 1e6))
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_collected_spans: ContextVar[list[Span] | None] = ContextVar("collected_spans", default=None)
+
+
+class Tracer:
+    """Minimal span tracer with pluggable exporters."""
+
+    def __init__(self, exporters: Iterable[SpanExporter] | None = None) -> None:
+        self.exporters: list[SpanExporter] = list(exporters or [])
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        self.exporters.append(exporter)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Time the enclosed block as a child of the currently active span."""
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes=dict(attributes),
+        )
+        self._start(span)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as exc:
+            span.status = "error"
+            span.error = f"{type(exc).__name__}: {exc}"[:500]
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000.0
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _start(self, span: Span) -> None:
+        for exporter in self.exporters:
+            start = getattr(exporter, "start", None)
+            if start is None:
+                continue
+            try:
+                start(span)
+            except Exception:  # pragma: no cover - exporters must never break the pipeline
+                continue
+
+    def _finish(self, span: Span) -> None:
+        collected = _collected_spans.get()
+        if collected is not None:
+            collected.append(span)
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:  # pragma: no cover - exporters must never break the pipeline
+                continue
+
+
+def _build_default_tracer() -> Tracer:
+    # Stage latency histograms are always fed, even when span export is disabled.
+    tracer = Tracer([MetricsSpanExporter()])
+    if os.environ.get("TRACING_ENABLED", "true").strip().lower() not in {"1", "true", "yes", "y"}:
+        return tracer
+    jsonl_path = os.environ.get("TRACE_JSONL_PATH")
+    tracer.add_exporter(
+        JsonlSpanExporter(
+            Path(jsonl_path) if jsonl_path else ProjectPaths.discover().output_root / "traces.jsonl"
+        )
+    )
+    if os.environ.get("TRACE_OTEL_EXPORT", "false").strip().lower() in {"1", "true", "yes", "y"}:
+        try:
+            tracer.add_exporter(OpenTelemetrySpanExporter())
+        except ImportError:
+            pass
+    return tracer
+
+
+_tracer: Tracer | None = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer, configured from environment variables on first use."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = _build_default_tracer()
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> None:
+    """Replace the process-wide tracer (tests, benchmarks, custom exporters)."""
+    global _tracer
+    _tracer = tracer
+
+
+def traced(name: str, **attributes: Any) -> Callable[[F], F]:
+    """Decorator wrapping every call of the function in a span."""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with get_tracer().span(name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def collect_spans() -> Iterator[list[Span]]:
+    """Collect every span finished inside the block (in completion order)."""
+    spans: list[Span] = []
+    token = _collected_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _collected_spans.reset(token)
+
+
+def stage_breakdown(spans: Iterable[Span]) -> list[dict[str, Any]]:
+    """Aggregate spans by name into rows ordered by first start time."""
+    spans = list(spans)
+    roots = [span for span in spans if span.parent_id is None]
+    total_ms = sum(span.duration_ms for span in roots) or sum(span.duration_ms for span in spans)
+
+    rows: dict[str, dict[str, Any]] = {}
+    for span in sorted(spans, key=lambda item: item.start_time):
+        row = rows.setdefault(
+            span.name,
+            {"stage": span.name, "calls": 0, "total_ms": 0.0, "errors": 0},
+        )
+        row["calls"] += 1
+        row["total_ms"] += span.duration_ms
+        if span.status != "ok":
+            row["errors"] += 1
+
+    for row in rows.values():
+        row["share"] = round(row["total_ms"] / total_ms, 3) if total_ms else 0.0
+        row["total_ms"] = round(row["total_ms"], 1)
+    return list(rows.values())
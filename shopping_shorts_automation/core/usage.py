@@ -0,0 +1,256 @@
+"""Token, latency and cost accounting for LLM calls.
+
+``OpenAIClient`` reports every successful call through :func:`record_usage`; callers wrap
+a unit of work (one product) in :func:`collect_usage` and persist
+:func:`summarize_usage` output next to the generated artefacts.
+
+``cached_ratio`` is the share of input tokens served from the provider's prompt cache
+(OpenAI automatic prefix caching, Gemini context caching).
+
+Rank prompts by spend across all saved products::
+
+    python -m core.usage report --sort tokens
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from .utils import ProjectPaths
+
+# USD per 1M tokens (input, output, cached input). Public list prices at the time of
+# writing; override or extend with LLM_PRICES_JSON='{"model": [input, output, cached]}'
+# (cached defaults to the input price when omitted).
+MODEL_PRICES_PER_MILLION: dict[str, tuple[float, ...]] = {
+    "gpt-4o-mini": (0.15, 0.60, 0.075),
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "gpt-4.1-mini": (0.40, 1.60, 0.10),
+    "gpt-4.1": (2.00, 8.00, 0.50),
+    "gemini-1.5-flash": (0.075, 0.30, 0.01875),
+    "gemini-2.0-flash": (0.10, 0.40, 0.025),
+    "gemini-2.5-flash": (0.30, 2.50, 0.075),
+    "gemini-2.5-pro": (1.25, 10.00, 0.31),
+}
+
+
+@dataclass(slots=True)
+class UsageRecord:
+    """Usage metadata captured from a single successful provider call."""
+
+    provider: str
+    model: str
+    stage: str
+    prompt_name: str | None
+    input_tokens: int
+    output_tokens: int
+    latency_ms: float
+    cost_usd: float | None = None
+    # Part of ``input_tokens`` served from the provider's prompt/context cache.
+    cached_tokens: int = 0
+    # Replies sampled in the call (OpenAI ``n`` / Gemini ``candidate_count``).
+    candidates: int = 1
+    # A reply hit ``max_tokens`` (OpenAI ``finish_reason="length"``, Gemini ``MAX_TOKENS``).
+    truncated: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _price_table() -> dict[str, tuple[float, ...]]:
+    prices = dict(MODEL_PRICES_PER_MILLION)
+    override = os.environ.get("LLM_PRICES_JSON")
+    if override:
+        try:
+            prices.update({model: tuple(pair) for model, pair in json.loads(override).items()})
+        except (ValueError, TypeError, AttributeError):
+            pass
+    return prices
+
+
+def estimate_cost(
+    model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0
+) -> float | None:
+    """Estimate USD cost; the longest matching model-name prefix wins."""
+    prices = _price_table()
+    name = model.removeprefix("models/")
+    matches = [key for key in prices if name.startswith(key)]
+    if not matches:
+        return None
+    input_price, output_price, *rest = prices[max(matches, key=len)]
+    cached_price = rest[0] if rest else input_price
+    cached_tokens = min(cached_tokens, input_tokens)
+    return round(
+        (
+            (input_tokens - cached_tokens) * input_price
+            + cached_tokens * cached_price
+            + output_tokens * output_price
+        )
+        / 1_000_000,
+        6,
+    )
+
+
+_usage_sinks: ContextVar[tuple[list[UsageRecord], ...]] = ContextVar("usage_sinks", default=())
+
+
+@contextmanager
+def collect_usage() -> Iterator[list[UsageRecord]]:
+    """Collect usage records emitted inside the block (nested collectors all receive them)."""
+    records: list[UsageRecord] = []
+    token = _usage_sinks.set(_usage_sinks.get() + (records,))
+    try:
+        yield records
+    finally:
+        _usage_sinks.reset(token)
+
+
+def record_usage(record: UsageRecord) -> None:
+    for sink in _usage_sinks.get():
+        sink.append(record)
+
+
+def _aggregate(records: Iterable[UsageRecord]) -> dict[str, Any]:
+    records = list(records)
+    costs = [record.cost_usd for record in records if record.cost_usd is not None]
+    input_tokens = sum(record.input_tokens for record in records)
+    cached_tokens = sum(record.cached_tokens for record in records)
+    return {
+        "calls": len(records),
+        "input_tokens": input_tokens,
+        "output_tokens": sum(record.output_tokens for record in records),
+        "cached_tokens": cached_tokens,
+        "cached_ratio": round(cached_tokens / input_tokens, 3) if input_tokens else 0.0,
+        "latency_ms": round(sum(record.latency_ms for record in records), 1),
+        "cost_usd": round(sum(costs), 6) if costs else None,
+    }
+
+
+def summarize_usage(records: Iterable[UsageRecord]) -> dict[str, Any]:
+    """Aggregate records per stage and in total, keeping the raw call list."""
+    records = list(records)
+    stages: dict[str, list[UsageRecord]] = {}
+    for record in records:
+        stages.setdefault(record.stage, []).append(record)
+    return {
+        "total": _aggregate(records),
+        "by_stage": {stage: _aggregate(items) for stage, items in stages.items()},
+        "calls": [record.as_dict() for record in records],
+    }
+
+
+def _saved_at(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def load_usage_records(output_root: Path) -> list[tuple[str, UsageRecord]]:
+    """Read per-call usage from every saved ``metadata.json``, oldest product first.
+
+    Products are ordered by when their metadata was written, not by folder name, so the
+    tail of the list is the most recent traffic.
+    """
+    rows: list[tuple[str, UsageRecord]] = []
+    for metadata_path in sorted(output_root.glob("*/metadata.json"), key=_saved_at):
+        try:
+            metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        product = metadata.get("product_name") or metadata_path.parent.name
+        for call in (metadata.get("usage") or {}).get("calls", []):
+            try:
+                rows.append((product, UsageRecord(**call)))
+            except TypeError:
+                continue
+    return rows
+
+
+def rank_prompts(
+    records: Iterable[UsageRecord], sort_by: str = "tokens"
+) -> list[dict[str, Any]]:
+    """Group records by prompt and rank them by total tokens, latency or cost."""
+    groups: dict[str, list[UsageRecord]] = {}
+    for record in records:
+        groups.setdefault(record.prompt_name or f"({record.stage})", []).append(record)
+
+    rows = []
+    for prompt_name, items in groups.items():
+        aggregate = _aggregate(items)
+        latencies = sorted(float(item.latency_ms) for item in items)
+        rows.append(
+            {
+                "prompt": prompt_name,
+                "calls": aggregate["calls"],
+                "input_tokens": aggregate["input_tokens"],
+                "output_tokens": aggregate["output_tokens"],
+                "cached_ratio": aggregate["cached_ratio"],
+                "avg_tokens": round(
+                    (aggregate["input_tokens"] + aggregate["output_tokens"]) / len(items), 1
+                ),
+                "avg_latency_ms": round(aggregate["latency_ms"] / len(items), 1),
+                "p95_latency_ms": round(
+                    latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 1
+                ),
+                "cost_usd": aggregate["cost_usd"],
+            }
+        )
+
+    sort_keys = {
+        "tokens": lambda row: row["input_tokens"] + row["output_tokens"],
+        "latency": lambda row: row["avg_latency_ms"],
+        "cost": lambda row: row["cost_usd"] or 0.0,
+    }
+    return sorted(rows, key=sort_keys[sort_by], reverse=True)
+
+
+def _print_report(rows: list[dict[str, Any]], products: int) -> None:
+    print(f"제품 {products}개 기준 프롬프트별 사용량")
+    header = (
+        f"{'prompt':<28}{'calls':>7}{'in':>10}{'out':>10}{'cached':>8}"
+        f"{'avg tok':>10}{'avg ms':>10}{'p95 ms':>10}{'USD':>11}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        cost = f"{row['cost_usd']:.4f}" if row["cost_usd"] is not None else "-"
+        print(
+            f"{row['prompt']:<28}{row['calls']:>7}"
+            f"{row['input_tokens']:>10}{row['output_tokens']:>10}{row['cached_ratio']:>8.0%}"
+            f"{row['avg_tokens']:>10}"
+            f"{row['avg_latency_ms']:>10}{row['p95_latency_ms']:>10}{cost:>11}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="LLM 토큰/지연 시간 사용량 리포트")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report = subparsers.add_parser("report", help="프롬프트별 토큰/지연 시간 순위")
+    report.add_argument("--root", type=Path, default=None, help="project_output 경로")
+    report.add_argument("--sort", choices=("tokens", "latency", "cost"), default="tokens")
+    report.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = parser.parse_args(argv)
+
+    output_root = args.root or ProjectPaths.discover().output_root
+    rows = load_usage_records(output_root)
+    ranked = rank_prompts((record for _, record in rows), sort_by=args.sort)
+    if args.json:
+        print(json.dumps(ranked, ensure_ascii=False, indent=2))
+    else:
+        _print_report(ranked, len({product for product, _ in rows}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
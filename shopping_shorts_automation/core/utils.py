@@ -3,17 +3,39 @@ from __future__ import annotations
 import json
 import os
 import re
+import sys
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-try:
-    import streamlit as st
-    from streamlit.runtime.scriptrunner import get_script_run_ctx
-    HAS_STREAMLIT = True
-except ImportError:
-    HAS_STREAMLIT = False
+
+def running_in_streamlit() -> bool:
+    """Return True inside a Streamlit server process (script thread or worker thread)."""
+    # Streamlit is only ever loaded by the app itself, so workers and CLIs never
+    # pay for importing it just to answer this question.
+    if "streamlit" not in sys.modules:
+        return False
+    try:
+        from streamlit import runtime
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return False
+    # Background job threads have no script-run context but share the runtime.
+    return runtime.exists() or get_script_run_ctx() is not None
+
+
+def get_config(key: str, default: str = "") -> str:
+    """Get config from Streamlit secrets or environment variables."""
+    if running_in_streamlit():
+        try:
+            import streamlit as st
+
+            if hasattr(st, "secrets") and key in st.secrets:
+                return st.secrets[key]
+        except Exception:
+            pass  # Secrets unavailable, fall back to environment
+    return os.environ.get(key, default)
 
 
 @dataclass(frozen=True)
@@ -31,7 +53,11 @@ class ProjectPaths:
 
         # Determine output directory based on environment
         # Use /tmp in Streamlit Cloud (read-only filesystem), local path otherwise
-        if HAS_STREAMLIT and get_script_run_ctx() is not None:
+        override = get_config("PROJECT_OUTPUT_ROOT").strip()
+        if override:
+            # Explicit root (load tests, isolated runs) wins over both defaults
+            output_root = Path(override).expanduser()
+        elif running_in_streamlit():
             # Running in Streamlit - use /tmp for cloud compatibility
             output_root = Path("/tmp") / "project_output"
         else:
@@ -63,6 +89,24 @@ def load_prompt(prompt_name: str) -> str:
     return prompt_path.read_text(encoding="utf-8")
 
 
+# Line that opens the per-product block at the end of every prompt template.
+PROMPT_INPUT_MARKER = "[상품 정보]"
+
+
+def load_prompt_parts(prompt_name: str) -> tuple[str, str]:
+    """Split a template into its static prefix and the per-product template.
+
+    Everything above the last ``[상품 정보]`` line is identical for every product, so it is
+    sent first where provider-side prefix caches can reuse it. The prefix is returned with
+    ``{{``/``}}`` already unescaped; the second part still needs ``.format()``.
+    """
+    template = load_prompt(prompt_name)
+    static, marker, dynamic = template.rpartition(f"\n{PROMPT_INPUT_MARKER}\n")
+    if not marker:
+        return "", template
+    return static.strip().format(), marker.lstrip() + dynamic
+
+
 def today_stamp() -> str:
     """Return current date as YYYYMMDD string."""
     return datetime.now().strftime("%Y%m%d")
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from core.batch import BatchRunner, LocalBatchBackend
+from core.pipeline import GenerationOptions
+
+
+def test_local_batch_round_trip(tmp_paths, tmp_path):
+    products = [
+        GenerationOptions.from_dict(
+            {
+                "product_name": f"{name} {index}",
+                "target_audience": "25-40세 직장인",
+                "tone": "신뢰형",
+                "style": "문제 해결",
+                "language": "ko",
+            }
+        )
+        for index, name in enumerate(["무선 이어폰", "신발 건조기", "블루라이트 안경"] * 2)
+    ]
+    runner = BatchRunner(LocalBatchBackend(tmp_path / "backend"), tmp_paths, poll_interval=0.01)
+
+    report = runner.run(products, work_dir=tmp_path / "run")
+    assert len(report.saved) == len(products) and not report.failed
+    metadata = json.loads((Path(report.saved[0]) / "metadata.json").read_text(encoding="utf-8"))
+    assert metadata["script_bundle"]["thumbnail_options"]
+    assert {call["stage"] for call in metadata["usage"]["calls"]} == {
+        "script",
+        "keywords",
+        "thumbnail",
+    }
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import json
+
+from core.corpus import ReferenceCorpus
+from core.douyin_search import DouyinVideo
+
+
+def test_ingest_deduplicates_and_maps_keywords(douyin_api_body, tmp_path):
+    items = json.loads(douyin_api_body)["data"]["items"]
+    videos = [DouyinVideo.from_payload(item) for item in items]
+    corpus = ReferenceCorpus(tmp_path / "reference_corpus")
+    assert corpus.ingest(videos[:5], "无线耳机") == 5
+    assert corpus.ingest(videos, "无线耳机") == len(videos) - 5  # deduplicated on aweme_id
+    # Already stored videos are still mapped to a later keyword.
+    assert corpus.ingest(videos[:5], "蓝牙耳机") == 0
+    assert len(corpus.query(keyword="蓝牙耳机", limit=100)) == 5
+    assert len(corpus.query(keyword="无线耳机", limit=100)) == len(videos)
+
+    rows = corpus.query(keyword="无线耳机", min_plays=100_000, max_duration=40)
+    assert all(row["play_count"] >= 100_000 and 0 < row["duration"] <= 40 for row in rows)
+    assert corpus.get(videos[0].aweme_id)["share_url"] == videos[0].share_url
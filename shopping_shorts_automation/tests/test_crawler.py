@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+
+from core.douyin_crawler import DouyinCrawler, DouyinCrawlerConfig, merge_search_results
+from core.douyin_search import DouyinSearchRequest, DouyinVideo
+
+
+def test_api_search_maps_share_urls(replay_search_service):
+    videos = replay_search_service.search(DouyinSearchRequest(keyword="无线耳机", max_results=10))
+    assert videos and videos[0].share_url
+
+
+def test_parse_search_html(douyin_search_html):
+    videos = DouyinCrawler(DouyinCrawlerConfig(max_results=30)).parse_search_html(
+        douyin_search_html
+    )
+    assert len(videos) == 12
+    assert videos[0].play_count > 0
+
+
+def test_lean_profile_blocks_heavy_resources(chrome, heavy_search_site):
+    crawler = DouyinCrawler(
+        DouyinCrawlerConfig(
+            wait_seconds=1.0,
+            scroll_pause_seconds=0.1,
+            scroll_times=2,
+            max_results=30,
+            block_resources=True,
+            search_url=f"{heavy_search_site.url}/search/{{keyword}}",
+        )
+    )
+    driver = crawler._build_driver()
+    try:
+        html = crawler.fetch_search_html(driver, "无线耳机")
+        api_items = driver.execute_script("return document.documentElement.dataset.apiItems;")
+    finally:
+        driver.quit()
+
+    assert len(crawler.parse_search_html(html)) == 12
+    assert api_items == "3"  # XHR/fetch traffic is never blocked
+    sent = heavy_search_site.bytes_sent
+    assert not (sent["image"] or sent["font"] or sent["media"])
+
+
+def test_search_many_returns_every_keyword(chrome, heavy_search_site):
+    keywords = ["无线耳机", "降噪耳机", "蓝牙耳机推荐", "通勤耳机"]
+    crawler = DouyinCrawler(
+        DouyinCrawlerConfig(
+            wait_seconds=1.0,
+            scroll_pause_seconds=0.2,
+            scroll_times=3,
+            max_results=30,
+            max_tabs=4,
+            search_url=f"{heavy_search_site.url}/search/{{keyword}}",
+        )
+    )
+
+    results = crawler.search_many(keywords)
+    assert list(results) == keywords
+    assert all(len(videos) == 12 for videos in results.values())
+    # Every tab serves the same fixture page, so merging leaves one copy of each video.
+    assert len(merge_search_results(results.values())) == 12
+
+
+def test_download_prefetch_filters_before_fetching(tmp_path, video_page_site):
+    plays = {"1": 100, "2": 900, "3": 800, "4": 500, "5": 700, "6": 50}
+    videos = [
+        DouyinVideo(
+            title=f"clip-{video_id}",
+            author="",
+            play_count=play_count,
+            digg_count=0,
+            duration=0.0,
+            share_url=f"{video_page_site.url}/video/{video_id}",
+            cover_url="",
+            aweme_id=video_id,
+        )
+        for video_id, play_count in plays.items()
+    ]
+    crawler = DouyinCrawler(DouyinCrawlerConfig(download_limit=2, prefetch_workers=6))
+
+    records = crawler.download(videos, tmp_path)
+    # 2: too long, 3: too large, 5: webm; of the rest the two most played win.
+    assert [record["original_url"].rsplit("/", 1)[1] for record in records] == ["4", "1"]
+    media = sorted(path.name for path in (tmp_path / "douyin_media").glob("*.mp4"))
+    assert media == ["clip-1.mp4", "clip-4.mp4"]
+    probes = json.loads((tmp_path / "douyin_media" / "prefetch.json").read_text(encoding="utf-8"))
+    rejected = {probe["url"][-1] for probe in probes if probe["rejected"]}
+    assert {"2", "3", "5"} <= rejected
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import io
+import os
+import zipfile
+
+from core.file_manager import OutputManager, archive_outputs, save_outputs
+from core.utils import ensure_json
+
+
+def test_archive_stores_media_and_deflates_text(tmp_path, llm_responses):
+    output_dir = tmp_path / "product"
+    (output_dir / "douyin_media").mkdir(parents=True)
+    for name in ("script.txt", "thumbnail.txt", "keywords.txt", "metadata.json"):
+        (output_dir / name).write_text(llm_responses["script"] * 20, encoding="utf-8")
+    (output_dir / "douyin_media" / "clip.mp4").write_bytes(os.urandom(64 * 1024))
+
+    with archive_outputs(output_dir) as archive:
+        zipped = zipfile.ZipFile(io.BytesIO(archive.read()))
+    with zipped:
+        assert "douyin_media/clip.mp4" in zipped.namelist()
+        assert zipped.getinfo("douyin_media/clip.mp4").compress_type == zipfile.ZIP_STORED
+        assert zipped.getinfo("script.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_every_candidate_reaches_the_saved_files(
+    fake_provider, tmp_paths, llm_responses, script_request
+):
+    from core.script_generator import ScriptService
+
+    bundle = ScriptService().generate_bundle(script_request, candidates=3)
+    manager = OutputManager(tmp_paths)
+    output_dir = manager.create_output_dir(script_request.product_name)
+    save_outputs(
+        output_manager=manager,
+        output_dir=output_dir,
+        product_name=script_request.product_name,
+        script_bundle=bundle,
+        keyword_payload=ensure_json(llm_responses["keywords"]),
+        script_request=script_request,
+    )
+    saved = (output_dir / "script_candidates.txt").read_text(encoding="utf-8")
+    assert all(candidate["hook"] in saved for candidate in bundle["candidates"])
+    assert (output_dir / "thumbnail_sets.txt").read_text(encoding="utf-8").count("[세트") == 3
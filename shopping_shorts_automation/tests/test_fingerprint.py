@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from core.douyin_crawler import DouyinCrawler, DouyinCrawlerConfig
+from core.douyin_search import DouyinVideo
+from core.fingerprint import FingerprintIndex, phash, sample_frames
+from core.media import file_digest
+
+QUIET = ["-hide_banner", "-loglevel", "error", "-y"]
+
+
+@pytest.fixture
+def clips(ffmpeg: str, tmp_path: Path) -> tuple[Path, Path, Path]:
+    """An original, a doctored re-upload of it and an unrelated clip."""
+    original, reupload, other = (tmp_path / f"{name}.mp4" for name in ("a", "b", "c"))
+    source = "gradients=size=360x640:rate=30:speed=0.01:seed=7"
+    subprocess.run(
+        [ffmpeg, *QUIET, "-f", "lavfi", "-i", source, "-t", "8", str(original)], check=True
+    )
+    # Trimmed, downscaled, recompressed and stamped with another account's corner watermark.
+    watermark = "scale=240:426,drawbox=x=10:y=10:w=80:h=30:color=white@0.8:t=fill"
+    subprocess.run(
+        [ffmpeg, *QUIET, "-ss", "1.3", "-i", str(original), "-vf", watermark, "-crf", "35"]
+        + [str(reupload)],
+        check=True,
+    )
+    life = "life=size=360x640:rate=30:mold=10:ratio=0.3:seed=5"
+    subprocess.run([ffmpeg, *QUIET, "-f", "lavfi", "-i", life, "-t", "8", str(other)], check=True)
+    return original, reupload, other
+
+
+def test_phash_samples_every_clip(clips):
+    assert all(len(phash(sample_frames(path))) >= 20 for path in clips)
+
+
+def test_index_flags_reuploads(clips, tmp_paths):
+    original, reupload, other = clips
+    index = FingerprintIndex.for_paths(tmp_paths)
+    assert index.check(original, "7300000000000000001") is None
+    duplicate = index.check(reupload, "7300000000000000002")
+    assert duplicate is not None and duplicate.video_key == "7300000000000000001"
+    assert index.check(other, "7300000000000000003") is None
+
+
+def test_collapse_keeps_first_of_each_clip(clips, tmp_paths):
+    videos = [
+        DouyinVideo(
+            title=path.stem,
+            author="",
+            play_count=0,
+            digg_count=0,
+            duration=8.0,
+            share_url=f"https://www.douyin.com/video/730000000000000000{number}",
+            cover_url="",
+            aweme_id=f"730000000000000000{number}",
+        )
+        for number, path in enumerate(clips, start=1)
+    ]
+    index = FingerprintIndex.for_paths(tmp_paths)
+    for video, path in zip(videos, clips):
+        index.check(path, video.aweme_id)
+    assert [video.title for video in index.collapse(videos)] == ["a", "c"]
+
+
+def test_match_drops_rows_of_deleted_files(tmp_path, tmp_paths):
+    import numpy as np
+
+    hashes = np.arange(24, dtype=np.uint64)
+    deleted, kept = tmp_path / "deleted.mp4", tmp_path / "kept.mp4"
+    kept.write_bytes(b"kept")
+    index = FingerprintIndex.for_paths(tmp_paths)
+    index.add("7300000000000000001", str(deleted), hashes)
+    index.add("7300000000000000002", str(kept), hashes + 1)
+
+    match = index.match(hashes)
+    assert match is not None and match.video_key == "7300000000000000002"
+    reopened = FingerprintIndex.for_paths(tmp_paths)
+    assert [key for key, _, _ in reopened._load()] == ["7300000000000000002"]
+
+
+def test_download_keeps_duplicate_records(tmp_path, tmp_paths, video_page_site):
+    import numpy as np
+
+    # The fixture site serves the same bytes for every clip, so each download is a re-upload
+    # of a clip another product already kept.
+    original = tmp_path / "other_product" / "clip.mp4"
+    original.parent.mkdir()
+    original.write_bytes(bytes(2048))
+    index = FingerprintIndex.for_paths(tmp_paths)
+    index.add("original", str(original), np.arange(24, dtype=np.uint64), file_digest(str(original)))
+    videos = [
+        DouyinVideo(
+            title=f"clip-{video_id}",
+            author="",
+            play_count=int(video_id),
+            digg_count=0,
+            duration=0.0,
+            share_url=f"{video_page_site.url}/video/{video_id}",
+            cover_url="",
+            aweme_id=video_id,
+        )
+        for video_id in ("1", "4")
+    ]
+    crawler = DouyinCrawler(DouyinCrawlerConfig(download_limit=1), fingerprints=index)
+
+    records = crawler.download(videos, tmp_path / "product")
+    # Duplicates leave their slot to the next video, so both are fetched and recorded.
+    assert [record["duplicate_of"] for record in records] == ["original", "original"]
+    for record in records:
+        assert record["kept_path"] == str(original)
+        assert Path(record["filepath"]).samefile(original)  # hard-linked, not a second copy
+    saved = json.loads(
+        (tmp_path / "product" / "douyin_media" / "downloads.json").read_text(encoding="utf-8")
+    )
+    assert saved == records
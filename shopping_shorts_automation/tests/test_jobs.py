@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from core.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, WorkerPool
+
+
+@pytest.fixture
+def queue(tmp_path) -> JobQueue:
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_claim_order_and_kinds(queue):
+    first = queue.submit({"n": 1})
+    report = queue.submit({"n": 2}, kind="report")
+    second = queue.submit({"n": 3})
+
+    assert queue.position(second) == 2
+    assert queue.claim(("generation",)).id == first
+    claimed = queue.claim()
+    assert claimed.id == report and claimed.status == RUNNING and claimed.attempts == 1
+    assert queue.claim().id == second
+    assert queue.claim() is None
+
+
+def test_stale_claim_is_requeued_and_its_late_writes_ignored(queue):
+    job_id = queue.submit({"n": 1})
+    dead = queue.claim()
+    assert queue.requeue_stale(60) == 0
+    assert queue.requeue_stale(0) == 1
+    assert queue.get(job_id).status == QUEUED and queue.get(job_id).claimed_by is None
+
+    retry = queue.claim()
+    assert retry.id == job_id and retry.attempts == 2 and retry.claimed_by != dead.claimed_by
+    # The first run finishing late neither overwrites nor ends the retry.
+    assert not queue.update_progress(job_id, dead.claimed_by, "script", "done")
+    assert not queue.heartbeat(job_id, dead.claimed_by)
+    assert not queue.fail(job_id, dead.claimed_by, "late")
+    assert queue.get(job_id).status == RUNNING
+
+    assert queue.update_progress(job_id, retry.claimed_by, "script", "done")
+    assert queue.complete(job_id, retry.claimed_by, {"ok": True})
+    job = queue.get(job_id)
+    assert job.status == SUCCEEDED and job.result == {"ok": True}
+    assert job.progress == {"script": "done"}
+    assert not queue.complete(job_id, retry.claimed_by, {"ok": False})
+
+
+def test_queue_adds_claim_columns_to_older_databases(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, owner TEXT, "
+            "status TEXT NOT NULL, payload TEXT NOT NULL, progress TEXT NOT NULL DEFAULT '{}', "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) "
+            "VALUES ('old', 'generation', 'queued', '{}', 1, 1)"
+        )
+    conn.close()
+
+    job = JobQueue(path).claim()
+    assert job.id == "old" and job.claimed_by and job.attempts == 1
+
+
+def test_worker_pool_keeps_long_jobs_alive(queue):
+    calls: list[str] = []
+
+    def handler(job, progress):
+        calls.append(job.claimed_by)
+        progress("script", "running")
+        time.sleep(1.0)  # several stale windows without a stage transition
+        return {"n": job.payload["n"]}
+
+    pool = WorkerPool(queue, handler, workers=2, poll_interval=0.05, stale_after_seconds=0.3)
+    job_id = queue.submit({"n": 1})
+    pool.start()
+    try:
+        wait_for(lambda: queue.get(job_id).finished)
+    finally:
+        pool.stop(timeout=5)
+
+    job = queue.get(job_id)
+    assert job.status == SUCCEEDED and job.result == {"n": 1}
+    assert len(calls) == 1 and job.attempts == 1
+
+
+def test_worker_pool_requeues_dead_claims(queue):
+    job_id = queue.submit({"n": 1})
+    queue.claim()  # a worker that died before finishing
+    finished = threading.Event()
+
+    def handler(job, progress):
+        finished.set()
+        raise RuntimeError("boom")
+
+    pool = WorkerPool(queue, handler, workers=1, poll_interval=0.05, stale_after_seconds=0.2)
+    pool.start()
+    try:
+        assert finished.wait(5)
+        wait_for(lambda: queue.get(job_id).finished)
+    finally:
+        pool.stop(timeout=5)
+
+    job = queue.get(job_id)
+    assert job.status == FAILED and "boom" in job.error and job.attempts == 2
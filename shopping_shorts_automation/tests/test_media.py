@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from core import media
+from core.media import MEDIA_CACHE_DIRNAME, MediaPostProcessor
+
+QUIET = ["-hide_banner", "-loglevel", "error", "-y"]
+
+
+def make_clips(ffmpeg: str, download_dir: Path, count: int = 4) -> None:
+    download_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        subprocess.run(
+            [ffmpeg, *QUIET]
+            + ["-f", "lavfi", "-i", f"testsrc2=size=720x1280:rate=30:duration={4 + index}"]
+            + ["-f", "lavfi", "-i", f"sine=frequency={440 + index * 110}:duration={4 + index}"]
+            + ["-g", "30", "-shortest", str(download_dir / f"clip-{index}.mp4")],
+            check=True,
+        )
+
+
+def write_manifest(download_dir: Path) -> None:
+    records = [{"title": path.stem, "filepath": str(path)} for path in download_dir.glob("*.mp4")]
+    (download_dir / "downloads.json").write_text(json.dumps(records), encoding="utf-8")
+
+
+def test_postprocess_renders_derivatives_once_per_content(ffmpeg, tmp_path, tmp_paths):
+    download_dir = tmp_path / "douyin_media"
+    make_clips(ffmpeg, download_dir)
+    shutil.copy(download_dir / "clip-0.mp4", download_dir / "clip-0-again.mp4")
+    write_manifest(download_dir)
+    processor = MediaPostProcessor.for_paths(tmp_paths)
+
+    processed = processor.process(download_dir)
+    assert len(processed) == 5
+    for record in processed:
+        derivatives = record["derivatives"]
+        assert Path(derivatives["proxy"]).exists() and Path(derivatives["audio"]).exists()
+        assert Path(derivatives["contact_sheet"]).exists() and derivatives["keyframes"]
+    # The copied clip shares its hash, so only four cache entries are rendered.
+    assert len(list((tmp_paths.output_root / MEDIA_CACHE_DIRNAME).iterdir())) == 4
+    assert processor.process(download_dir) == processed
+
+
+def kill_worker(*args) -> None:
+    os._exit(1)  # what the OOM killer leaves behind
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setenv("FFMPEG_BINARY", sys.executable)  # never run; only looked up
+    download_dir = tmp_path / "douyin_media"
+    download_dir.mkdir()
+    for name in ("a", "b"):
+        (download_dir / f"{name}.mp4").write_bytes(name.encode() * 1024)
+    write_manifest(download_dir)
+    return download_dir
+
+
+@pytest.mark.parametrize("stage", ["file_digest", "render_derivatives"])
+def test_broken_pool_marks_files_failed(downloads, tmp_paths, monkeypatch, stage):
+    monkeypatch.setattr(media, stage, kill_worker)
+
+    records = MediaPostProcessor.for_paths(tmp_paths, workers=2).process(downloads)
+    saved = json.loads((downloads / "downloads.json").read_text(encoding="utf-8"))
+    assert saved == records and len(records) == 2
+    assert all(record["derivatives"]["error"] for record in records)
+
+
+def test_materialize_reports_missing_cache_entry(downloads, tmp_paths):
+    processor = MediaPostProcessor.for_paths(tmp_paths)
+
+    derivatives = processor._materialize(downloads / "a.mp4", "0" * 64, downloads)
+    assert derivatives["sha256"] == "0" * 64 and derivatives["error"]
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from core.metrics import MetricsRegistry, start_metrics_server
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls by model.", ("model", "status"))
+    calls.inc(model='gpt "mini"\\beta\nnext', status="ok")
+    calls.inc(2, model="plain", status="error")
+    latency = registry.histogram("latency_seconds", "Stage latency.", ("stage",), (0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, stage="script")
+    return registry
+
+
+def test_render_text_format(registry):
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP calls_total Calls by model.", "# TYPE calls_total counter"]
+    assert 'calls_total{model="gpt \\"mini\\"\\\\beta\\nnext",status="ok"} 1' in lines
+    assert 'calls_total{model="plain",status="error"} 2' in lines
+    assert "# TYPE latency_seconds histogram" in lines
+    # Buckets are cumulative and end with +Inf, followed by the sum and the count.
+    assert lines[-5:] == [
+        'latency_seconds_bucket{stage="script",le="0.1"} 1',
+        'latency_seconds_bucket{stage="script",le="1"} 3',
+        'latency_seconds_bucket{stage="script",le="+Inf"} 4',
+        'latency_seconds_sum{stage="script"} 4.25',
+        'latency_seconds_count{stage="script"} 4',
+    ]
+
+
+def test_metrics_server_serves_registry(registry):
+    server = start_metrics_server(port=0, host="127.0.0.1", registry=registry)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode("utf-8") == registry.render()
+        with pytest.raises(urllib.error.HTTPError) as missing:
+            urllib.request.urlopen(f"{base}/other", timeout=5)
+        assert missing.value.code == 404
+        missing.value.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.openai_client import OpenAIClient
+from core.script_generator import ScriptService
+
+
+@pytest.fixture
+def gemini(fake_provider, monkeypatch) -> OpenAIClient:
+    from tenacity import wait_none
+
+    monkeypatch.setenv("AI_PROVIDER", "gemini")
+    monkeypatch.setenv("GEMINI_API_KEY", "fake")
+    monkeypatch.setenv("GEMINI_API_ENDPOINT", os.environ["OPENAI_BASE_URL"].removesuffix("/v1"))
+    monkeypatch.setenv("GEMINI_REQUEST_INTERVAL", "0")
+    monkeypatch.setattr(OpenAIClient.send_candidates.retry, "wait", wait_none())
+    return OpenAIClient()
+
+
+def test_context_cache_is_created_once_per_prefix(gemini, fake_provider):
+    prefix = ["고정 프롬프트 " * 400]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(
+            pool.map(lambda _: gemini._context_cache("fake", "system", prefix), range(8))
+        )
+    assert len({cached.name for _, cached in results}) == 1
+    assert len(fake_provider.cached_contents) == 1
+
+
+def test_renewal_deletes_the_replaced_cache(gemini, fake_provider, script_request):
+    service = ScriptService(client=gemini)
+    service.generate_bundle(script_request)
+    first = set(fake_provider.cached_contents)
+    assert len(first) == 2  # script and thumbnail prefixes
+
+    gemini._context_caches = {
+        key: (cached, 0.0) for key, (cached, _) in gemini._context_caches.items()
+    }
+    service.generate_bundle(script_request)
+    assert len(fake_provider.cached_contents) == 2
+    assert not first & set(fake_provider.cached_contents)
+
+
+def test_only_a_missing_cache_is_recreated(gemini, fake_provider, monkeypatch, script_request):
+    service = ScriptService(client=gemini)
+    service.generate_bundle(script_request)
+    names = set(fake_provider.cached_contents)
+
+    # Other errors leave the cache in place for the retry.
+    import google.generativeai as genai
+    from google.api_core.exceptions import ServiceUnavailable
+    from tenacity import RetryError
+
+    def overloaded(*args, **kwargs):
+        raise ServiceUnavailable("model overloaded")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(genai.GenerativeModel, "generate_content", overloaded)
+        with pytest.raises(RetryError):
+            service.generate_bundle(script_request)
+    assert len(gemini._context_caches) == 2
+    service.generate_bundle(script_request)
+    assert set(fake_provider.cached_contents) == names
+
+    # A cache gone server-side is recreated and the request still succeeds.
+    fake_provider.cached_contents.clear()
+    assert service.generate_bundle(script_request)["hook"]
+    assert len(fake_provider.cached_contents) == 2
+    assert not names & set(fake_provider.cached_contents)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from core.pipeline import GenerationOptions, run_generation
+from core.services import ServiceContainer
+from core.tracing import get_tracer
+
+
+@pytest.fixture
+def options(script_request) -> GenerationOptions:
+    return GenerationOptions(
+        product_name=script_request.product_name,
+        target_audience=script_request.target_audience,
+        tone=script_request.tone,
+        style=script_request.style,
+        language=script_request.language,
+    )
+
+
+def test_independent_stages_overlap(fake_provider, tmp_paths, options):
+    spans: list = []
+    get_tracer().add_exporter(SimpleNamespace(export=spans.append))
+    run_generation(options, services=ServiceContainer(tmp_paths))
+    by_name = {span.name: span for span in spans}
+    script, keywords = by_name["script.generate_bundle"], by_name["keywords.translate"]
+    assert keywords.start_time < script.start_time + script.duration_ms / 1000
+
+
+def test_unchanged_stages_are_memoized(fake_provider, tmp_paths, options):
+    services = ServiceContainer(tmp_paths)
+    first = run_generation(options, services=services)
+    assert not first["cached_stages"]
+    calls = fake_provider.stats.requests
+
+    states: dict[str, str] = {}
+    result = run_generation(options, services=services, progress=states.__setitem__)
+    assert fake_provider.stats.requests == calls  # no LLM call on a rerun
+    assert sorted(result["cached_stages"]) == ["keywords", "script"]
+    assert states["script"] == "cached" and states["save"] == "done"
+    assert result["script_bundle"] == first["script_bundle"]
+    assert Path(result["output_dir"], "metadata.json").exists()
+
+    options.refresh_stages = True
+    assert not run_generation(options, services=services)["cached_stages"]
+    assert fake_provider.stats.requests > calls
+
+
+def test_extra_languages_share_one_call(fake_provider, tmp_paths, options):
+    options.extra_languages = ["en", "ja", "ko"]
+    result = run_generation(options, services=ServiceContainer(tmp_paths))
+    localized = result["script_bundle"]["localized"]
+    assert list(localized) == ["en", "ja"]  # the primary language is not repeated
+    output_dir = Path(result["output_dir"])
+    for language in localized:
+        assert (output_dir / f"script_{language}.txt").read_text(encoding="utf-8").strip()
+        assert (output_dir / f"thumbnail_{language}.txt").exists()
+
+    by_stage = result["usage"]["by_stage"]
+    assert by_stage["localize"]["calls"] == 1
+    full_run = sum(
+        by_stage[stage]["input_tokens"] + by_stage[stage]["output_tokens"]
+        for stage in ("script", "thumbnail")
+    )
+    per_language = (
+        by_stage["localize"]["input_tokens"] + by_stage["localize"]["output_tokens"]
+    ) / len(localized)
+    # Each extra language is a fraction of a script + thumbnail pass.
+    assert per_language < 0.6 * full_run
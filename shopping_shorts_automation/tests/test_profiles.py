@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from dataclasses import replace
+from pathlib import Path
+
+from core.keyword_translator import KeywordTranslator
+from core.profiles import DEFAULT_PROFILES, MIN_SAMPLES, StageProfiles
+from core.script_generator import ScriptService
+from core.usage import collect_usage, summarize_usage
+
+
+def save_usage(output_root: Path, name: str, records: list) -> None:
+    product_dir = output_root / name
+    product_dir.mkdir(parents=True)
+    metadata = {"product_name": name, "usage": summarize_usage(records)}
+    (product_dir / "metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+
+
+def test_stage_profiles_tune_output_caps(fake_provider, tmp_paths, script_request, keyword_request):
+    untuned = StageProfiles(tmp_paths.output_root)
+    service = ScriptService(profiles=untuned)
+    translator = KeywordTranslator(profiles=untuned)
+
+    def generate_product() -> list:
+        with collect_usage() as records:
+            service.generate_bundle(script_request)
+            translator.translate(keyword_request)
+        return records
+
+    for index in range(MIN_SAMPLES):
+        save_usage(tmp_paths.output_root, f"product-{index:02d}", generate_product())
+    reserved_untuned = fake_provider.stats.reserved_tokens / MIN_SAMPLES
+
+    tuned = StageProfiles(tmp_paths.output_root)
+    caps = {stage: tuned.get(stage).max_tokens for stage in ("script", "thumbnail", "keywords")}
+    assert all(caps[stage] < DEFAULT_PROFILES[stage].max_tokens for stage in caps)
+    service.profiles = translator.profiles = tuned
+
+    before = fake_provider.stats.reserved_tokens
+    records = generate_product()
+    # Tuned caps still leave room for every reply.
+    assert fake_provider.stats.truncated == 0
+    assert {record.stage for record in records} == set(caps)
+    assert fake_provider.stats.reserved_tokens - before < reserved_untuned / 3
+
+    # A product outgrowing the tuned cap is re-sent once at the configured cap, not retried
+    # at the same cap until the stage fails.
+    long_request = replace(script_request, product_name="초대형 " * 300 + "신발 건조기")
+    with collect_usage() as long_records:
+        assert service.generate_bundle(long_request)["script"]
+    script_calls = [record.truncated for record in long_records if record.stage == "script"]
+    assert script_calls == [True, False]
+    # The recorded truncation keeps the stage at its configured cap on the next refresh.
+    save_usage(tmp_paths.output_root, "product-long", long_records)
+    tuned.invalidate()
+    assert tuned.get("script").max_tokens == DEFAULT_PROFILES["script"].max_tokens
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+
+from core.keyword_translator import KeywordTranslator
+from core.metrics import LLM_PARSE_FAILURES, LLM_RETRIES
+from core.openai_client import OpenAIClient
+from core.script_generator import ScriptService
+from core.usage import collect_usage, summarize_usage
+
+
+def test_replayed_stages(replay_llm, script_request, keyword_request):
+    bundle = ScriptService(client=replay_llm).generate_bundle(script_request)
+    assert len(bundle["thumbnail_options"]) == 3
+    assert KeywordTranslator(client=replay_llm).translate(keyword_request)["chinese_keywords"]
+
+
+def test_bundle_usage_over_fake_provider(fake_provider, script_request):
+    service = ScriptService()
+
+    with collect_usage() as records:
+        for _ in range(2):
+            bundle = service.generate_bundle(script_request)
+    assert bundle["hook"] and len(bundle["thumbnail_options"]) == 3
+    assert records and all(record.input_tokens and record.output_tokens for record in records)
+    assert fake_provider.stats.responses == {"200": len(records)}
+    # Static prompt prefixes repeat across calls, so later calls are served from the cache.
+    assert any(record.cached_tokens for record in records)
+
+
+def test_bundle_candidates_in_single_calls(fake_provider, script_request):
+    service = ScriptService()
+
+    with collect_usage() as records:
+        bundle = service.generate_bundle(script_request, candidates=3)
+    assert len({candidate["hook"] for candidate in bundle["candidates"]}) == 3
+    assert len(bundle["thumbnail_sets"]) == 3
+    assert bundle["hook"] == bundle["candidates"][0]["hook"]
+    assert len(records) == 2 * fake_provider.stats.stages["script"]
+
+    # Without native sampling the alternatives come back as one JSON array.
+    service.client.max_candidates = 1
+    fallback = service.generate_bundle(script_request, candidates=3)
+    assert len(fallback["candidates"]) == 3 and len(fallback["thumbnail_sets"]) == 3
+
+
+def test_gemini_context_cache_over_fake_provider(fake_provider, monkeypatch, script_request):
+    monkeypatch.setenv("AI_PROVIDER", "gemini")
+    monkeypatch.setenv("GEMINI_API_KEY", "fake")
+    monkeypatch.setenv("GEMINI_API_ENDPOINT", os.environ["OPENAI_BASE_URL"].removesuffix("/v1"))
+    monkeypatch.setenv("GEMINI_REQUEST_INTERVAL", "0")
+    service = ScriptService()
+
+    with collect_usage() as records:
+        for _ in range(3):
+            service.generate_bundle(script_request)
+    # One context cache per static prefix (script, thumbnail), reused by every call.
+    assert len(fake_provider.cached_contents) == 2
+    assert all(record.cached_tokens for record in records)
+    summary = summarize_usage(records)
+    assert 0 < summary["total"]["cached_ratio"] < 1
+    assert fake_provider.stats.structured == fake_provider.stats.requests
+
+
+def test_structured_output_removes_parse_retries(fake_provider, monkeypatch, keyword_request):
+    from tenacity import wait_none
+
+    # Truncated replies are retried immediately here; production waits 4-60 s per retry.
+    monkeypatch.setattr(OpenAIClient.send_candidates.retry, "wait", wait_none())
+    fake_provider.config.malformed_rate = 0.3
+    rounds = 20
+
+    def translate_all(structured: str) -> dict[str, int]:
+        monkeypatch.setenv("LLM_STRUCTURED_OUTPUT", structured)
+        translator = KeywordTranslator()
+        mode = "schema" if structured == "true" else "prompt"
+        retries = LLM_RETRIES.total()
+        failures = LLM_PARSE_FAILURES.total(mode=mode)
+        requests = fake_provider.stats.requests
+        for _ in range(rounds):
+            assert translator.translate(keyword_request)["douyin_search_queries"]
+        return {
+            "retries": LLM_RETRIES.total() - retries,
+            "parse_failures": LLM_PARSE_FAILURES.total(mode=mode) - failures,
+            "requests": fake_provider.stats.requests - requests,
+        }
+
+    prompt_only = translate_all("false")
+    assert prompt_only["parse_failures"] and prompt_only["retries"]
+    assert prompt_only["requests"] > rounds
+    assert translate_all("true") == {"retries": 0, "parse_failures": 0, "requests": rounds}
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from core.file_manager import OutputManager, save_outputs
+from core.search import SearchIndex
+from core.utils import ensure_json
+
+
+@pytest.fixture
+def saved_output(tmp_paths, llm_responses, script_request):
+    manager = OutputManager(tmp_paths)
+    output_dir = manager.create_output_dir(script_request.product_name)
+    save_outputs(
+        output_manager=manager,
+        output_dir=output_dir,
+        product_name=script_request.product_name,
+        script_bundle=ensure_json(llm_responses["script"]),
+        keyword_payload=ensure_json(llm_responses["keywords"]),
+        script_request=script_request,
+    )
+    return manager, output_dir
+
+
+def test_search_ranks_fields_and_limits(saved_output, tmp_paths):
+    manager, output_dir = saved_output
+    index = manager.search_index()
+    filler = {
+        "script_bundle": {"hook": "장마철 신발 냄새 고민 끝", "script": "젖은 운동화도 뽀송하게"},
+        "keywords": {"korean_keywords": ["신발 건조기"], "chinese_keywords": ["鞋子烘干机"]},
+    }
+    index.add_many(
+        (tmp_paths.output_root / f"filler_{i}", {**filler, "product_name": f"건조기 {i}"}, None)
+        for i in range(50)
+    )
+
+    hits = index.search("출근길 이어폰")
+    assert [hit.output_dir for hit in hits] == [str(output_dir)]
+    assert hits[0].hook == "출근길 이어폰, 또 빠졌나요?" and "[출근길]" in hits[0].snippet
+    assert index.search("降噪")[0].output_dir == str(output_dir)  # two-character terms
+    assert index.search("무선", fields=["cta"]) == []
+    assert len(index.search("건조기", limit=5)) == 5
+
+
+def test_rebuild_syncs_with_output_folders(saved_output, tmp_paths):
+    manager, _ = saved_output
+    gone = {"product_name": "삭제된 상품", "script_bundle": {"hook": "없는 폴더"}}
+    manager.search_index().add_many([(tmp_paths.output_root / "deleted", gone, None)])
+    # Folders saved before the index existed are added; deleted folders are dropped.
+    legacy = tmp_paths.output_root / "legacy"
+    legacy.mkdir()
+    (legacy / "metadata.json").write_text(
+        json.dumps({"product_name": "캠핑 의자", "script_bundle": {"hook": "허리 편한 캠핑"}}),
+        encoding="utf-8",
+    )
+    reopened = SearchIndex.for_paths(tmp_paths)
+    assert reopened.rebuild(tmp_paths.output_root) == 1 and len(reopened) == 2
+    assert reopened.search("캠핑")[0].output_dir == str(legacy)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from core.services import ServiceContainer
+
+
+@pytest.fixture
+def container(monkeypatch, tmp_paths):
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    container = ServiceContainer(tmp_paths)
+    yield container
+    container.close()
+
+
+def test_services_are_shared_until_config_changes(monkeypatch, container):
+    service = container.script_service()
+    profiles = container.stage_profiles()
+    assert container.script_service() is service
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-rotated")
+    assert container.script_service() is not service
+    assert container.stage_profiles() is not profiles
+
+
+def test_path_bound_stores_outlive_config_changes(monkeypatch, container):
+    corpus = container.reference_corpus()
+    fingerprints = container.fingerprint_index()
+    container.script_service()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-rotated")
+    container.script_service()
+    container.invalidate()
+    assert container.reference_corpus() is corpus
+    assert container.fingerprint_index() is fingerprints
+    assert corpus.query(limit=1) == []  # still open
+
+
+def test_close_releases_sqlite_stores(container):
+    corpus = container.reference_corpus()
+    search = container.output_manager().search_index()
+
+    container.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        corpus.query(limit=1)
+    with pytest.raises(sqlite3.ProgrammingError):
+        search.search("이어폰")
+    assert container.reference_corpus() is not corpus
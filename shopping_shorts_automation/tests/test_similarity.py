@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+
+from core.script_generator import ScriptRequest
+from core.similarity import ProductIndex
+from core.utils import ensure_json
+
+
+def test_near_duplicate_lookup(tmp_paths, llm_responses):
+    names = ["무선 이어폰", "블루투스 스피커", "무선 신발 건조기", "캠핑 의자", "무선 충전기"]
+    for index, name in enumerate(names * 4):
+        folder = tmp_paths.output_root / f"product_{index}"
+        folder.mkdir(parents=True)
+        (folder / "metadata.json").write_text(
+            json.dumps(
+                {
+                    "product_name": f"{name} {index}",
+                    "input": {"target_audience": "25-40세 직장인", "tone": "신뢰형"},
+                    "script_bundle": {"hook": "hook"},
+                    "keywords": ensure_json(llm_responses["keywords"]),
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+    request = ScriptRequest(
+        product_name="블루투스 무선이어폰 0",
+        target_audience="25-40세 직장인",
+        tone="신뢰형",
+        language="ko",
+        style="문제 해결",
+    )
+
+    matches = ProductIndex.for_paths(tmp_paths).find_similar(request)
+    assert matches and matches[0].product_name == "무선 이어폰 0"